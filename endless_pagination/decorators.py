@@ -3,12 +3,17 @@
 from __future__ import unicode_literals
 from functools import wraps
 
+from endless_pagination import utils
 from endless_pagination.settings import (
     PAGE_LABEL,
     TEMPLATE_VARNAME,
 )
 
 
+# The template used to render multiple page templates in a single response.
+BATCH_TEMPLATE = 'endless/batch.html'
+
+
 def page_template(template, key=PAGE_LABEL):
     """Return a view dynamically switching template if the request is Ajax.
 
@@ -19,6 +24,12 @@ def page_template(template, key=PAGE_LABEL):
     This allows multiple Ajax paginations in the same page.
     The name of the page template is given as *page_template* in the
     extra context.
+    The *request.endless_is_page_request* attribute is set to True if only
+    the page template is going to be rendered.
+
+    The page template can also be a fragment of the main template, e.g.
+    ``myapp/entry_index.html#entries``: see
+    *endless_pagination.loaders.FragmentLoader*.
     """
     def decorator(view):
         @wraps(view)
@@ -32,6 +43,9 @@ def page_template(template, key=PAGE_LABEL):
                 'querystring_key', PAGE_LABEL)
             if request.is_ajax() and querystring_key == key:
                 kwargs[TEMPLATE_VARNAME] = template
+                request.endless_is_page_request = True
+            elif not hasattr(request, 'endless_is_page_request'):
+                request.endless_is_page_request = False
             return view(request, *args, **kwargs)
         return decorated
 
@@ -70,6 +84,18 @@ def page_templates(mapping):
     When the value of the dict is None then the default *querystring_key*
     (defined in settings) is used. You can use this decorator instead of
     chaining multiple *page_template* calls.
+
+    An Ajax request can also ask for several paginations at once, providing
+    multiple *querystring_key* values, e.g.::
+
+        ?page=2&go_to_page=3&querystring_key=page&querystring_key=go_to_page
+
+    In this case the view is executed only once, and all the requested page
+    templates are rendered in a single response using the
+    ``endless/batch.html`` template. Each page template is wrapped in an
+    element having the *endless_batch* class and the corresponding
+    *data-querystring-key* attribute. The list of ``(key, template)`` pairs
+    is given as *endless_batch* in the extra context.
     """
     def decorator(view):
         @wraps(view)
@@ -77,13 +103,65 @@ def page_templates(mapping):
             # Trust the developer: he wrote ``context.update(extra_context)``
             # in his view.
             extra_context = kwargs.setdefault('extra_context', {})
+            querystring_keys = request.REQUEST.getlist('querystring_key')
+            if request.is_ajax() and len(querystring_keys) > 1:
+                # Render all the requested page templates at once.
+                batch = []
+                for querystring_key in querystring_keys:
+                    template = _get_template(querystring_key, mapping)
+                    if template:
+                        batch.append((querystring_key, template))
+                if batch:
+                    extra_context['page_template'] = batch[0][1]
+                    extra_context['endless_batch'] = batch
+                    kwargs[TEMPLATE_VARNAME] = BATCH_TEMPLATE
+                    request.endless_is_page_request = True
+                    return view(request, *args, **kwargs)
             querystring_key = request.REQUEST.get(
                 'querystring_key', PAGE_LABEL)
             template = _get_template(querystring_key, mapping)
             extra_context['page_template'] = template
             # Switch the template when the request is Ajax.
-            if request.is_ajax() and template:
+            is_page_request = bool(request.is_ajax() and template)
+            if is_page_request:
                 kwargs[TEMPLATE_VARNAME] = template
+            request.endless_is_page_request = is_page_request
+            return view(request, *args, **kwargs)
+        return decorated
+
+    return decorator
+
+
+def lazy_context(mapping):
+    """Add lazily computed values to the extra context of the decorated view.
+
+    The *mapping* dict maps context variable names to callables taking the
+    request as the only argument, e.g.::
+
+        @page_template('myapp/entries_page.html')
+        @lazy_context({
+            'sidebar': get_sidebar,
+            'counts': get_counts,
+        })
+        def entry_index(request, template='myapp/entry_index.html',
+                        extra_context=None):
+            ...
+
+    Values are computed only when used in templates, and are not added to
+    the context at all if only the page template is going to be rendered
+    (i.e. if *request.endless_is_page_request* is True). For this reason,
+    this decorator must be applied before (i.e. below) the *page_template*
+    or *page_templates* ones.
+    """
+    def decorator(view):
+        @wraps(view)
+        def decorated(request, *args, **kwargs):
+            if not getattr(request, 'endless_is_page_request', False):
+                # Trust the developer: he wrote
+                # ``context.update(extra_context)`` in his view.
+                extra_context = kwargs.setdefault('extra_context', {})
+                for name, func in mapping.items():
+                    extra_context[name] = utils.lazy_value(func, request)
             return view(request, *args, **kwargs)
         return decorated
 
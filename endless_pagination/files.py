@@ -0,0 +1,252 @@
+"""Memory-mapped access to the lines of large files.
+
+The offsets of the lines of a file are stored in a sidecar index file, next
+to the paginated one (e.g. *export.csv.lineidx* for *export.csv*), so that
+the file is only scanned once. When the file grows, only the new lines are
+scanned and added to the index. If the file shrinks, or the index does
+not match it, the index is rebuilt from scratch. Files are expected to only
+be appended to: a rewritten file is detected checking a sample of the
+indexed offsets, but delete the index to be sure it is rebuilt.
+
+The index is memory-mapped too, and offsets are unpacked only when needed:
+lines are then retrieved slicing the memory-mapped file between two
+offsets, so that accessing any line takes constant time, and neither the
+file nor its index are ever read as a whole.
+"""
+
+from __future__ import unicode_literals
+import mmap
+import os
+import struct
+import uuid
+
+
+# The suffix added to the file path to get the path of the sidecar index.
+INDEX_SUFFIX = '.lineidx'
+
+# Offsets are stored as little-endian unsigned 64-bit integers, so that
+# indexes can be shared by different platforms.
+OFFSET_FORMAT = str('<Q')
+OFFSET_SIZE = struct.calcsize(OFFSET_FORMAT)
+
+# The number of lines checked when validating an existing index.
+INDEX_CHECKS = 16
+
+# The number of bytes copied at a time when updating an index.
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def map_file(path):
+    """Return the memory-mapped contents of the file at *path*.
+
+    Return empty bytes if the file is empty (empty files cannot be mapped).
+    Raise *IOError* or *OSError* if the file cannot be read.
+    """
+    with open(path, 'rb') as mapped_file:
+        if not os.fstat(mapped_file.fileno()).st_size:
+            return b''
+        return mmap.mmap(mapped_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def load_index(index_path):
+    """Return the memory-mapped index stored in *index_path*.
+
+    Return empty bytes if the index does not exist or cannot be read.
+    """
+    try:
+        return map_file(index_path)
+    except (IOError, OSError):
+        return b''
+
+
+def get_offset(index, number):
+    """Return the offset at position *number* of the packed *index*."""
+    return struct.unpack_from(OFFSET_FORMAT, index, number * OFFSET_SIZE)[0]
+
+
+def pack_offsets(offsets):
+    """Return the given *offsets* packed as index bytes."""
+    return struct.pack(
+        str('<{0}Q').format(len(offsets)), *offsets)
+
+
+def save_index(index_path, offsets, index=b''):
+    """Store the packed *index* followed by *offsets* in *index_path*.
+
+    The index is written to a temporary file, which then replaces the
+    existing index atomically, so that processes updating the index
+    concurrently never corrupt it, and processes mapping the previous index
+    are not affected. Return False if the index cannot be written, e.g. if
+    the directory is read-only, in which case the offsets are only kept in
+    memory.
+    """
+    temp_path = '{0}.{1}.tmp'.format(index_path, uuid.uuid4().hex)
+    try:
+        with open(temp_path, 'wb') as index_file:
+            for position in range(0, len(index), COPY_CHUNK_SIZE):
+                index_file.write(index[position:position + COPY_CHUNK_SIZE])
+            index_file.write(pack_offsets(offsets))
+        os.rename(temp_path, index_path)
+    except (IOError, OSError):
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+    return True
+
+
+def scan_lines(data, offsets, start):
+    """Append to *offsets* the end offset of each line in *data*.
+
+    The scan starts at the *start* offset. Lines are terminated by a
+    newline: the last line of *data* is ignored if it is not terminated.
+    """
+    find = data.find
+    position = find(b'\n', start)
+    while position != -1:
+        offsets.append(position + 1)
+        position = find(b'\n', position + 1)
+
+
+def count_offsets(index, size):
+    """Return the number of offsets of the packed *index* not past *size*.
+
+    Offsets are sorted, so they are searched using bisection.
+    """
+    low, high = 0, len(index) // OFFSET_SIZE
+    while low < high:
+        middle = (low + high) // 2
+        if get_offset(index, middle) > size:
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+def is_valid_index(data, index, length=None):
+    """Return True if the packed *index* can be the index of the mapped *data*.
+
+    The index must start at 0, and a sample of *INDEX_CHECKS* lines,
+    including the last one, must be terminated by a newline in *data*.
+    This way rewritten files are usually detected, without reading them.
+    If *length* is given, only the first *length* offsets are checked.
+    """
+    total, remainder = divmod(len(index), OFFSET_SIZE)
+    if length is None:
+        length = total
+    if not length or remainder or get_offset(index, 0) != 0:
+        return False
+    if get_offset(index, length - 1) > len(data):
+        return False
+    step = max(1, (length - 1) // INDEX_CHECKS)
+    numbers = list(range(1, length, step)) + [length - 1]
+    for number in numbers:
+        end = get_offset(index, number)
+        if end and data[end - 1:end] != b'\n':
+            return False
+    return True
+
+
+class MappedLines(object):
+    """A read-only sequence of the lines of the file at *path*.
+
+    The file is memory-mapped and the offsets of its lines are retrieved
+    from the sidecar index at *index_path* (the file path followed by
+    *INDEX_SUFFIX* if not given), which is created or updated as needed.
+
+    Lines do not include the trailing newline, and are decoded using
+    *encoding*, or returned as bytes if *encoding* is None. A last line not
+    terminated by a newline is included, but not stored in the index.
+
+    Call *close* to unmap the file, or use the instance as a context manager.
+    """
+
+    def __init__(self, path, encoding='utf-8', index_path=None):
+        self.path = path
+        self.encoding = encoding
+        self.index_path = index_path or path + INDEX_SUFFIX
+        self._data = map_file(path)
+        self.size = len(self._data)
+        # The mapped index, the number of its offsets within the mapped
+        # file, and the offsets not stored in it.
+        self._index = b''
+        self._indexed = 0
+        self._extra = []
+        self._update_index()
+        # The number of offsets, and whether or not the file ends with an
+        # unterminated line.
+        self._length = self._indexed + len(self._extra)
+        self._tail = self.size > self._get_offset(self._length - 1)
+
+    def _update_index(self):
+        """Map the sidecar index, scanning only the lines not indexed yet."""
+        index = load_index(self.index_path)
+        if is_valid_index(self._data, index):
+            start = len(index) // OFFSET_SIZE
+            offsets = []
+            scan_lines(self._data, offsets, get_offset(index, start - 1))
+        else:
+            self._close(index)
+            index, start, offsets = b'', 0, [0]
+            scan_lines(self._data, offsets, 0)
+        if offsets and save_index(self.index_path, offsets, index):
+            self._close(index)
+            index = load_index(self.index_path)
+            # Ignore the offsets added by processes mapping a longer file.
+            start, offsets = count_offsets(index, self.size), []
+            if not is_valid_index(self._data, index, start):
+                # The index was replaced by an unrelated one meanwhile.
+                self._close(index)
+                index, start, offsets = b'', 0, [0]
+                scan_lines(self._data, offsets, 0)
+        self._index, self._indexed, self._extra = index, start, offsets
+
+    def _get_offset(self, number):
+        """Return the offset at position *number*."""
+        if number < self._indexed:
+            return get_offset(self._index, number)
+        return self._extra[number - self._indexed]
+
+    def __len__(self):
+        return self._length - 1 + self._tail
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            indexes = range(*index.indices(len(self)))
+            return [self._get_line(i) for i in indexes]
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('line index out of range')
+        return self._get_line(index)
+
+    def _get_line(self, index):
+        """Return the line at the given 0-based *index*."""
+        start = self._get_offset(index)
+        end = self.size
+        if index + 1 < self._length:
+            end = self._get_offset(index + 1)
+        line = self._data[start:end]
+        if line.endswith(b'\n'):
+            line = line[:-1]
+            if line.endswith(b'\r'):
+                line = line[:-1]
+        if self.encoding is None:
+            return line
+        return line.decode(self.encoding, 'replace')
+
+    def _close(self, data):
+        """Unmap *data*, if it is memory-mapped."""
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Unmap the file and its index."""
+        self._close(self._data)
+        self._close(self._index)
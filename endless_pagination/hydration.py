@@ -0,0 +1,140 @@
+"""Per-object cache hydration of page items.
+
+When the model of a paginated queryset is registered, e.g.::
+
+    from endless_pagination import hydration
+
+    hydration.register(Entry, timeout=300)
+
+pages are retrieved in two phases: first the ordered primary keys of the
+objects in the page are fetched, then the objects are retrieved from the
+cache, querying the database only for the missing ones, which are then
+stored in the cache. Cached objects are invalidated when saved or deleted.
+
+Since objects are cached by model and primary key, only plain querysets are
+hydrated: querysets returning dicts or tuples (*values* and *values_list*),
+or model instances with a different select shape (annotations, extra
+selects, deferred fields, *select_related*), always query the database.
+Objects updated without sending signals, e.g. using ``queryset.update()``,
+are not invalidated until the cache timeout expires.
+"""
+
+from __future__ import unicode_literals
+
+from django.core.cache import cache
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+)
+
+
+# The cache key prefix used to store model instances.
+CACHE_PREFIX = 'endless_pagination:object:'
+
+# Map registered models to their cache timeout.
+_registry = {}
+
+
+def get_dispatch_uid(model):
+    """Return the dispatch uid of the invalidation receivers for *model*."""
+    return '{0}{1}'.format(CACHE_PREFIX, get_model_label(model))
+
+
+def get_model_label(model):
+    """Return the ``app_label.ModelName`` label of *model*."""
+    return '{0}.{1}'.format(model._meta.app_label, model._meta.object_name)
+
+
+def get_cache_key(model, pk):
+    """Return the cache key of the *model* instance with the given *pk*."""
+    return '{0}{1}:{2}'.format(CACHE_PREFIX, get_model_label(model), pk)
+
+
+def invalidate(sender, instance, **kwargs):
+    """Remove the given model *instance* from the cache."""
+    cache.delete(get_cache_key(sender, instance.pk))
+
+
+def register(model, timeout=None):
+    """Enable cache hydration for *model*.
+
+    The optional *timeout* is the number of seconds instances are kept in the
+    cache: if None, the default cache timeout is used.
+    """
+    _registry[model] = timeout
+    dispatch_uid = get_dispatch_uid(model)
+    post_save.connect(invalidate, sender=model, dispatch_uid=dispatch_uid)
+    post_delete.connect(invalidate, sender=model, dispatch_uid=dispatch_uid)
+
+
+def unregister(model):
+    """Disable cache hydration for *model*."""
+    _registry.pop(model, None)
+    dispatch_uid = get_dispatch_uid(model)
+    post_save.disconnect(sender=model, dispatch_uid=dispatch_uid)
+    post_delete.disconnect(sender=model, dispatch_uid=dispatch_uid)
+
+
+def is_registered(model):
+    """Return True if cache hydration is enabled for *model*."""
+    return model in _registry
+
+
+def is_plain(queryset):
+    """Return True if *queryset* returns model instances with default fields.
+
+    Return False for querysets returning dicts or tuples, and for querysets
+    whose instances include annotations, extra selects, deferred fields or
+    related objects.
+    """
+    if getattr(queryset, '_fields', None) is not None:
+        # A *values* or *values_list* queryset.
+        return False
+    query = queryset.query
+    # Aggregates were renamed to annotations in Django 1.8.
+    annotations = getattr(query, 'annotations', None)
+    if annotations is None:
+        annotations = query.aggregates
+    return not (
+        annotations or query.extra or query.deferred_loading[0] or
+        query.select_related)
+
+
+def is_hydratable(queryset):
+    """Return True if the objects of *queryset* can be retrieved from cache.
+    """
+    return is_registered(queryset.model) and is_plain(queryset)
+
+
+def hydrate(queryset, pks):
+    """Return the objects of *queryset* with the given *pks*, in order.
+
+    If the queryset is hydratable (see *is_hydratable*), objects are
+    retrieved from the cache, and only the missing ones are retrieved from
+    the database (and then stored in the cache). Objects that no longer
+    exist are skipped.
+
+    Objects of querysets not returning plain model instances cannot be
+    matched to their primary keys: they are retrieved from the database in
+    the order of the queryset.
+    """
+    if not is_plain(queryset):
+        return list(queryset.filter(pk__in=pks))
+    model = queryset.model
+    cached = is_hydratable(queryset)
+    objects = {}
+    if cached:
+        keys = dict((get_cache_key(model, pk), pk) for pk in pks)
+        for key, obj in cache.get_many(list(keys)).items():
+            objects[keys[key]] = obj
+    missing = [pk for pk in pks if pk not in objects]
+    if missing:
+        retrieved = dict(
+            (obj.pk, obj) for obj in queryset.filter(pk__in=missing))
+        if retrieved and cached:
+            cache.set_many(
+                dict((get_cache_key(model, pk), obj)
+                     for pk, obj in retrieved.items()),
+                _registry[model])
+        objects.update(retrieved)
+    return [objects[pk] for pk in pks if pk in objects]
@@ -0,0 +1,183 @@
+"""Instrumentation of the pagination phases.
+
+When ``settings.INSTRUMENTATION`` is True, the *pagination_phase* signal is
+sent each time one of the following phases completes:
+
+    - *paginate*: the whole ``{% paginate %}`` / ``{% lazy_paginate %}`` tag;
+    - *count*: the computation of the total number of objects;
+    - *page*: the retrieval of the objects in the current page;
+    - *page_list*: the rendering of the Digg-style pagination links.
+
+The signal sender is the paginator class, and the receivers are passed the
+*phase* name, its *duration* in seconds, and, when available, the page
+*number*, the *querystring_key* and the number of *rows* retrieved.
+
+Two receivers are included: *log_phase* emits structured log records, and
+*record_phase*, used by *ServerTimingMiddleware*, collects the durations to
+be exposed in the ``Server-Timing`` response header.
+
+Regardless of the settings, the *deep_page* signal is sent, and a warning is
+logged, when a page is refused because it is too deep.
+"""
+
+from __future__ import unicode_literals
+from collections import OrderedDict
+from functools import wraps
+import logging
+import threading
+import timeit
+
+from django.dispatch import Signal
+
+from endless_pagination import settings
+
+
+pagination_phase = Signal(
+    providing_args=['phase', 'duration', 'number', 'querystring_key', 'rows'])
+deep_page = Signal(providing_args=['number', 'max_number', 'reason'])
+logger = logging.getLogger('endless_pagination.instrumentation')
+# The prefix of the metrics names in the ``Server-Timing`` header.
+SERVER_TIMING_PREFIX = 'endless-'
+
+_local = threading.local()
+
+
+def count_rows(object_list):
+    """Return the number of objects in *object_list*, or None if unknown."""
+    try:
+        return len(object_list)
+    except TypeError:
+        return None
+
+
+def instrument(phase, describe):
+    """Send the *pagination_phase* signal when the decorated function returns.
+
+    The *describe* callable is called passing the function return value
+    followed by the function arguments, and must return a dict including the
+    signal *sender* and, optionally, the *number*, *querystring_key* and
+    *rows* values.
+
+    The function is called directly, without being timed, if
+    ``settings.INSTRUMENTATION`` is False.
+    """
+    def decorator(func):
+        @wraps(func)
+        def decorated(*args, **kwargs):
+            if not settings.INSTRUMENTATION:
+                return func(*args, **kwargs)
+            start = timeit.default_timer()
+            result = func(*args, **kwargs)
+            duration = timeit.default_timer() - start
+            data = {'number': None, 'querystring_key': None, 'rows': None}
+            data.update(describe(result, *args, **kwargs))
+            pagination_phase.send(phase=phase, duration=duration, **data)
+            return result
+        return decorated
+    return decorator
+
+
+def log_phase(sender, phase, duration, **kwargs):
+    """Log the pagination *phase*.
+
+    Connect this receiver to the *pagination_phase* signal to log all the
+    phases at debug level. Values are also included in the log record as
+    the *endless_pagination* extra attribute, so that they can be used by
+    structured logging formatters.
+    """
+    data = {
+        'paginator': sender.__name__,
+        'phase': phase,
+        'duration': duration,
+        'number': kwargs.get('number'),
+        'querystring_key': kwargs.get('querystring_key'),
+        'rows': kwargs.get('rows'),
+    }
+    logger.debug(
+        'pagination phase=%(phase)s duration=%(duration).6f '
+        'paginator=%(paginator)s number=%(number)s '
+        'querystring_key=%(querystring_key)s rows=%(rows)s', data,
+        extra={'endless_pagination': data})
+
+
+def report_deep_page(sender, number, max_number, reason):
+    """Report that page *number* has been refused because it is too deep.
+
+    The *max_number* argument is the deepest page that can be retrieved, and
+    *reason* is the name of the exceeded limit ('number', 'offset' or
+    'time_budget').
+    """
+    data = {
+        'paginator': sender.__name__,
+        'number': number,
+        'max_number': max_number,
+        'reason': reason,
+    }
+    logger.warning(
+        'deep page refused number=%(number)s max_number=%(max_number)s '
+        'reason=%(reason)s paginator=%(paginator)s', data,
+        extra={'endless_pagination': data})
+    deep_page.send(
+        sender=sender, number=number, max_number=max_number, reason=reason)
+
+
+def record_phase(sender, phase, duration, **kwargs):
+    """Record the *phase* duration if timings are being collected.
+
+    Timings are collected in the current thread between the calls to
+    *start_recording* and *stop_recording*.
+    """
+    timings = getattr(_local, 'timings', None)
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0) + duration
+
+
+def start_recording():
+    """Start collecting the phases durations in the current thread."""
+    _local.timings = OrderedDict()
+
+
+def stop_recording():
+    """Stop collecting durations and return the ones collected so far.
+
+    The returned ordered dict maps phase names to their total duration.
+    """
+    timings = getattr(_local, 'timings', None)
+    _local.timings = None
+    return timings or OrderedDict()
+
+
+pagination_phase.connect(record_phase)
+
+
+def get_server_timing(timings):
+    """Return the ``Server-Timing`` header value for the given *timings*.
+
+    Durations are expressed in milliseconds.
+    """
+    return ', '.join(
+        '{0}{1};dur={2:.3f}'.format(
+            SERVER_TIMING_PREFIX, phase, duration * 1000)
+        for phase, duration in timings.items())
+
+
+class ServerTimingMiddleware(object):
+    """Expose the pagination phases durations in the response headers.
+
+    The total duration of each phase is added to the ``Server-Timing``
+    response header, e.g. ``endless-count;dur=1.250``. Durations are only
+    collected if ``settings.INSTRUMENTATION`` is True.
+    """
+
+    def process_request(self, request):
+        if settings.INSTRUMENTATION:
+            start_recording()
+
+    def process_response(self, request, response):
+        timings = stop_recording()
+        if timings:
+            value = get_server_timing(timings)
+            if response.has_header('Server-Timing'):
+                value = '{0}, {1}'.format(response['Server-Timing'], value)
+            response['Server-Timing'] = value
+        return response
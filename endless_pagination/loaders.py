@@ -1,10 +1,23 @@
 """Django Endless Pagination object loaders."""
 
 from __future__ import unicode_literals
+import weakref
 
 from django.core.exceptions import ImproperlyConfigured
+from django.template import (
+    loader,
+    Template,
+    TemplateDoesNotExist,
+)
+from django.template.loader_tags import BlockNode
 from django.utils.importlib import import_module
 
+try:
+    # Django >= 1.8 loaders are instantiated passing the template engine.
+    from django.template.loaders.base import Loader as BaseLoader
+except ImportError:
+    from django.template.loader import BaseLoader
+
 
 def load_object(path):
     """Return the Python object represented by dotted *path*."""
@@ -23,3 +36,104 @@ def load_object(path):
     except AttributeError:
         msg = 'Module %r does not define an object named %r'
         raise ImproperlyConfigured(msg % (module_name, object_name))
+
+
+# The separator between the template name and the fragment name, e.g. in
+# ``"myapp/entry_index.html#entries"``.
+FRAGMENT_SEPARATOR = '#'
+
+# Map compiled templates to their ``{fragment name: nodelist}`` lookups.
+_fragments_cache = weakref.WeakKeyDictionary()
+
+
+class FragmentTemplate(Template):
+    """A template only rendering the *nodelist* fragment of *template*.
+
+    The template is initialized as an empty one, so that attributes
+    required by the Django version in use are set, sharing the engine (in
+    Django >= 1.8) and the origin of *template*. The nodelist is then
+    replaced by the fragment one.
+    """
+
+    def __init__(self, template, nodelist, name=None):
+        kwargs = {}
+        engine = getattr(template, 'engine', None)
+        if engine is not None:
+            kwargs['engine'] = engine
+        super(FragmentTemplate, self).__init__(
+            '', origin=getattr(template, 'origin', None), name=name,
+            **kwargs)
+        self.nodelist = nodelist
+
+
+def _get_fragments(template):
+    """Return a dict mapping fragment names to nodelists in *template*.
+
+    Both ``{% endless_fragment %}`` and ``{% block %}`` nodes are included,
+    the former taking precedence over the latter. The lookup is built only
+    once for each compiled template.
+    """
+    try:
+        return _fragments_cache[template]
+    except KeyError:
+        pass
+    # Avoid circular imports.
+    from endless_pagination.templatetags.endless import FragmentNode
+    fragments = {}
+    for node_type in (BlockNode, FragmentNode):
+        for node in template.nodelist.get_nodes_by_type(node_type):
+            fragments[node.name] = node.nodelist
+    _fragments_cache[template] = fragments
+    return fragments
+
+
+def get_fragment(template, fragment_name):
+    """Return a template rendering only *fragment_name* of *template*.
+
+    Raise TemplateDoesNotExist if the fragment cannot be found.
+    """
+    name = FRAGMENT_SEPARATOR.join((template.name or '', fragment_name))
+    try:
+        nodelist = _get_fragments(template)[fragment_name]
+    except KeyError:
+        raise TemplateDoesNotExist(name)
+    return FragmentTemplate(template, nodelist, name=name)
+
+
+class FragmentLoader(BaseLoader):
+    """Template loader rendering only a named fragment of a template.
+
+    Template names like ``"myapp/entry_index.html#entries"`` are resolved to
+    the ``{% endless_fragment "entries" %}`` (or ``{% block entries %}``)
+    contents of the *myapp/entry_index.html* template, which is loaded
+    using the other configured template loaders. Add the loader to
+    *settings.TEMPLATE_LOADERS* to use fragments as page templates, e.g.::
+
+        TEMPLATE_LOADERS = (
+            'endless_pagination.loaders.FragmentLoader',
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        )
+    """
+    is_usable = True
+
+    def __init__(self, engine=None):
+        # The engine is None in Django < 1.8.
+        self.engine = engine
+
+    def load_template(self, template_name, template_dirs=None):
+        if FRAGMENT_SEPARATOR not in template_name:
+            raise TemplateDoesNotExist(template_name)
+        name, fragment_name = template_name.rsplit(FRAGMENT_SEPARATOR, 1)
+        engine = self.engine
+        if engine is None:
+            template, origin = loader.find_template(name, template_dirs)
+        else:
+            template, origin = engine.find_template(name, template_dirs)
+        if not hasattr(template, 'render'):
+            if engine is None:
+                template = loader.get_template_from_string(
+                    template, origin, name)
+            else:
+                template = Template(template, origin, name, engine=engine)
+        return get_fragment(template, fragment_name), None
@@ -9,6 +9,7 @@ from django.template import (
 from django.utils.encoding import iri_to_uri
 
 from endless_pagination import (
+    instrumentation,
     loaders,
     settings,
     utils,
@@ -36,7 +37,8 @@ class EndlessPage(utils.UnicodeMixin):
 
     def __init__(
             self, request, number, current_number, total_number,
-            querystring_key, label=None, default_number=1, override_path=None):
+            querystring_key, label=None, default_number=1, override_path=None,
+            params=None):
         self._request = request
         self.number = number
         self.label = utils.text(number) if label is None else label
@@ -48,7 +50,7 @@ class EndlessPage(utils.UnicodeMixin):
 
         self.url = utils.get_querystring_for_page(
             request, number, self.querystring_key,
-            default_number=default_number)
+            default_number=default_number, params=params)
         path = iri_to_uri(override_path or request.path)
         self.path = '{0}{1}'.format(path, self.url)
 
@@ -68,6 +70,16 @@ class EndlessPage(utils.UnicodeMixin):
         return template.render(RequestContext(self._request, context))
 
 
+def _describe_page_list(result, page_list):
+    """Return the instrumentation data for the rendered *page_list*."""
+    page = page_list._page
+    return {
+        'sender': page.paginator.__class__,
+        'number': page.number,
+        'querystring_key': page_list._querystring_key,
+    }
+
+
 class PageList(utils.UnicodeMixin):
     """A sequence of endless pages."""
 
@@ -97,6 +109,7 @@ class PageList(utils.UnicodeMixin):
             label=label,
             default_number=self._default_number,
             override_path=self._override_path,
+            params=self._page.paginator.get_querystring_params(),
         )
 
     def __getitem__(self, value):
@@ -121,6 +134,7 @@ class PageList(utils.UnicodeMixin):
         for i in range(len(self)):
             yield self[i + 1]
 
+    @instrumentation.instrument('page_list', _describe_page_list)
     def __unicode__(self):
         """Return a rendered Digg-style pagination (by default).
 
@@ -1,18 +1,216 @@
 """Customized Django paginators."""
 
 from __future__ import unicode_literals
+import bisect
+from contextlib import contextmanager
+import datetime
+from functools import (
+    total_ordering,
+    wraps,
+)
+import hashlib
+import heapq
+from itertools import islice
+import json
 from math import ceil
+from multiprocessing.pool import ThreadPool
+import pickle
+import struct
+import threading
+import time
+import timeit
+import uuid
+import zlib
 
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import (
+    ImproperlyConfigured,
+    ValidationError,
+)
 from django.core.paginator import (
     EmptyPage,
     Page,
     PageNotAnInteger,
     Paginator,
 )
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import (
+    connections,
+    DEFAULT_DB_ALIAS,
+)
+from django.db.models import Q
+from django.db.models.fields import FieldDoesNotExist
+from django.db.models.query import RawQuerySet
+from django.utils import six
+
+from endless_pagination import (
+    files,
+    hydration,
+    instrumentation,
+    routing,
+    settings,
+    utils,
+)
+
+
+# The cache key prefix used to store the offsets found to be slow.
+SLOW_OFFSET_CACHE_PREFIX = 'endless_pagination:slow_offset:'
+# The cache key prefix used to store the total number of objects.
+COUNT_CACHE_PREFIX = 'endless_pagination:count:'
+# The lock preventing concurrent count refreshes is released after this
+# number of seconds even if the refreshing process does not release it.
+COUNT_LOCK_TIMEOUT = 60
+# When no count is cached and another process holds the lock, wait at most
+# this number of seconds for its count, polling the cache at this interval,
+# before counting the objects without the lock.
+COUNT_LOCK_WAIT = 2
+COUNT_LOCK_POLL_INTERVAL = 0.05
+# The cache key prefix used to store snapshots of primary keys.
+SNAPSHOT_CACHE_PREFIX = 'endless_pagination:snapshot:'
+# The suffix added to the querystring key to get the snapshot token key.
+SNAPSHOT_TOKEN_SUFFIX = '_snapshot'
+# The struct format of packed integer primary keys, given their number.
+PKS_FORMAT = '<{0}q'
+# The suffix added to the querystring key to get the merge cursor key.
+CURSOR_SUFFIX = '_cursor'
+# The salt used to sign merge cursors.
+CURSOR_SALT = 'endless_pagination.paginators.MergedPaginator'
+# The salt used to sign search cursors.
+SEARCH_CURSOR_SALT = 'endless_pagination.paginators.SearchPaginator'
+
+# The thread pools used to query shards concurrently, by size, created when
+# needed.
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(size):
+    """Return the thread pool of *size* threads used to query shards."""
+    with _pools_lock:
+        pool = _pools.get(size)
+        if pool is None:
+            pool = _pools[size] = ThreadPool(size)
+    return pool
+
+
+def close_connections(func):
+    """Decorate *func* so that database connections are closed on return.
+
+    Pool threads never receive the *request_finished* signal, so the
+    connections opened by each task are closed when the task completes.
+    Connections are thread-local: only the ones of the current thread are
+    closed.
+    """
+    @wraps(func)
+    def decorated(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            for connection in connections.all():
+                connection.close()
+    return decorated
+
+
+def parallel_map(func, items):
+    """Return the list of results of calling *func* for each item.
+
+    Calls are executed concurrently using a pool of
+    ``settings.SHARD_POOL_SIZE`` threads, if the setting is not 0 and there
+    are several items. Queries executed in pool threads use their own
+    database connections, closed after each call, and therefore run outside
+    the transaction of the current request.
+    """
+    items = list(items)
+    size = settings.SHARD_POOL_SIZE
+    if size and len(items) > 1:
+        return get_pool(size).map(close_connections(func), items)
+    return [func(item) for item in items]
+
+
+class PageTooDeep(EmptyPage):
+    """The requested page exceeds the configured deep page limits.
+
+    The *max_number* attribute is the deepest page that can be retrieved,
+    and *reason* is the name of the exceeded limit.
+    """
+
+    def __init__(self, message, max_number, reason):
+        super(PageTooDeep, self).__init__(message)
+        self.max_number = max_number
+        self.reason = reason
+
+
+def _describe_page(page, paginator, *args):
+    """Return the instrumentation data for the given *page*."""
+    return {
+        'sender': paginator.__class__,
+        'number': page.number,
+        'rows': instrumentation.count_rows(page.object_list),
+    }
+
+
+def _describe_count(count, paginator):
+    """Return the instrumentation data for the given *count*."""
+    return {'sender': paginator.__class__, 'rows': count}
+
+
+def get_sort_field(queryset, ordering=None):
+    """Return the ``(field, descending)`` tuple used to sort *queryset*.
+
+    The field is the first one in *ordering* or, if not provided, in the
+    ordering of the queryset. The primary key is used if the queryset is not
+    ordered.
+    """
+    if ordering is None:
+        ordering = (
+            queryset.query.order_by or queryset.model._meta.ordering or
+            ['pk'])[0]
+    return ordering.lstrip('-'), ordering.startswith('-')
+
+
+def is_nullable_field(model, name):
+    """Return True if the field *name* of *model* can be NULL.
+
+    Lookups spanning relationships (e.g. ``author__name``) are nullable if
+    any of the fields they span is. Return False if the field is not found
+    in *model*, e.g. if it is a reverse relationship.
+    """
+    for part in name.split('__'):
+        if part == 'pk':
+            field = model._meta.pk
+        else:
+            try:
+                field = model._meta.get_field(part)
+            except FieldDoesNotExist:
+                return False
+        if field.null:
+            return True
+        rel = getattr(field, 'rel', None)
+        if rel is None:
+            return False
+        model = rel.to
+    return False
+
+
+def sort_queryset(queryset, field, descending):
+    """Order *queryset* by *field*, using the primary key to break ties."""
+    if descending:
+        return queryset.order_by('-' + field, '-pk')
+    return queryset.order_by(field, 'pk')
 
 
 class CustomPage(Page):
-    """Handle different number of items on the first page."""
+    """Handle different number of items on the first page.
+
+    A page can also include the objects of several subsequent pages: in this
+    case *first_number* is the number of the first page included, while
+    *number* is the number of the last one.
+    """
+
+    def __init__(self, object_list, number, paginator, first_number=None):
+        super(CustomPage, self).__init__(object_list, number, paginator)
+        self.first_number = number if first_number is None else first_number
 
     def start_index(self):
         """Return the 1-based index of the first item on this page."""
@@ -20,10 +218,7 @@ class CustomPage(Page):
         # Special case, return zero if no items.
         if paginator.count == 0:
             return 0
-        elif self.number == 1:
-            return 1
-        return (
-            (self.number - 2) * paginator.per_page + paginator.first_page + 1)
+        return paginator.get_offset(self.first_number) + 1
 
     def end_index(self):
         """Return the 1-based index of the last item on this page."""
@@ -45,27 +240,247 @@ class BasePaginator(Paginator):
             self.first_page = kwargs.pop('first_page')
         else:
             self.first_page = per_page
+        # The current request and querystring key, if known.
+        self.request = kwargs.pop('request', None)
+        self.querystring_key = kwargs.pop(
+            'querystring_key', settings.PAGE_LABEL)
+        # The database alias explicitly requested for pagination queries.
+        self.database = kwargs.pop('database', None)
         super(BasePaginator, self).__init__(object_list, per_page, **kwargs)
 
+    def get_querystring_params(self):
+        """Return a dict of parameters to be included in the page links."""
+        return {}
+
+    def get_fingerprint(self):
+        """Return a string identifying the paginated query, or None.
+
+        See *endless_pagination.utils.get_fingerprint*.
+        """
+        return utils.get_fingerprint(self.object_list)
+
+    def get_database(self, page=False):
+        """Return the database alias used to count objects, or None.
+
+        If *page* is True, return the alias used to retrieve the objects in
+        the page, which is None unless ``settings.REPLICA_PAGES`` is True.
+        None means the database of the queryset is used.
+        See *endless_pagination.routing.get_database*.
+        """
+        if page and not settings.REPLICA_PAGES:
+            return None
+        return routing.get_database(self.request, self.database)
+
+    def _get_page(self, *args, **kwargs):
+        """Return an instance of a single page.
+
+        Subclasses can override this method to use a custom page class.
+        """
+        return CustomPage(*args, **kwargs)
+
     def get_current_per_page(self, number):
         return self.first_page if number == 1 else self.per_page
 
+    def get_offset(self, number):
+        """Return the 0-based index of the first item on page *number*."""
+        if number == 1:
+            return 0
+        return (number - 2) * self.per_page + self.first_page
+
+    def get_number(self, offset):
+        """Return the number of the page including the object at *offset*."""
+        if offset < self.first_page:
+            return 1
+        return (offset - self.first_page) // self.per_page + 2
+
+    def get_max_number(self):
+        """Return the deepest page number that can be retrieved.
+
+        Return a ``(max_number, reason)`` tuple, where *reason* is the name of
+        the most restrictive limit: 'number' for
+        ``settings.DEEP_PAGE_MAX_NUMBER``, 'offset' for
+        ``settings.DEEP_PAGE_MAX_OFFSET`` and 'time_budget' if a shallower
+        page was found to exceed ``settings.DEEP_PAGE_TIME_BUDGET``.
+        Return ``(None, None)`` if there are no limits.
+        """
+        limits = []
+        if settings.DEEP_PAGE_MAX_NUMBER is not None:
+            limits.append((settings.DEEP_PAGE_MAX_NUMBER, 'number'))
+        if settings.DEEP_PAGE_MAX_OFFSET is not None:
+            limits.append(
+                (self.get_number(settings.DEEP_PAGE_MAX_OFFSET), 'offset'))
+        slow_offset = self._get_slow_offset()
+        if slow_offset is not None:
+            limits.append((self.get_number(slow_offset - 1), 'time_budget'))
+        return min(limits) if limits else (None, None)
+
+    def validate_range(self, first_number, last_number):
+        """Validate the given range of page numbers.
+
+        Return the validated ``(first_number, last_number)`` tuple.
+        Raise *PageTooDeep* if the last page exceeds the deep page limits.
+        """
+        first_number = self.validate_number(first_number)
+        last_number = self.validate_number(last_number)
+        if first_number > last_number:
+            raise EmptyPage('That page range is empty')
+        max_number, reason = self.get_max_number()
+        if max_number is not None and last_number > max_number:
+            instrumentation.report_deep_page(
+                self.__class__, last_number, max_number, reason)
+            raise PageTooDeep(
+                'That page is too deep', max_number, reason)
+        return first_number, last_number
+
+    def _get_slow_offset_key(self):
+        """Return the cache key of the slow offset, or None."""
+        if settings.DEEP_PAGE_TIME_BUDGET is None:
+            return None
+        fingerprint = self.get_fingerprint()
+        if fingerprint is not None:
+            return SLOW_OFFSET_CACHE_PREFIX + fingerprint
+
+    def _get_slow_offset(self):
+        """Return the shallowest offset found to exceed the time budget."""
+        key = self._get_slow_offset_key()
+        if key is not None:
+            return cache.get(key)
+
+    def _get_objects(self, bottom, top):
+        """Return the objects from *bottom* to *top* (excluded).
+
+        If the queryset can be hydrated from the cache (see
+        *endless_pagination.hydration*), only the primary keys are retrieved
+        using the slice, and the objects are then retrieved from the cache.
+        """
+        object_list = routing.route(
+            self.object_list, self.get_database(page=True))
+        model = getattr(object_list, 'model', None)
+        if model is None or not hydration.is_hydratable(object_list):
+            return object_list[bottom:top]
+        pks = list(object_list.values_list('pk', flat=True)[bottom:top])
+        return hydration.hydrate(object_list, pks)
+
+    def _get_slice(self, bottom, top):
+        """Return the objects from *bottom* to *top* (excluded).
+
+        If ``settings.DEEP_PAGE_TIME_BUDGET`` is set, querysets are evaluated
+        and, if retrieving objects takes longer than the budget, *bottom* is
+        stored in the cache so that this offset and deeper ones are no
+        longer retrieved. Querysets are also evaluated if
+        ``settings.INSTRUMENTATION`` is True, so that the duration of the
+        *page* phase includes the query retrieving the objects.
+        """
+        key = self._get_slow_offset_key()
+        if key is None or not bottom:
+            objects = self._get_objects(bottom, top)
+            if settings.INSTRUMENTATION:
+                return list(objects)
+            return objects
+        start = timeit.default_timer()
+        objects = list(self._get_objects(bottom, top))
+        if timeit.default_timer() - start > settings.DEEP_PAGE_TIME_BUDGET:
+            slow_offset = cache.get(key)
+            if slow_offset is None or bottom < slow_offset:
+                cache.set(key, bottom)
+        return objects
+
 
 class DefaultPaginator(BasePaginator):
     """The default paginator used by this application."""
 
+    @instrumentation.instrument('page', _describe_page)
     def page(self, number):
-        number = self.validate_number(number)
-        if number == 1:
-            bottom = 0
-        else:
-            bottom = ((number - 2) * self.per_page + self.first_page)
-        top = bottom + self.get_current_per_page(number)
+        return self.page_window(number, number)
+
+    def page_window(self, first_number, last_number):
+        """Return a page including objects from *first_number* page to
+        *last_number* page (included).
+
+        Objects are retrieved using a single slice of the object list.
+        """
+        first_number, last_number = self.validate_range(
+            first_number, last_number)
+        bottom = self.get_offset(first_number)
+        top = (
+            self.get_offset(last_number) +
+            self.get_current_per_page(last_number))
         if top + self.orphans >= self.count:
             top = self.count
-        return CustomPage(self.object_list[bottom:top], number, self)
+        return self._get_page(
+            self._get_slice(bottom, top), last_number, self,
+            first_number=first_number)
+
+    def _get_count(self):
+        if self._count is None:
+            self._count = self._get_cached_count()
+        return self._count
+    count = property(_get_count)
+
+    def _get_cached_count(self):
+        """Return the total number of objects, using the count cache.
+
+        If ``settings.COUNT_CACHE_SOFT_TTL`` is set, the counts of querysets
+        are cached using the query fingerprint as key. Cached counts are fresh
+        for the soft TTL, and then stale until the hard TTL expires. When a
+        count is stale or missing, only the process acquiring the cache lock
+        counts the objects: when the count is stale, the others keep using
+        it, so that concurrent requests (e.g. for the number of pages) are
+        never blocked by the same expensive query; when it is missing, the
+        others wait briefly for it (see *_wait_for_count*).
+        """
+        soft_ttl = settings.COUNT_CACHE_SOFT_TTL
+        if soft_ttl is None:
+            return self._count_objects()
+        fingerprint = self.get_fingerprint()
+        if fingerprint is None:
+            return self._count_objects()
+        key = COUNT_CACHE_PREFIX + fingerprint
+        lock_key = key + ':lock'
+        cached = cache.get(key)
+        if cached is not None and time.time() < cached[1]:
+            return cached[0]
+        if not cache.add(lock_key, True, COUNT_LOCK_TIMEOUT):
+            if cached is not None:
+                return cached[0]
+            return self._wait_for_count(key)
+        try:
+            count = self._count_objects()
+            hard_ttl = max(settings.COUNT_CACHE_HARD_TTL, soft_ttl)
+            cache.set(key, (count, time.time() + soft_ttl), hard_ttl)
+        finally:
+            cache.delete(lock_key)
+        return count
+
+    def _wait_for_count(self, key):
+        """Return the count cached in *key* by the process holding the lock.
+
+        The cache is polled for up to *COUNT_LOCK_WAIT* seconds: if the count
+        is still missing, e.g. because the process holding the lock died,
+        the objects are counted without caching the result.
+        """
+        deadline = time.time() + COUNT_LOCK_WAIT
+        while time.time() < deadline:
+            time.sleep(COUNT_LOCK_POLL_INTERVAL)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached[0]
+        return self._count_objects()
+
+    @instrumentation.instrument('count', _describe_count)
+    def _count_objects(self):
+        """Return the total number of objects, across all pages.
+
+        Querysets are counted using the database returned by
+        *get_database*.
+        """
+        object_list = routing.route(self.object_list, self.get_database())
+        if object_list is self.object_list:
+            return super(DefaultPaginator, self)._get_count()
+        return object_list.count()
 
     def _get_num_pages(self):
+        # The number of pages is based on the (possibly cached) count.
         if self._num_pages is None:
             if self.count == 0 and not self.allow_empty_first_page:
                 self._num_pages = 0
@@ -88,28 +503,37 @@ class LazyPaginator(BasePaginator):
             raise EmptyPage('That page number is less than 1')
         return number
 
+    @instrumentation.instrument('page', _describe_page)
     def page(self, number):
-        number = self.validate_number(number)
-        current_per_page = self.get_current_per_page(number)
-        if number == 1:
-            bottom = 0
-        else:
-            bottom = ((number - 2) * self.per_page + self.first_page)
-        top = bottom + current_per_page
+        return self.page_window(number, number)
+
+    def page_window(self, first_number, last_number):
+        """Return a page including objects from *first_number* page to
+        *last_number* page (included).
+
+        Objects are retrieved using a single slice of the object list.
+        """
+        first_number, last_number = self.validate_range(
+            first_number, last_number)
+        bottom = self.get_offset(first_number)
+        last_bottom = self.get_offset(last_number)
+        top = last_bottom + self.get_current_per_page(last_number)
         # Retrieve more objects to check if there is a next page.
-        objects = list(self.object_list[bottom:top + self.orphans + 1])
+        objects = list(self._get_slice(bottom, top + self.orphans + 1))
         objects_count = len(objects)
-        if objects_count > (current_per_page + self.orphans):
+        if objects_count > (top - bottom + self.orphans):
             # If another page is found, increase the total number of pages.
-            self._num_pages = number + 1
+            self._num_pages = last_number + 1
             # In any case,  return only objects for this page.
-            objects = objects[:current_per_page]
-        elif (number != 1) and (objects_count <= self.orphans):
+            objects = objects[:top - bottom]
+        elif (last_number != 1) and (
+                objects_count - (last_bottom - bottom) <= self.orphans):
             raise EmptyPage('That page contains no results')
         else:
             # This is the last page.
-            self._num_pages = number
-        return CustomPage(objects, number, self)
+            self._num_pages = last_number
+        return self._get_page(
+            objects, last_number, self, first_number=first_number)
 
     def _get_count(self):
         raise NotImplementedError
@@ -125,3 +549,812 @@ class LazyPaginator(BasePaginator):
         raise NotImplementedError
 
     page_range = property(_get_page_range)
+
+
+def get_pks_format(number):
+    """Return the struct format of *number* packed integer primary keys."""
+    return str(PKS_FORMAT.format(number))
+
+
+def pack_pks(pks):
+    """Return the given primary keys as compressed bytes.
+
+    Integer keys are stored as little-endian signed 64-bit integers, so that
+    snapshots can be shared by processes on different platforms. Other keys
+    are pickled.
+    """
+    data = None
+    if all(isinstance(pk, six.integer_types) for pk in pks):
+        try:
+            data = b'q' + struct.pack(get_pks_format(len(pks)), *pks)
+        except struct.error:
+            pass
+    if data is None:
+        data = b'p' + pickle.dumps(list(pks), 2)
+    return zlib.compress(data)
+
+
+def unpack_pks(data):
+    """Return the list of primary keys packed using *pack_pks*."""
+    data = zlib.decompress(data)
+    if data[:1] == b'p':
+        return pickle.loads(data[1:])
+    number = (len(data) - 1) // struct.calcsize(get_pks_format(1))
+    return list(struct.unpack(get_pks_format(number), data[1:]))
+
+
+class SnapshotPaginator(DefaultPaginator):
+    """Paginate a snapshot of the queryset primary keys.
+
+    The first time the queryset is paginated, its ordered primary keys (up to
+    ``settings.SNAPSHOT_MAX_SIZE``) are stored in the cache, identified by a
+    token which is then included in the page links. Subsequent pages only
+    retrieve the objects whose primary keys are in the page, so that results
+    do not shift when objects are added or removed, and the cost of
+    retrieving a page does not depend on its depth.
+
+    If the queryset includes more objects, the snapshot is marked as
+    *truncated*: the total number of objects is then counted as usual, and
+    the objects past the snapshot are retrieved using offsets.
+
+    The snapshot token is read from the *request* passed to the paginator,
+    from the same data as the page number.
+    Object lists that are not querysets are paginated as usual.
+    """
+
+    def __init__(self, object_list, per_page, **kwargs):
+        super(SnapshotPaginator, self).__init__(
+            object_list, per_page, **kwargs)
+        self.token = None
+        self.truncated = False
+        self._pks = None
+
+    @property
+    def token_key(self):
+        """The querystring key of the snapshot token."""
+        return self.querystring_key + SNAPSHOT_TOKEN_SUFFIX
+
+    def get_querystring_params(self):
+        if self.get_pks() is None:
+            return {}
+        return {self.token_key: self.token}
+
+    def get_pks(self):
+        """Return the snapshot primary keys.
+
+        Load the snapshot identified by the token in the request, or create
+        a new one. Return None if the object list is not a queryset.
+        """
+        if self._pks is None:
+            fingerprint = self.get_fingerprint()
+            if fingerprint is None:
+                return None
+            token = None
+            if self.request is not None:
+                token = utils.get_querystring_value(
+                    self.request, self.token_key)
+            if token:
+                snapshot = cache.get(SNAPSHOT_CACHE_PREFIX + token)
+                # Ignore snapshots of other querysets.
+                if snapshot is not None and snapshot[0] == fingerprint:
+                    self.token = token
+                    self._pks = unpack_pks(snapshot[1])
+                    self.truncated = snapshot[2]
+                    return self._pks
+            queryset = routing.route(
+                self.object_list, self.get_database(page=True))
+            queryset = queryset.values_list('pk', flat=True)
+            # Retrieve an additional key to find out if there are more.
+            max_size = settings.SNAPSHOT_MAX_SIZE
+            self._pks = list(queryset[:max_size + 1])
+            self.truncated = len(self._pks) > max_size
+            del self._pks[max_size:]
+            self.token = uuid.uuid4().hex
+            cache.set(
+                SNAPSHOT_CACHE_PREFIX + self.token,
+                (fingerprint, pack_pks(self._pks), self.truncated),
+                settings.SNAPSHOT_TIMEOUT)
+        return self._pks
+
+    def _get_cached_count(self):
+        pks = self.get_pks()
+        if pks is None or self.truncated:
+            return super(SnapshotPaginator, self)._get_cached_count()
+        return len(pks)
+
+    def _get_slice(self, bottom, top):
+        """Return the objects whose primary keys are in the given window.
+
+        Objects deleted after the snapshot was taken are skipped. Objects
+        past the end of a truncated snapshot are retrieved using offsets.
+        """
+        pks = self.get_pks()
+        if pks is None or (self.truncated and bottom >= len(pks)):
+            return super(SnapshotPaginator, self)._get_slice(bottom, top)
+        objects = []
+        window = pks[bottom:top]
+        if window:
+            queryset = routing.route(
+                self.object_list, self.get_database(page=True))
+            objects = hydration.hydrate(queryset, window)
+        if self.truncated and top > len(pks):
+            objects = list(objects) + list(
+                super(SnapshotPaginator, self)._get_slice(len(pks), top))
+        return objects
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """JSON encoder preserving the microseconds of dates and times."""
+
+    def default(self, o):
+        if isinstance(o, (datetime.date, datetime.time)):
+            return o.isoformat()
+        return super(CursorEncoder, self).default(o)
+
+
+class CursorSerializer(object):
+    """Serialize merge cursors as JSON, for *django.core.signing*."""
+
+    def dumps(self, obj):
+        return json.dumps(
+            obj, cls=CursorEncoder, separators=(',', ':')).encode('latin-1')
+
+    def loads(self, data):
+        return json.loads(data.decode('latin-1'))
+
+
+@total_ordering
+class Descending(object):
+    """Wrap a value so that greater values are sorted first."""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+class MergedPaginator(LazyPaginator):
+    """Paginate several querysets as a single ordered sequence of objects.
+
+    The object list is a sequence of querysets sharing a sort field, e.g.
+    ``[comments, uploads, likes]`` all ordered by ``-created``: the sort
+    field is the first one in the *ordering* keyword argument or, if not
+    provided, in the ordering of the first queryset.
+
+    Pages are retrieved using keyset pagination: for each page, at most
+    *per_page* + 1 objects following the source cursor are retrieved from
+    each queryset, and the results are merged. The cursors of the next page
+    are signed and included in the next page link (see *show_more*), so
+    pages after the first one can only be retrieved following these links.
+    As for lazy pagination, the total number of pages is unknown.
+
+    NULL values cannot be compared when merging objects, nor used in the
+    cursor lookups: *ImproperlyConfigured* is raised if the sort field is
+    nullable in any of the querysets.
+    """
+
+    def __init__(self, object_list, per_page, **kwargs):
+        ordering = kwargs.pop('ordering', None)
+        super(MergedPaginator, self).__init__(
+            list(object_list), per_page, **kwargs)
+        self.field, self.descending = get_sort_field(
+            self.object_list[0], ordering)
+        for queryset in self.object_list:
+            if is_nullable_field(queryset.model, self.field):
+                msg = '{0}: the sort field {1!r} of {2} can be NULL.'
+                raise ImproperlyConfigured(msg.format(
+                    self.__class__.__name__, str(self.field),
+                    queryset.model.__name__))
+        self.next_cursors = None
+
+    @property
+    def cursor_key(self):
+        """The querystring key of the merge cursors."""
+        return self.querystring_key + CURSOR_SUFFIX
+
+    def get_querystring_params(self):
+        if self.next_cursors is None:
+            return {}
+        data = {'number': self._num_pages, 'cursors': self.next_cursors}
+        cursor = signing.dumps(
+            data, salt=CURSOR_SALT, serializer=CursorSerializer,
+            compress=True)
+        return {self.cursor_key: cursor}
+
+    def get_cursors(self, number):
+        """Return the list of source cursors for page *number*.
+
+        A cursor is None if no objects have been retrieved from the source,
+        or a ``[value, pk]`` list identifying the last object retrieved.
+        Raise *EmptyPage* if the cursors in the request are not valid.
+        """
+        if number == 1:
+            return [None] * len(self.object_list)
+        cursor = None
+        if self.request is not None:
+            cursor = utils.get_querystring_value(
+                self.request, self.cursor_key)
+        if not cursor:
+            raise EmptyPage('That page requires a cursor')
+        try:
+            data = signing.loads(
+                cursor, salt=CURSOR_SALT, serializer=CursorSerializer)
+        except signing.BadSignature:
+            raise EmptyPage('That page cursor is not valid')
+        cursors = data.get('cursors')
+        if data.get('number') != number or (
+                len(cursors or ()) != len(self.object_list)):
+            raise EmptyPage('That page cursor is not valid')
+        return cursors
+
+    def _get_candidates(self, index, cursor, limit):
+        """Return the next *limit* objects of source *index*.
+
+        Objects are returned as tuples that can be merged, whose last item
+        is the object.
+        """
+        field = self.field
+        queryset = sort_queryset(
+            self.object_list[index], field, self.descending)
+        lookup = '__lt' if self.descending else '__gt'
+        if cursor is not None:
+            value, pk = cursor
+            queryset = queryset.filter(
+                Q(**{field + lookup: value}) |
+                Q(**{field: value, 'pk' + lookup: pk}))
+        wrap = Descending if self.descending else (lambda value: value)
+        return [
+            (wrap(getattr(obj, field)), index, wrap(obj.pk), obj)
+            for obj in queryset[:limit]
+        ]
+
+    def page_window(self, first_number, last_number):
+        """Return the page *last_number*.
+
+        Page ranges are not supported: *EmptyPage* is raised if
+        *first_number* and *last_number* are different.
+        """
+        if first_number != last_number:
+            raise EmptyPage('Page ranges are not supported')
+        number = self.validate_range(first_number, last_number)[1]
+        cursors = self.get_cursors(number)
+        per_page = self.get_current_per_page(number)
+        limit = per_page + self.orphans + 1
+        try:
+            candidates = [
+                self._get_candidates(index, cursor, limit)
+                for index, cursor in enumerate(cursors)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise EmptyPage('That page cursor is not valid')
+        items = list(islice(heapq.merge(*candidates), limit))
+        if len(items) > per_page + self.orphans:
+            # If another page is found, increase the total number of pages.
+            self._num_pages = number + 1
+            items = items[:per_page]
+        elif number != 1 and not items:
+            raise EmptyPage('That page contains no results')
+        else:
+            # This is the last page.
+            self._num_pages = number
+        next_cursors = list(cursors)
+        for _, index, _, obj in items:
+            next_cursors[index] = [getattr(obj, self.field), obj.pk]
+        if self._num_pages > number:
+            self.next_cursors = next_cursors
+        return self._get_page([item[-1] for item in items], number, self)
+
+
+class ShardedPaginator(DefaultPaginator):
+    """Paginate a list of objects sharded over several databases.
+
+    The object list is a sequence of querysets, one for each database alias,
+    sorted by the same field: the sort field is the first one in the
+    *ordering* keyword argument or, if not provided, in the ordering of the
+    first queryset.
+
+    The shards are queried using *parallel_map*: the total number of objects
+    is the sum of the shard counts, and the objects of a page are retrieved
+    merging the first objects of each shard, up to the end of the page.
+    Therefore retrieving page *n* fetches up to *n* pages of objects from
+    each shard: use the deep page limits (see *get_max_number*) to bound
+    the cost of deep pages.
+    """
+
+    def __init__(self, object_list, per_page, **kwargs):
+        ordering = kwargs.pop('ordering', None)
+        super(ShardedPaginator, self).__init__(
+            list(object_list), per_page, **kwargs)
+        self.field, self.descending = get_sort_field(
+            self.object_list[0], ordering)
+
+    def get_fingerprint(self):
+        """Return a string identifying the queries of all the shards."""
+        fingerprints = [utils.get_fingerprint(qs) for qs in self.object_list]
+        if None in fingerprints:
+            return None
+        data = '|'.join(fingerprints).encode('utf-8')
+        return 'sharded:' + hashlib.md5(data).hexdigest()
+
+    @instrumentation.instrument('count', _describe_count)
+    def _count_objects(self):
+        """Return the total number of objects, across all the shards."""
+        return sum(parallel_map(lambda qs: qs.count(), self.object_list))
+
+    def _get_objects(self, bottom, top):
+        """Return the objects from *bottom* to *top* (excluded).
+
+        The first *top* objects are retrieved from each shard and merged.
+        """
+        field, descending = self.field, self.descending
+        wrap = Descending if descending else (lambda value: value)
+
+        def get_candidates(args):
+            index, queryset = args
+            queryset = sort_queryset(queryset, field, descending)
+            return [
+                (wrap(getattr(obj, field)), wrap(obj.pk), index, obj)
+                for obj in queryset[:top]
+            ]
+
+        candidates = parallel_map(
+            get_candidates, enumerate(self.object_list))
+        items = islice(heapq.merge(*candidates), bottom, top)
+        return [item[-1] for item in items]
+
+
+class KeyView(object):
+    """A read-only sequence of the sort keys of the objects in *items*.
+
+    Keys are computed when accessed, so that *bisect* can be used on sorted
+    object lists without building the whole list of keys.
+    """
+
+    __slots__ = ('items', 'key', 'reverse')
+
+    def __init__(self, items, key, reverse):
+        self.items = items
+        self.key = key
+        self.reverse = reverse
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        value = self.key(self.items[index])
+        return Descending(value) if self.reverse else value
+
+
+class KeysetPage(CustomPage):
+    """A page of objects starting at *offset*, not at a page boundary.
+
+    The page *number* is the number of the page including the first object.
+    The *next_key* attribute is the sort key of the last object in the page,
+    used to retrieve the following page, or None if there are no more
+    objects.
+    """
+
+    def __init__(self, object_list, number, paginator, offset, next_key):
+        super(KeysetPage, self).__init__(object_list, number, paginator)
+        self.offset = offset
+        self.next_key = next_key
+
+    def has_next(self):
+        return self.next_key is not None
+
+    def start_index(self):
+        """Return the 1-based index of the first item on this page."""
+        return self.offset + 1
+
+    def end_index(self):
+        """Return the 1-based index of the last item on this page."""
+        return self.offset + len(self.object_list)
+
+
+class InMemorySortedPaginator(DefaultPaginator):
+    """Paginate an unsorted in-memory sequence of objects.
+
+    Objects are sorted using the *key* callable and the *reverse* flag
+    keyword arguments, as done by *sorted*. Shallow pages are retrieved using
+    *heapq.nsmallest* (or *heapq.nlargest*), that only sorts the objects up
+    to the end of the page. The whole sequence is sorted only when the end
+    of the requested page is beyond *partial_sort_ratio* of the objects.
+
+    The sorted prefix is kept by the paginator instance, so that it is
+    reused for the other pages retrieved in the same request (e.g. by
+    *page_window*), but not across requests: to avoid
+    sorting the sequence at each request, sort and store it once, and pass
+    it as presorted.
+
+    If the *presorted* keyword argument is True, the sequence is considered
+    already sorted and it is never sorted again. Pages following a key
+    value can be retrieved using keyset pagination (see *page_after*).
+    """
+
+    # The maximum fraction of objects sorted using a partial sort. With
+    # CPython, *heapq.nsmallest* is faster than *sorted* only when selecting
+    # up to about 5% of the objects: beyond that, sorting everything is
+    # cheaper, and also sorts the objects of all the following pages.
+    partial_sort_ratio = 0.05
+
+    def __init__(self, object_list, per_page, **kwargs):
+        self.key = kwargs.pop('key', None) or (lambda obj: obj)
+        self.reverse = kwargs.pop('reverse', False)
+        self.presorted = kwargs.pop('presorted', False)
+        super(InMemorySortedPaginator, self).__init__(
+            object_list, per_page, **kwargs)
+        # The sorted prefix of the object list, and whether it is complete.
+        self._sorted = self.object_list if self.presorted else []
+        self._sorted_all = self.presorted
+
+    def get_sorted(self, top):
+        """Return a sorted sequence including at least the first *top* objects.
+
+        The sorted prefix is only extended when *top* exceeds its length: in
+        this case at least twice the objects previously sorted are sorted
+        again, so that paging forward does not sort the same prefix at each
+        page, but never more than *partial_sort_ratio* of the objects. The
+        whole sequence is sorted only if *top* exceeds that fraction.
+        """
+        if self._sorted_all or top <= len(self._sorted):
+            return self._sorted
+        limit = int(len(self.object_list) * self.partial_sort_ratio)
+        if top > limit:
+            self._sorted = sorted(
+                self.object_list, key=self.key, reverse=self.reverse)
+            self._sorted_all = True
+        else:
+            size = min(max(top, 2 * len(self._sorted)), limit)
+            select = heapq.nlargest if self.reverse else heapq.nsmallest
+            self._sorted = select(size, self.object_list, key=self.key)
+        return self._sorted
+
+    def get_offset_for_key(self, value):
+        """Return the offset of the first object sorted after key *value*.
+
+        If the sequence is sorted, the position is found using *bisect*.
+        Otherwise, the objects sorted before or at *value* are counted,
+        without sorting the sequence.
+        """
+        if self._sorted_all:
+            keys = KeyView(self._sorted, self.key, self.reverse)
+            if self.reverse:
+                value = Descending(value)
+            return bisect.bisect_right(keys, value)
+        return len(self.object_list) - len(self._get_objects_after(value))
+
+    def _get_objects_after(self, value):
+        """Return the list of the objects sorted after key *value*.
+
+        Objects are returned in their original order.
+        """
+        key = self.key
+        if self.reverse:
+            return [obj for obj in self.object_list if key(obj) < value]
+        return [obj for obj in self.object_list if value < key(obj)]
+
+    def page_after(self, value):
+        """Return the page of the *per_page* objects sorted after key *value*.
+
+        The page starts exactly at the first object whose key follows
+        *value*, and its *next_key* attribute is the key to be passed to
+        retrieve the following page, or None if this is the last one (see
+        *KeysetPage*). Keys are expected to be unique: objects whose key is
+        equal to *value* are skipped.
+
+        In sorted sequences objects are located using *bisect*. Otherwise,
+        the objects following *value* are selected using *heapq.nsmallest*
+        (or *heapq.nlargest*), without sorting the whole sequence.
+        Raise *EmptyPage* if all the objects are sorted before or at *value*.
+        """
+        # Retrieve an additional object to check if there is a next page.
+        limit = self.per_page + 1
+        if self._sorted_all:
+            offset = self.get_offset_for_key(value)
+            objects = self._sorted[offset:offset + limit]
+        else:
+            after = self._get_objects_after(value)
+            offset = len(self.object_list) - len(after)
+            select = heapq.nlargest if self.reverse else heapq.nsmallest
+            objects = select(limit, after, key=self.key)
+        if not objects:
+            raise EmptyPage('That page contains no results')
+        next_key = None
+        if len(objects) == limit:
+            objects = objects[:self.per_page]
+            next_key = self.key(objects[-1])
+        return KeysetPage(
+            objects, min(self.get_number(offset), self.num_pages), self,
+            offset, next_key)
+
+    def _get_objects(self, bottom, top):
+        return self.get_sorted(top)[bottom:top]
+
+
+def get_array_view(data):
+    """Return a view of the buffer-protocol object *data*, without copying it.
+
+    NumPy arrays, whose slices are already views, are returned unchanged.
+    Under Python 3, other buffer-protocol objects (e.g. ``array.array``) are
+    wrapped in a *memoryview*, whose slices share the same memory: while a
+    slice exists, the buffer of *data* cannot be resized (e.g. appending to
+    an ``array.array`` raises *BufferError*). Under Python 2 memoryviews
+    index bytes rather than typed items, so *data* is returned unchanged: in
+    this case slicing copies only the page objects.
+    """
+    if hasattr(data, '__array_interface__') or not utils.PYTHON3:
+        return data
+    try:
+        return memoryview(data)
+    except TypeError:
+        return data
+
+
+class ArrayPage(CustomPage):
+    """A page whose object list is a view of an array.
+
+    Objects are accessed directly on the view, without converting it to a
+    list as done by Django pages.
+    """
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def tolist(self):
+        """Return the objects in the page as a list."""
+        tolist = getattr(self.object_list, 'tolist', None)
+        return list(self.object_list) if tolist is None else tolist()
+
+
+class ArrayPaginator(DefaultPaginator):
+    """Paginate numeric arrays, e.g. ``array.array`` or NumPy arrays.
+
+    The object list is not copied: the total number of objects is its length,
+    and the object list of each page is a view of the array (see
+    *get_array_view*), so that paginating costs O(page). The view is created
+    for each page, so the paginator itself does not prevent resizing the
+    array, but page object lists do as long as they exist. Under Python 2,
+    the objects in the page are copied.
+
+    The *fields* keyword argument can be used to project the pages of NumPy
+    structured arrays on a field name, or on a list of field names.
+    """
+
+    def __init__(self, object_list, per_page, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super(ArrayPaginator, self).__init__(object_list, per_page, **kwargs)
+        if isinstance(fields, tuple):
+            fields = list(fields)
+        self.fields = fields
+
+    def _get_page(self, *args, **kwargs):
+        return ArrayPage(*args, **kwargs)
+
+    @instrumentation.instrument('count', _describe_count)
+    def _count_objects(self):
+        """Return the length of the array."""
+        return len(self.object_list)
+
+    def _get_objects(self, bottom, top):
+        objects = get_array_view(self.object_list)[bottom:top]
+        if self.fields is None:
+            return objects
+        return objects[self.fields]
+
+
+class FilePaginator(DefaultPaginator):
+    """Paginate the lines of a large file, e.g. a log or a CSV export.
+
+    The object list is the path of the file, or a *MappedLines* instance
+    (see *endless_pagination.files*): the file is memory-mapped, and the
+    offsets of its lines are stored in a sidecar index, so that the total
+    number of lines is known without reading the file, and each page is
+    retrieved slicing the file between the offsets of its lines.
+
+    Files passed as paths are mapped when counting the lines and when
+    retrieving a page, and unmapped right after. *MappedLines* instances
+    are left open: they must be closed by the caller.
+
+    Lines are decoded using the *encoding* keyword argument ('utf-8' by
+    default), or returned as bytes if it is None.
+    """
+
+    def __init__(self, object_list, per_page, **kwargs):
+        self.encoding = kwargs.pop('encoding', 'utf-8')
+        super(FilePaginator, self).__init__(object_list, per_page, **kwargs)
+
+    @contextmanager
+    def open_lines(self):
+        """Return a context manager yielding the lines of the file."""
+        if isinstance(self.object_list, files.MappedLines):
+            yield self.object_list
+            return
+        with files.MappedLines(
+                self.object_list, encoding=self.encoding) as lines:
+            yield lines
+
+    @instrumentation.instrument('count', _describe_count)
+    def _count_objects(self):
+        """Return the number of lines in the file."""
+        with self.open_lines() as lines:
+            return len(lines)
+
+    def _get_objects(self, bottom, top):
+        """Return the lines from *bottom* to *top* (excluded)."""
+        with self.open_lines() as lines:
+            return lines[bottom:top]
+
+
+class SearchPaginator(DefaultPaginator):
+    """Paginate the results of SQLite FTS5 full-text search queries.
+
+    The object list is a *RawQuerySet*, or a ``(sql, params)`` tuple whose
+    rows are returned as dicts. The query must be neither ordered nor
+    limited, and it must select the FTS5 rank and a unique row identifier,
+    whose column names are the *rank_column* ('rank' by default) and
+    *rowid_column* (the primary key column for raw querysets, 'rowid'
+    otherwise) keyword arguments, e.g.::
+
+        Entry.objects.raw(
+            'SELECT entry.*, entry_fts.rank AS rank FROM entry_fts '
+            'JOIN entry ON entry.id = entry_fts.rowid '
+            'WHERE entry_fts MATCH %s', [terms])
+
+    Results are ordered by rank and row identifier. At most
+    ``settings.SEARCH_MAX_HITS`` hits are counted, and only those are
+    paginated: pages are retrieved from the best ranked hits, so that
+    SQLite only keeps that number of hits while sorting them. The position
+    of the last result in the page is signed and included in the next page
+    link (see *show_more*): following it, the next page is retrieved
+    seeking the results after that position, rather than skipping the
+    previous ones using an offset. Other pages (e.g. reached using
+    *show_pages*) are retrieved using an offset. Like the page number, the
+    cursor is read from the *GET* or *POST* data of the request.
+    """
+
+    def __init__(self, object_list, per_page, **kwargs):
+        self.rank_column = kwargs.pop('rank_column', 'rank')
+        rowid_column = kwargs.pop('rowid_column', None)
+        super(SearchPaginator, self).__init__(object_list, per_page, **kwargs)
+        if isinstance(object_list, RawQuerySet):
+            self.sql, params = object_list.raw_query, object_list.params
+            self.pk_column = object_list.model._meta.pk.column
+        else:
+            self.sql, params = object_list
+            self.pk_column = None
+        self.params = tuple(params or ())
+        self.rowid_column = rowid_column or self.pk_column or 'rowid'
+        self.next_cursor = None
+
+    @property
+    def cursor_key(self):
+        """The querystring key of the search cursor."""
+        return self.querystring_key + CURSOR_SUFFIX
+
+    def get_fingerprint(self):
+        """Return a string identifying the search query and its params."""
+        data = '{0}|{1!r}'.format(self.sql, self.params).encode('utf-8')
+        return 'search:' + hashlib.md5(data).hexdigest()
+
+    def get_querystring_params(self):
+        if self.next_cursor is None or self.next_cursor['offset'] >= (
+                self.count):
+            return {}
+        cursor = signing.dumps(
+            self.next_cursor, salt=SEARCH_CURSOR_SALT,
+            serializer=CursorSerializer, compress=True)
+        return {self.cursor_key: cursor}
+
+    def get_cursor(self, offset):
+        """Return the ``[rank, rowid]`` position preceding *offset*.
+
+        Return None if the request does not include a valid cursor for the
+        given *offset* of this query.
+        """
+        cursor = None
+        if self.request is not None:
+            cursor = utils.get_querystring_value(
+                self.request, self.cursor_key)
+        if not cursor:
+            return None
+        try:
+            data = signing.loads(
+                cursor, salt=SEARCH_CURSOR_SALT, serializer=CursorSerializer)
+        except signing.BadSignature:
+            return None
+        if data.get('offset') != offset or (
+                data.get('query') != self.get_fingerprint()):
+            return None
+        return data.get('key')
+
+    def _get_alias(self, page=False):
+        """Return the alias of the database used to run queries."""
+        database = self.get_database(page=page)
+        if database is not None:
+            return database
+        return getattr(self.object_list, 'db', DEFAULT_DB_ALIAS)
+
+    def _get_key(self, obj):
+        """Return the ``[rank, rowid]`` position of the result *obj*."""
+        if isinstance(obj, dict):
+            return [obj[self.rank_column], obj[self.rowid_column]]
+        if self.rowid_column == self.pk_column:
+            rowid = obj.pk
+        else:
+            rowid = getattr(obj, self.rowid_column)
+        return [getattr(obj, self.rank_column), rowid]
+
+    def _query(self, sql, params, alias):
+        """Run *sql* and return the results.
+
+        Results are model instances for raw querysets, dicts otherwise.
+        """
+        object_list = self.object_list
+        if isinstance(object_list, RawQuerySet):
+            return list(RawQuerySet(
+                sql, model=object_list.model, params=params,
+                translations=object_list.translations, using=alias))
+        cursor = connections[alias].cursor()
+        cursor.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    @instrumentation.instrument('count', _describe_count)
+    def _count_objects(self):
+        """Return the number of hits, up to ``settings.SEARCH_MAX_HITS``."""
+        sql = 'SELECT 1 FROM ({0}) AS endless_search'.format(self.sql)
+        params = self.params
+        if settings.SEARCH_MAX_HITS is not None:
+            sql += ' LIMIT %s'
+            params += (settings.SEARCH_MAX_HITS,)
+        cursor = connections[self._get_alias()].cursor()
+        cursor.execute(
+            'SELECT COUNT(*) FROM ({0}) AS endless_hits'.format(sql), params)
+        return cursor.fetchone()[0]
+
+    def _get_objects(self, bottom, top):
+        """Return the results from *bottom* to *top* (excluded).
+
+        Results are retrieved seeking the position in the cursor, if valid,
+        among the first ``settings.SEARCH_MAX_HITS`` hits: limiting the
+        ordered inner query lets SQLite use a bounded sorter rather than
+        sorting all the hits.
+        """
+        alias = self._get_alias(page=True)
+        quote_name = connections[alias].ops.quote_name
+        rank = quote_name(self.rank_column)
+        rowid = quote_name(self.rowid_column)
+        sql = 'SELECT * FROM ({0}) AS endless_search'.format(self.sql)
+        params = self.params
+        if settings.SEARCH_MAX_HITS is not None:
+            sql = (
+                'SELECT * FROM ({0} ORDER BY {1}, {2} LIMIT %s) '
+                'AS endless_hits'.format(sql, rank, rowid))
+            params += (settings.SEARCH_MAX_HITS,)
+        key = self.get_cursor(bottom)
+        if key is not None:
+            sql += ' WHERE {0} > %s OR ({0} = %s AND {1} > %s)'.format(
+                rank, rowid)
+            params += (key[0], key[0], key[1])
+        sql += ' ORDER BY {0}, {1} LIMIT %s'.format(rank, rowid)
+        params += (top - bottom,)
+        if key is None:
+            sql += ' OFFSET %s'
+            params += (bottom,)
+        objects = self._query(sql, params, alias)
+        if objects:
+            self.next_cursor = {
+                'query': self.get_fingerprint(),
+                'offset': top,
+                'key': self._get_key(objects[-1]),
+            }
+        return objects
@@ -0,0 +1,97 @@
+"""Routing of pagination queries to read replicas.
+
+Counting the objects of a queryset is often the most expensive query run
+by the pagination, and it rarely needs to see the latest writes. When a
+replica database alias is configured, e.g.::
+
+    ENDLESS_PAGINATION_REPLICA_DATABASE = 'replica'
+
+the count queries of the paginated querysets are run on that database, and,
+if ``settings.REPLICA_PAGES`` is True, the queries retrieving the objects in
+the current page are run there too. The alias can also be chosen for each
+request by a callable (see ``settings.REPLICA_ROUTER``), or for a single
+pagination using the ``using_db`` argument of the template tags, e.g.::
+
+    {% paginate entries using_db "replica" %}
+
+Users who just wrote data may not find it in a lagging replica: calling
+*use_primary* passing the request forces all the pagination queries of that
+request to run on the database of the queryset. *ReadYourWritesMiddleware*
+does this automatically for the requests following a write.
+"""
+
+from __future__ import unicode_literals
+
+from endless_pagination import (
+    loaders,
+    settings,
+)
+
+
+# The request attribute marking requests that must not use replicas.
+PRIMARY_ATTRIBUTE = 'endless_use_primary'
+# The cookie set by *ReadYourWritesMiddleware* after a write.
+PRIMARY_COOKIE = 'endless_primary'
+# The HTTP methods that are not considered writes.
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+def use_primary(request):
+    """Run the pagination queries of *request* on the queryset database."""
+    setattr(request, PRIMARY_ATTRIBUTE, True)
+
+
+def get_database(request=None, database=None):
+    """Return the alias of the database used for pagination queries.
+
+    The explicitly passed *database* alias takes precedence over the alias
+    returned by ``settings.REPLICA_ROUTER``, which in turn takes precedence
+    over ``settings.REPLICA_DATABASE``. Return None if the database of the
+    queryset must be used, i.e. if no replica is configured, or if
+    *use_primary* was called for the given *request*.
+    """
+    if request is not None and getattr(request, PRIMARY_ATTRIBUTE, False):
+        return None
+    if database is not None:
+        return database
+    callable_or_path = settings.REPLICA_ROUTER
+    if callable_or_path:
+        if callable(callable_or_path):
+            router = callable_or_path
+        else:
+            router = loaders.load_object(callable_or_path)
+        database = router(request)
+        if database is not None:
+            return database
+    return settings.REPLICA_DATABASE
+
+
+def route(object_list, database):
+    """Return *object_list* retrieving objects from the *database* alias.
+
+    Object lists that are not querysets, and querysets when *database* is
+    None, are returned unchanged.
+    """
+    if database is None or not hasattr(object_list, 'using'):
+        return object_list
+    return object_list.using(database)
+
+
+class ReadYourWritesMiddleware(object):
+    """Stop using replicas for a while after a client writes data.
+
+    Responses to write requests (e.g. POST) set a cookie lasting
+    ``settings.PRIMARY_AFTER_WRITE`` seconds: while the cookie is present,
+    the pagination queries of the requests of the same client are run on
+    the database of the paginated querysets.
+    """
+
+    def process_request(self, request):
+        if PRIMARY_COOKIE in request.COOKIES:
+            use_primary(request)
+
+    def process_response(self, request, response):
+        max_age = settings.PRIMARY_AFTER_WRITE
+        if max_age and request.method not in SAFE_METHODS:
+            response.set_cookie(PRIMARY_COOKIE, '1', max_age=max_age)
+        return response
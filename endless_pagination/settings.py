@@ -54,3 +54,68 @@ DEFAULT_CALLABLE_ARROWS = getattr(
 # Template variable name for *page_template* decorator.
 TEMPLATE_VARNAME = getattr(
     settings, 'ENDLESS_PAGINATION_TEMPLATE_VARNAME', 'template')
+
+# The maximum number of pages that can be requested at once using a page
+# range in the querystring (e.g. ``?page=1-8``). Longer ranges are shortened
+# keeping the first page.
+MAX_PAGE_RANGE = getattr(settings, 'ENDLESS_PAGINATION_MAX_PAGE_RANGE', 20)
+
+# Set to True to send the *pagination_phase* signal, including timings, when
+# each pagination phase completes (see *endless_pagination.instrumentation*).
+INSTRUMENTATION = getattr(
+    settings, 'ENDLESS_PAGINATION_INSTRUMENTATION', False)
+
+# Guard against requests for very deep pages, producing huge offsets.
+# The maximum page number that can be retrieved (None means no limit).
+DEEP_PAGE_MAX_NUMBER = getattr(
+    settings, 'ENDLESS_PAGINATION_DEEP_PAGE_MAX_NUMBER', None)
+# The maximum 0-based offset of the first object in the page.
+DEEP_PAGE_MAX_OFFSET = getattr(
+    settings, 'ENDLESS_PAGINATION_DEEP_PAGE_MAX_OFFSET', None)
+# If retrieving the objects of a page takes longer than this budget (in
+# seconds), deeper pages of the same queryset are no longer retrieved.
+DEEP_PAGE_TIME_BUDGET = getattr(
+    settings, 'ENDLESS_PAGINATION_DEEP_PAGE_TIME_BUDGET', None)
+# What the pagination template tags do when a page is too deep: 'cap' to
+# display the deepest allowed page, '404' to raise *Http404*.
+DEEP_PAGE_ACTION = getattr(
+    settings, 'ENDLESS_PAGINATION_DEEP_PAGE_ACTION', 'cap')
+
+# Set to a number of seconds to cache the total number of objects of
+# querysets paginated using the default paginator. Cached counts are fresh
+# for COUNT_CACHE_SOFT_TTL seconds, and then used while being refreshed by a
+# single process, until COUNT_CACHE_HARD_TTL seconds have passed.
+COUNT_CACHE_SOFT_TTL = getattr(
+    settings, 'ENDLESS_PAGINATION_COUNT_CACHE_SOFT_TTL', None)
+COUNT_CACHE_HARD_TTL = getattr(
+    settings, 'ENDLESS_PAGINATION_COUNT_CACHE_HARD_TTL', 3600)
+
+# The maximum number of primary keys stored by the snapshot paginator, and
+# the number of seconds snapshots are kept in the cache.
+SNAPSHOT_MAX_SIZE = getattr(
+    settings, 'ENDLESS_PAGINATION_SNAPSHOT_MAX_SIZE', 10000)
+SNAPSHOT_TIMEOUT = getattr(
+    settings, 'ENDLESS_PAGINATION_SNAPSHOT_TIMEOUT', 600)
+
+# The number of threads used by the sharded paginator to query shards
+# concurrently (0 means shards are queried serially). Queries executed in
+# pool threads run outside the transaction of the current request.
+SHARD_POOL_SIZE = getattr(settings, 'ENDLESS_PAGINATION_SHARD_POOL_SIZE', 0)
+
+# The alias of the read replica used to count the paginated objects (None
+# means the database of the queryset is used). The router is a callable, or
+# the dotted path to a callable, taking the current request and returning a
+# replica alias, or None to fall back to REPLICA_DATABASE.
+REPLICA_DATABASE = getattr(
+    settings, 'ENDLESS_PAGINATION_REPLICA_DATABASE', None)
+REPLICA_ROUTER = getattr(settings, 'ENDLESS_PAGINATION_REPLICA_ROUTER', None)
+# Set to True to also retrieve the objects in the page from the replica.
+REPLICA_PAGES = getattr(settings, 'ENDLESS_PAGINATION_REPLICA_PAGES', False)
+# The number of seconds the replica is not used for a client after a write,
+# when using *endless_pagination.routing.ReadYourWritesMiddleware*.
+PRIMARY_AFTER_WRITE = getattr(
+    settings, 'ENDLESS_PAGINATION_PRIMARY_AFTER_WRITE', 10)
+
+# The maximum number of hits counted, and paginated, by the search paginator
+# (None means all the hits are counted).
+SEARCH_MAX_HITS = getattr(settings, 'ENDLESS_PAGINATION_SEARCH_MAX_HITS', 1000)
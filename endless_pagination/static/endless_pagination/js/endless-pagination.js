@@ -1,6 +1,417 @@
 (function ($) {
     'use strict';
 
+    var getContext = function(link) {
+        return {
+            key: link.attr('rel').split(' ')[0],
+            url: link.attr('href')
+        };
+    };
+
+    // Return a regular expression matching the *key* querystring value.
+    var getKeyExpression = function(key) {
+        var escaped = key.replace(/[\-\[\]\/{}()*+?.\\\^$|]/g, '\\$&');
+        return new RegExp('([?&]' + escaped + '=)([^&#]*)');
+    };
+
+    // Return the page number referenced by *key* in the given *url*,
+    // or null if the url does not include a page number.
+    var getPageNumber = function(url, key) {
+        var match = getKeyExpression(key).exec(url);
+        if (match) {
+            var number = parseInt(match[2].split('-').pop(), 10);
+            return isNaN(number) ? null : number;
+        }
+        return null;
+    };
+
+    // Return the *url* modified to request the pages from *first* to
+    // *last* (e.g. "?page=2-5").
+    var setPageRange = function(url, key, first, last) {
+        var value = first + '-' + last,
+            expression = getKeyExpression(key);
+        if (expression.test(url)) {
+            return url.replace(expression, '$1' + value);
+        }
+        var parts = url.split('#'),
+            separator = parts[0].indexOf('?') === -1 ? '?' : '&';
+        parts[0] += separator + key + '=' + value;
+        return parts.join('#');
+    };
+
+    // Return the number of the last page included in the *fragment*
+    // retrieved for the pages from *firstPage* to *lastPage* of the *key*
+    // pagination. The server shortens ranges longer than
+    // ENDLESS_PAGINATION_MAX_PAGE_RANGE pages (20 by default): in this case
+    // the show more link, matched by *selector*, links the page following
+    // the last one included in the fragment.
+    var getLastPage = function(fragment, selector, key, firstPage, lastPage) {
+        if (firstPage === null || lastPage === firstPage) {
+            return lastPage;
+        }
+        var nodes = $('<div>').append($.parseHTML(fragment));
+        nodes.find(selector).each(function() {
+            var context = getContext($(this));
+            if (context.key === key) {
+                var nextPage = getPageNumber(context.url, key);
+                if (nextPage !== null && nextPage > firstPage &&
+                    nextPage <= lastPage) {
+                    lastPage = nextPage - 1;
+                }
+            }
+        });
+        return lastPage;
+    };
+
+    // Retrieve the pages of multiple paginations using a single request.
+    // The *callback* is called passing an object mapping each querystring
+    // key to the corresponding HTML fragment.
+    var getBatch = function(url, keys, callback) {
+        var data = $.param({querystring_key: keys}, true);
+        return $.get(url, data, function(response) {
+            var fragments = {};
+            $('<div>').html(response).children('.endless_batch').each(
+                function() {
+                    var fragment = $(this),
+                        key = fragment.attr('data-querystring-key');
+                    fragments[key] = fragment.html();
+                });
+            callback(fragments);
+        });
+    };
+
+    // The session storage is used to remember loaded pages.
+    var storage = (function() {
+        try {
+            return window.sessionStorage || null;
+        } catch (err) {
+            // Storage can be disabled by the browser privacy settings.
+            return null;
+        }
+    })();
+
+    var getStorageKey = function(key) {
+        var location = window.location;
+        return 'endless:' + location.pathname + location.search + ':' + key;
+    };
+
+    // Return true if the user navigated back (or forward) to the page.
+    var isBackForward = function() {
+        var performance = window.performance;
+        if (!performance) {
+            return false;
+        }
+        if (performance.getEntriesByType) {
+            var entries = performance.getEntriesByType('navigation');
+            if (entries.length) {
+                return entries[0].type === 'back_forward';
+            }
+        }
+        return Boolean(
+            performance.navigation && performance.navigation.type === 2);
+    };
+
+    // A bounded least recently used cache of page fragments. Entries expire
+    // after *timeout* milliseconds (if not 0). If *storageKey* is given, the
+    // cache is persisted in the session storage.
+    var PageCache = function(size, timeout, storageKey) {
+        this.size = size;
+        this.timeout = timeout;
+        this.storageKey = storageKey;
+        // Entries are ordered from the least to the most recently used.
+        this.entries = [];
+        if (storageKey) {
+            try {
+                this.entries = JSON.parse(storage.getItem(storageKey)) || [];
+            } catch (err) {
+                this.entries = [];
+            }
+        }
+    };
+
+    PageCache.prototype.index = function(key) {
+        for (var i = 0; i < this.entries.length; i++) {
+            if (this.entries[i].key === key) {
+                return i;
+            }
+        }
+        return -1;
+    };
+
+    PageCache.prototype.save = function() {
+        if (this.storageKey) {
+            try {
+                storage.setItem(this.storageKey, JSON.stringify(this.entries));
+            } catch (err) {
+                // The storage quota is exceeded.
+                storage.removeItem(this.storageKey);
+            }
+        }
+    };
+
+    // Return the fragment stored for *key*, or null if not found or expired.
+    PageCache.prototype.get = function(key) {
+        var index = this.index(key);
+        if (index === -1) {
+            return null;
+        }
+        var entry = this.entries.splice(index, 1)[0];
+        if (this.timeout && new Date().getTime() - entry.time > this.timeout) {
+            this.save();
+            return null;
+        }
+        this.entries.push(entry);
+        this.save();
+        return entry.fragment;
+    };
+
+    PageCache.prototype.set = function(key, fragment) {
+        var index = this.index(key);
+        if (index !== -1) {
+            this.entries.splice(index, 1);
+        }
+        this.entries.push(
+            {key: key, fragment: fragment, time: new Date().getTime()});
+        while (this.entries.length > this.size) {
+            this.entries.shift();
+        }
+        this.save();
+    };
+
+    // Caches are shared by all the paginations in the page.
+    var pageCaches = {};
+
+    var getPageCache = function(size, timeout, persistent) {
+        var storageKey = persistent && storage ?
+            'endless:cache:' + window.location.pathname : null,
+            name = storageKey || '';
+        if (!pageCaches[name]) {
+            pageCaches[name] = new PageCache(size, timeout, storageKey);
+        }
+        return pageCaches[name];
+    };
+
+    // Replace Twitter-style pages far away from the viewport with
+    // placeholders having the same height, and restore them when they get
+    // close to the viewport again.
+    var Virtualizer = function(settings) {
+        var self = this;
+        this.settings = settings;
+        this.pages = [];
+        this.observer = new window.IntersectionObserver(function(entries) {
+            self.update(entries);
+        }, {rootMargin: settings.virtualizeMargin + 'px 0px'});
+    };
+
+    // Start tracking the *nodes* of a page retrieved from *url*.
+    Virtualizer.prototype.add = function(nodes, url, key) {
+        var page = {url: url, key: key, placeholder: null};
+        page.index = this.pages.push(page) - 1;
+        this.show(page, nodes);
+    };
+
+    Virtualizer.prototype.show = function(page, nodes) {
+        var observer = this.observer;
+        page.nodes = nodes;
+        page.elements = nodes.filter(function() {
+            return this.nodeType === 1;
+        });
+        page.visible = 0;
+        page.elements.each(function() {
+            $.data(this, 'endlessPage', page.index);
+            observer.observe(this);
+        });
+    };
+
+    Virtualizer.prototype.update = function(entries) {
+        var self = this,
+            changed = [];
+        $.each(entries, function(index, entry) {
+            var target = entry.target,
+                page = self.pages[$.data(target, 'endlessPage')];
+            if (!page) {
+                return;
+            }
+            if (target === page.placeholder) {
+                if (entry.isIntersecting) {
+                    self.restore(page);
+                }
+                return;
+            }
+            var visible = Boolean($.data(target, 'endlessVisible'));
+            if (visible !== entry.isIntersecting) {
+                $.data(target, 'endlessVisible', entry.isIntersecting);
+                page.visible += entry.isIntersecting ? 1 : -1;
+            }
+            changed.push(page);
+        });
+        $.each(changed, function(index, page) {
+            if (!page.placeholder && !page.visible) {
+                self.hide(page);
+            }
+        });
+    };
+
+    // Replace the page nodes with a placeholder.
+    Virtualizer.prototype.hide = function(page) {
+        var observer = this.observer,
+            first = page.elements.get(0),
+            last = page.elements.get(-1),
+            height = last.getBoundingClientRect().bottom -
+                first.getBoundingClientRect().top,
+            placeholder = $(document.createElement(first.tagName))
+                .addClass('endless_placeholder')
+                .css({height: Math.max(height, 0) + 'px', padding: 0});
+        page.elements.each(function() {
+            observer.unobserve(this);
+            $.removeData(this, 'endlessVisible');
+        });
+        page.nodes.first().before(placeholder);
+        if (this.settings.virtualizeRefetch) {
+            // Only keep the URL: the page is retrieved again when needed.
+            page.nodes.remove();
+            page.nodes = page.elements = null;
+        } else {
+            page.nodes.detach();
+        }
+        page.placeholder = placeholder.get(0);
+        $.data(page.placeholder, 'endlessPage', page.index);
+        observer.observe(page.placeholder);
+    };
+
+    // Replace the placeholder with the page nodes, retrieving them again if
+    // they were discarded.
+    Virtualizer.prototype.restore = function(page) {
+        var self = this,
+            containerSelector = this.settings.containerSelector,
+            insert = function(nodes) {
+                self.observer.unobserve(page.placeholder);
+                $(page.placeholder).replaceWith(nodes);
+                page.placeholder = null;
+                self.show(page, nodes);
+            };
+        if (page.nodes) {
+            insert(page.nodes);
+        } else if (!page.loading) {
+            page.loading = true;
+            $.get(page.url, 'querystring_key=' + page.key)
+                .done(function(fragment) {
+                    // Exclude the pagination container.
+                    insert($($.parseHTML(fragment, document, true)).filter(
+                        function() {
+                            return !$(this).is(containerSelector);
+                        }));
+                })
+                .always(function() {
+                    page.loading = false;
+                });
+        }
+    };
+
+    // Call *callback* before the next repaint.
+    var nextFrame = function(callback) {
+        if (window.requestAnimationFrame) {
+            window.requestAnimationFrame(callback);
+        } else {
+            window.setTimeout(callback, 16);
+        }
+    };
+
+    var now = function() {
+        return window.performance && window.performance.now ?
+            window.performance.now() : new Date().getTime();
+    };
+
+    // The time (in milliseconds) that can be spent inserting nodes in each
+    // animation frame.
+    var frameBudget = 8;
+
+    // Parse the *html* fragment and insert the resulting nodes before the
+    // *target* node. Nodes are inserted in animation frames, in batches of
+    // *batchSize* nodes, so that large fragments do not block the main
+    // thread. The *callback* is called passing the inserted nodes after the
+    // last batch is inserted.
+    var insertFragment = function(html, target, batchSize, callback) {
+        nextFrame(function() {
+            var nodes = $($.parseHTML(html, document, true)),
+                index = 0,
+                step = function() {
+                    var start = now();
+                    do {
+                        target.before(nodes.slice(index, index + batchSize));
+                        index += batchSize;
+                    } while (index < nodes.length &&
+                             now() - start < frameBudget);
+                    if (index < nodes.length) {
+                        nextFrame(step);
+                    } else {
+                        callback(nodes);
+                    }
+                };
+            step();
+        });
+    };
+
+    // Return true if the user asked to reduce data usage, or if the
+    // connection is cellular or slow.
+    var isMetered = function() {
+        var connection = window.navigator.connection;
+        if (!connection) {
+            return false;
+        }
+        return Boolean(
+            connection.saveData || connection.type === 'cellular' ||
+            /2g$/.test(connection.effectiveType || ''));
+    };
+
+    // Call *callback* when the browser is idle.
+    var whenIdle = function(callback) {
+        if (window.requestIdleCallback) {
+            window.requestIdleCallback(callback, {timeout: 2000});
+        } else {
+            window.setTimeout(callback, 1);
+        }
+    };
+
+    // Return true if the browser supports passive event listeners.
+    var supportsPassive = (function() {
+        var supported = false;
+        try {
+            var options = Object.defineProperty({}, 'passive', {
+                get: function() {
+                    supported = true;
+                    return true;
+                }
+            });
+            window.addEventListener('test', null, options);
+            window.removeEventListener('test', null, options);
+        } catch (err) {}
+        return supported;
+    })();
+
+    // Call *listener* at most once every *wait* milliseconds when the
+    // window is scrolled. Passive listeners are used where supported, so
+    // that the listener never blocks scrolling.
+    var onThrottledScroll = function(listener, wait) {
+        var scheduled = false,
+            handler = function() {
+                if (scheduled) {
+                    return;
+                }
+                scheduled = true;
+                window.setTimeout(function() {
+                    scheduled = false;
+                    listener();
+                }, wait);
+            };
+        if (window.addEventListener) {
+            window.addEventListener(
+                'scroll', handler, supportsPassive ? {passive: true} : false);
+        } else {
+            $(window).scroll(handler);
+        }
+    };
+
     $.fn.endlessPaginate = function(options) {
         var defaults = {
             // Twitter-style pagination container selector.
@@ -21,84 +432,422 @@
             paginateOnScroll: false,
             // If paginate-on-scroll is on, this margin will be used.
             paginateOnScrollMargin : 1,
+            // If paginate-on-scroll is on, the next page is loaded when the
+            // pagination container enters the viewport extended by this
+            // margin (using the CSS margin syntax, e.g. "0px 0px 200px 0px").
+            // If not set, a bottom margin of *paginateOnScrollMargin* pixels
+            // is used.
+            paginateOnScrollRootMargin: null,
+            // Set this to false to always use scroll events, even if the
+            // browser supports IntersectionObserver.
+            paginateOnScrollObserver: true,
+            // When scroll events are used, the position of the page is
+            // checked at most once every *paginateOnScrollThrottle*
+            // milliseconds.
+            paginateOnScrollThrottle: 100,
             // If paginate-on-scroll is on, it is possible to define chunks.
-            paginateOnScrollChunkSize: 0
+            paginateOnScrollChunkSize: 0,
+            // If chunks are used, set this to true to retrieve all the
+            // remaining pages of the current chunk with a single request.
+            paginateOnScrollChunkPrefetch: false,
+            // Set this to true to restore, with a single request, the pages
+            // loaded using Twitter-style pagination when the user navigates
+            // back to the page.
+            restorePages: false,
+            // Set this to true if the view supports batch requests (e.g. it
+            // is decorated with *page_templates*): in this case multiple
+            // paginations are restored using a single request.
+            batchRequests: false,
+            // Set this to "idle" to retrieve the next Twitter-style page in
+            // advance when the browser is idle, or to "hover" to retrieve it
+            // when the user hovers or focuses the show more link. Prefetching
+            // is disabled on metered connections.
+            prefetch: false,
+            // Set this to the number of Digg-style pages to be cached, so
+            // that pages already seen are displayed without requests.
+            cacheSize: 0,
+            // Cached pages expire after this number of milliseconds
+            // (0 means cached pages never expire).
+            cacheTimeout: 300000,
+            // Set this to true to keep cached pages in the session storage.
+            cacheStorage: false,
+            // Set this to true to replace the Twitter-style pages far away
+            // from the viewport with placeholders.
+            virtualize: false,
+            // The distance (in pixels) from the viewport beyond which pages
+            // are replaced by placeholders.
+            virtualizeMargin: 2000,
+            // Set this to true to discard the contents of pages replaced by
+            // placeholders, and retrieve them again when needed.
+            virtualizeRefetch: false,
+            // The number of nodes of a Twitter-style page inserted at once:
+            // large pages are inserted in batches over multiple frames.
+            insertBatchSize: 50
         },
-            settings = $.extend(defaults, options);
-
-        var getContext = function(link) {
-            return {
-                key: link.attr('rel').split(' ')[0],
-                url: link.attr('href')
-            };
-        };
+            settings = $.extend(defaults, options),
+            cache = settings.cacheSize ? getPageCache(
+                settings.cacheSize, settings.cacheTimeout,
+                settings.cacheStorage) : null;
 
         return this.each(function() {
             var element = $(this),
-                loadedPages = 1;
+                loadedPages = 1,
+                // Called when new Twitter-style pagination containers are
+                // added to the page.
+                onContainersAdded = function() {},
+                // Map request keys to prefetched Twitter-style pages.
+                prefetched = {},
+                virtualizer = settings.virtualize &&
+                    window.IntersectionObserver ?
+                    new Virtualizer(settings) : null;
 
-            // Twitter-style pagination.
-            element.on('click', settings.moreSelector, function() {
-                var link = $(this),
-                    html_link = link.get(0),
+            var getRequestKey = function(url, data) {
+                return url + ' ' + data;
+            };
+
+            // Send the Ajax request for the given *url* and *data*, or reuse
+            // the corresponding prefetched response, if available.
+            // Prefetched responses are used at most once.
+            var getPage = function(url, data) {
+                var key = getRequestKey(url, data),
+                    request = prefetched[key];
+                if (request) {
+                    delete prefetched[key];
+                    // Send a new request if prefetching failed.
+                    return request.then(null, function() {
+                        return $.get(url, data);
+                    });
+                }
+                return $.get(url, data);
+            };
+
+            // Retrieve in advance the page linked by the given *link*.
+            var prefetch = function(link) {
+                var context = getContext(link),
+                    key = getRequestKey(
+                        context.url, 'querystring_key=' + context.key);
+                if (prefetched[key] || isMetered()) {
+                    return;
+                }
+                var request = prefetched[key] = $.get(
+                    context.url, 'querystring_key=' + context.key);
+                request.fail(function() {
+                    // Let the next request retry.
+                    if (prefetched[key] === request) {
+                        delete prefetched[key];
+                    }
+                });
+            };
+
+            // Prefetch the pages linked by the current show more links,
+            // discarding prefetched pages that are no longer linked.
+            var prefetchLinks = function() {
+                var links = element.find(settings.moreSelector),
+                    keys = {};
+                links.each(function() {
+                    var context = getContext($(this));
+                    keys[getRequestKey(
+                        context.url, 'querystring_key=' + context.key)] = true;
+                });
+                $.each(prefetched, function(key, request) {
+                    if (!keys[key]) {
+                        request.abort();
+                        delete prefetched[key];
+                    }
+                });
+                if (settings.prefetch === 'idle') {
+                    whenIdle(function() {
+                        links.each(function() {
+                            prefetch($(this));
+                        });
+                    });
+                }
+            };
+
+            // Insert the *fragment* retrieved for the given *link* in place
+            // of the Twitter-style pagination container.
+            var insertMore = function(link, context, fragment, lastPage) {
+                var container = link.closest(settings.containerSelector);
+                // Called when all the nodes are in place.
+                var completed = function(nodes) {
+                    container.remove();
+                    onContainersAdded(container);
+                    if (virtualizer) {
+                        virtualizer.add(nodes.filter(function() {
+                            return !$(this).is(settings.containerSelector);
+                        }), context.url, context.key);
+                    }
+                    if (settings.prefetch) {
+                        prefetchLinks();
+                    }
+                    // Remember the loaded pages.
+                    if (settings.restorePages && storage &&
+                        lastPage !== null) {
+                        storage.setItem(getStorageKey(context.key), lastPage);
+                    }
+                    // Fire onCompleted callback.
+                    settings.onCompleted.apply(
+                        link.get(0), [context, $.trim(fragment)]);
+                };
+                insertFragment(
+                    fragment, container, settings.insertBatchSize, completed);
+            };
+
+            // Load the next page using Twitter-style pagination.
+            // If *lastPage* is given, all the pages up to *lastPage* are
+            // retrieved using a single request, up to the maximum number of
+            // pages the server returns at once (see *getLastPage*).
+            var loadMore = function(link, lastPage) {
+                var html_link = link.get(0),
                     container = link.closest(settings.containerSelector),
                     loading = container.find(settings.loadingSelector);
                 // Avoid multiple Ajax calls.
                 if (loading.is(':visible')) {
-                    return false;
+                    return;
                 }
                 link.hide();
                 loading.show();
-                var context = getContext(link);
+                var context = getContext(link),
+                    firstPage = getPageNumber(context.url, context.key);
+                if (firstPage !== null && lastPage > firstPage) {
+                    context.url = setPageRange(
+                        context.url, context.key, firstPage, lastPage);
+                } else {
+                    lastPage = firstPage;
+                }
                 // Fire onClick callback.
                 if (settings.onClick.apply(html_link, [context]) !== false) {
                     var data = 'querystring_key=' + context.key;
                     // Send the Ajax request.
-                    $.get(context.url, data, function(fragment) {
-                        container.before(fragment);
-                        container.remove();
+                    getPage(context.url, data).done(function(fragment) {
+                        var loadedPage = getLastPage(
+                            fragment, settings.moreSelector, context.key,
+                            firstPage, lastPage);
+                        if (loadedPage !== lastPage) {
+                            context.url = setPageRange(
+                                context.url, context.key, firstPage,
+                                loadedPage);
+                        }
                         // Increase the number of loaded pages.
-                        loadedPages += 1;
-                        // Fire onCompleted callback.
-                        settings.onCompleted.apply(
-                            html_link, [context, fragment.trim()]);
+                        loadedPages += firstPage === null ?
+                            1 : loadedPage - firstPage + 1;
+                        insertMore(link, context, fragment, loadedPage);
                     });
                 }
+            };
+
+            // Load multiple Twitter-style paginations using a single request.
+            // Each entry includes the *link* and the *firstPage* and
+            // *lastPage* to be retrieved.
+            var loadMoreBatch = function(entries) {
+                var url = getContext(entries[0].link).url,
+                    keys = [];
+                $.each(entries, function(index, entry) {
+                    var context = getContext(entry.link),
+                        container = entry.link.closest(
+                            settings.containerSelector);
+                    url = setPageRange(
+                        url, context.key, entry.firstPage, entry.lastPage);
+                    keys.push(context.key);
+                    entry.link.hide();
+                    container.find(settings.loadingSelector).show();
+                });
+                getBatch(url, keys, function(fragments) {
+                    $.each(entries, function(index, entry) {
+                        var context = getContext(entry.link),
+                            fragment = fragments[context.key];
+                        if (fragment === undefined) {
+                            // The server did not render this pagination.
+                            entry.link.show();
+                            entry.link.closest(settings.containerSelector)
+                                .find(settings.loadingSelector).hide();
+                            return;
+                        }
+                        var lastPage = getLastPage(
+                            fragment, settings.moreSelector, context.key,
+                            entry.firstPage, entry.lastPage);
+                        context.url = setPageRange(
+                            context.url, context.key,
+                            entry.firstPage, lastPage);
+                        // Increase the number of loaded pages.
+                        loadedPages += lastPage - entry.firstPage + 1;
+                        insertMore(entry.link, context, fragment, lastPage);
+                    });
+                });
+            };
+
+            // Twitter-style pagination.
+            element.on('click', settings.moreSelector, function() {
+                loadMore($(this));
                 return false;
             });
 
+            // Prefetch the next pages.
+            if (settings.prefetch === 'hover') {
+                element.on(
+                    'mouseenter focus touchstart', settings.moreSelector,
+                    function() {
+                        prefetch($(this));
+                    });
+            }
+            if (settings.prefetch) {
+                prefetchLinks();
+            }
+
+            // Restore the pages loaded before leaving the page.
+            if (settings.restorePages && storage) {
+                var restore = isBackForward(),
+                    entries = [];
+                element.find(settings.moreSelector).each(function() {
+                    var link = $(this),
+                        context = getContext(link),
+                        storageKey = getStorageKey(context.key);
+                    if (!restore) {
+                        storage.removeItem(storageKey);
+                        return;
+                    }
+                    var lastPage = parseInt(storage.getItem(storageKey), 10),
+                        nextPage = getPageNumber(context.url, context.key);
+                    if (nextPage !== null && lastPage >= nextPage) {
+                        entries.push({
+                            link: link,
+                            firstPage: nextPage,
+                            lastPage: lastPage
+                        });
+                    }
+                });
+                if (settings.batchRequests && entries.length > 1) {
+                    loadMoreBatch(entries);
+                } else {
+                    $.each(entries, function(index, entry) {
+                        loadMore(entry.link, entry.lastPage);
+                    });
+                }
+            }
+
             // On scroll pagination.
             if (settings.paginateOnScroll) {
-                var win = $(window),
-                    doc = $(document);
-                win.scroll(function(){
-                    if (doc.height() - win.height() -
-                        win.scrollTop() <= settings.paginateOnScrollMargin) {
-                        // Do not paginate on scroll if chunks are used and
-                        // the current chunk is complete.
-                        var chunckSize = settings.paginateOnScrollChunkSize;
-                        if (!chunckSize || loadedPages % chunckSize) {
-                            element.find(settings.moreSelector).click();
-                        }
+                var paginateOnScroll = function() {
+                    // Do not paginate on scroll if chunks are used and
+                    // the current chunk is complete.
+                    var chunckSize = settings.paginateOnScrollChunkSize;
+                    if (chunckSize && !(loadedPages % chunckSize)) {
+                        return;
                     }
-                });
+                    var links = element.find(settings.moreSelector);
+                    if (!chunckSize ||
+                        !settings.paginateOnScrollChunkPrefetch) {
+                        links.click();
+                        return;
+                    }
+                    // Retrieve the remaining pages of the chunk.
+                    var remaining = chunckSize - loadedPages % chunckSize;
+                    links.each(function() {
+                        var link = $(this),
+                            context = getContext(link),
+                            nextPage = getPageNumber(context.url, context.key);
+                        if (nextPage === null) {
+                            loadMore(link);
+                        } else {
+                            loadMore(link, nextPage + remaining - 1);
+                        }
+                    });
+                };
+
+                if (settings.paginateOnScrollObserver &&
+                    window.IntersectionObserver) {
+                    // Watch the pagination containers: no layout is read
+                    // while scrolling.
+                    var margin = settings.paginateOnScrollMargin,
+                        rootMargin = settings.paginateOnScrollRootMargin ||
+                            '0px 0px ' + margin + 'px 0px';
+                    var observer = new window.IntersectionObserver(
+                        function(entries) {
+                            for (var i = 0; i < entries.length; i++) {
+                                if (entries[i].isIntersecting) {
+                                    paginateOnScroll();
+                                    return;
+                                }
+                            }
+                        }, {rootMargin: rootMargin});
+                    var observeContainers = function() {
+                        element.find(settings.containerSelector).each(
+                            function() {
+                                observer.observe(this);
+                            });
+                    };
+                    onContainersAdded = function(container) {
+                        observer.unobserve(container.get(0));
+                        observeContainers();
+                    };
+                    observeContainers();
+                } else {
+                    // Fall back to throttled scroll events.
+                    var win = $(window),
+                        doc = $(document);
+                    onThrottledScroll(function() {
+                        var distance = doc.height() - win.height() -
+                            win.scrollTop();
+                        if (distance <= settings.paginateOnScrollMargin) {
+                            paginateOnScroll();
+                        }
+                    }, settings.paginateOnScrollThrottle);
+                }
             }
 
             // Digg-style pagination.
             element.on('click', settings.pagesSelector, function() {
                 var link = $(this),
                     html_link = link.get(0),
-                    context = getContext(link);
+                    context = getContext(link),
+                    page_template = link.closest(settings.pageSelector),
+                    data = 'querystring_key=' + context.key,
+                    requestKey = getRequestKey(context.url, data),
+                    // The request in flight for this page template, if any.
+                    pending = page_template.data('endlessRequest');
+                // Ignore clicks on a page that is already being retrieved.
+                if (pending && pending.key === requestKey) {
+                    return false;
+                }
                 // Fire onClick callback.
                 if (settings.onClick.apply(html_link, [context]) !== false) {
-                    var page_template = link.closest(settings.pageSelector),
-                        data = 'querystring_key=' + context.key;
+                    var showPage = function(fragment) {
+                            page_template.html(fragment);
+                            // Fire onCompleted callback.
+                            settings.onCompleted.apply(
+                                html_link, [context, $.trim(fragment)]);
+                        },
+                        fragment = cache && cache.get(requestKey);
+                    // Abort the superseded request: the connection is closed,
+                    // and its response will never be displayed.
+                    if (pending) {
+                        page_template.removeData('endlessRequest');
+                        pending.request.abort();
+                    }
+                    if (fragment !== null) {
+                        showPage(fragment);
+                        return false;
+                    }
                     // Send the Ajax request.
-                    page_template.load(context.url, data, function(fragment) {
-                        // Fire onCompleted callback.
-                        settings.onCompleted.apply(
-                            html_link, [context, fragment.trim()]);
-                    });
+                    var current = {key: requestKey};
+                    current.request = $.get(context.url, data)
+                        .done(function(fragment) {
+                            if (cache) {
+                                cache.set(requestKey, fragment);
+                            }
+                            // Ignore stale responses.
+                            if (page_template.data('endlessRequest') ===
+                                current) {
+                                showPage(fragment);
+                            }
+                        })
+                        .always(function() {
+                            if (page_template.data('endlessRequest') ===
+                                current) {
+                                page_template.removeData('endlessRequest');
+                            }
+                        });
+                    page_template.data('endlessRequest', current);
                 }
                 return false;
             });
@@ -109,4 +858,37 @@
         return $('body').endlessPaginate(options);
     };
 
+    // Refresh multiple paginations, identified by their querystring *keys*,
+    // using a single request to *url*. The view must support batch requests,
+    // e.g. it must be decorated with *page_templates*.
+    $.fn.endlessRefresh = function(url, keys, options) {
+        var settings = $.extend({
+                // Selector of the nodes updated with new contents.
+                pageSelector: '.endless_page_template',
+                // Callback called when a pagination is refreshed.
+                onCompleted: function() {}
+            }, options),
+            elements = this;
+        getBatch(url, keys, function(fragments) {
+            $.each(fragments, function(key, fragment) {
+                var page_template = elements.find(settings.pageSelector)
+                    .filter(function() {
+                        var node = $(this);
+                        return (
+                            node.attr('data-querystring-key') === key ||
+                            node.find('[rel~="' + key + '"]').length > 0);
+                    }).first();
+                page_template.html(fragment);
+                settings.onCompleted.apply(
+                    page_template.get(0),
+                    [{key: key, url: url}, $.trim(fragment)]);
+            });
+        });
+        return this;
+    };
+
+    $.endlessRefresh = function(url, keys, options) {
+        return $('body').endlessRefresh(url, keys, options);
+    };
+
 })(jQuery);
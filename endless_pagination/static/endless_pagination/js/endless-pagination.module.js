@@ -0,0 +1,187 @@
+// Django Endless Pagination: dependency-free ES module.
+//
+// Usage:
+//
+//     <script type="module">
+//         import {endlessPaginate} from './endless-pagination.module.js';
+//         endlessPaginate(document.body, {paginateOnScroll: true});
+//     </script>
+//
+// This module implements the core features of the jQuery plugin in
+// endless-pagination.js, using the same options and working with the same
+// templates: Twitter-style and Digg-style pagination, and pagination on
+// scroll (optionally using chunks).
+
+const defaults = {
+    // Twitter-style pagination container selector.
+    containerSelector: '.endless_container',
+    // Twitter-style pagination loading selector.
+    loadingSelector: '.endless_loading',
+    // Twitter-style pagination link selector.
+    moreSelector: 'a.endless_more',
+    // Digg-style pagination page template selector.
+    pageSelector: '.endless_page_template',
+    // Digg-style pagination link selector.
+    pagesSelector: 'a.endless_page_link',
+    // Callback called when the user clicks to get another page.
+    onClick: function() {},
+    // Callback called when the new page is correctly displayed.
+    onCompleted: function() {},
+    // Set this to true to use the paginate-on-scroll feature.
+    paginateOnScroll: false,
+    // If paginate-on-scroll is on, this margin will be used.
+    paginateOnScrollMargin: 1,
+    // If paginate-on-scroll is on, it is possible to define chunks.
+    paginateOnScrollChunkSize: 0
+};
+
+const getContext = (link) => ({
+    key: link.getAttribute('rel').split(' ')[0],
+    url: link.getAttribute('href')
+});
+
+// Retrieve the page for the pagination identified by *key* from *url*.
+const getFragment = (url, key) => {
+    const separator = url.indexOf('?') === -1 ? '?' : '&',
+        data = 'querystring_key=' + encodeURIComponent(key);
+    return fetch(url + separator + data, {
+        credentials: 'same-origin',
+        // Let Django recognize the request as Ajax.
+        headers: {'X-Requested-With': 'XMLHttpRequest'}
+    }).then((response) => {
+        if (!response.ok) {
+            throw new Error(response.statusText);
+        }
+        return response.text();
+    });
+};
+
+// Return the closest ancestor of the event target matching *selector*,
+// only if it is a descendant of *element*.
+const closest = (event, selector, element) => {
+    let target = event.target;
+    if (target.nodeType !== 1) {
+        target = target.parentElement;
+    }
+    const match = target && target.closest(selector);
+    return match && element.contains(match) ? match : null;
+};
+
+export function endlessPaginate(element = document.body, options = {}) {
+    if (typeof element === 'string') {
+        element = document.querySelector(element);
+    }
+    const settings = Object.assign({}, defaults, options);
+    let loadedPages = 1,
+        observer = null;
+
+    // Watch the Twitter-style pagination containers if on scroll
+    // pagination is on and IntersectionObserver is supported.
+    const observeContainers = () => {
+        if (observer) {
+            element.querySelectorAll(settings.containerSelector).forEach(
+                (container) => observer.observe(container));
+        }
+    };
+
+    // Twitter-style pagination.
+    const loadMore = (link) => {
+        const container = link.closest(settings.containerSelector),
+            loading = container.querySelector(settings.loadingSelector);
+        // Avoid multiple Ajax calls.
+        if (container.hasAttribute('data-endless-loading')) {
+            return;
+        }
+        container.setAttribute('data-endless-loading', '');
+        link.style.display = 'none';
+        if (loading) {
+            loading.style.display = '';
+        }
+        const context = getContext(link);
+        // Fire onClick callback.
+        if (settings.onClick.apply(link, [context]) === false) {
+            return;
+        }
+        getFragment(context.url, context.key).then((fragment) => {
+            // Increase the number of loaded pages.
+            loadedPages += 1;
+            container.insertAdjacentHTML('beforebegin', fragment);
+            if (observer) {
+                observer.unobserve(container);
+            }
+            container.remove();
+            observeContainers();
+            // Fire onCompleted callback.
+            settings.onCompleted.apply(link, [context, fragment.trim()]);
+        });
+    };
+
+    // Digg-style pagination.
+    const loadPage = (link) => {
+        const context = getContext(link);
+        // Fire onClick callback.
+        if (settings.onClick.apply(link, [context]) === false) {
+            return;
+        }
+        const pageTemplate = link.closest(settings.pageSelector);
+        getFragment(context.url, context.key).then((fragment) => {
+            pageTemplate.innerHTML = fragment;
+            // Fire onCompleted callback.
+            settings.onCompleted.apply(link, [context, fragment.trim()]);
+        });
+    };
+
+    element.addEventListener('click', (event) => {
+        const more = closest(event, settings.moreSelector, element);
+        if (more) {
+            event.preventDefault();
+            loadMore(more);
+            return;
+        }
+        const page = closest(event, settings.pagesSelector, element);
+        if (page) {
+            event.preventDefault();
+            loadPage(page);
+        }
+    });
+
+    // On scroll pagination.
+    if (settings.paginateOnScroll) {
+        const paginateOnScroll = () => {
+            // Do not paginate on scroll if chunks are used and the current
+            // chunk is complete.
+            const chunkSize = settings.paginateOnScrollChunkSize;
+            if (!chunkSize || loadedPages % chunkSize) {
+                element.querySelectorAll(settings.moreSelector).forEach(
+                    loadMore);
+            }
+        };
+        const margin = settings.paginateOnScrollMargin;
+        if (window.IntersectionObserver) {
+            observer = new IntersectionObserver((entries) => {
+                if (entries.some((entry) => entry.isIntersecting)) {
+                    paginateOnScroll();
+                }
+            }, {rootMargin: '0px 0px ' + margin + 'px 0px'});
+            observeContainers();
+        } else {
+            let scheduled = false;
+            window.addEventListener('scroll', () => {
+                if (scheduled) {
+                    return;
+                }
+                scheduled = true;
+                window.requestAnimationFrame(() => {
+                    const doc = document.documentElement;
+                    scheduled = false;
+                    if (doc.scrollHeight - window.innerHeight -
+                        window.pageYOffset <= margin) {
+                        paginateOnScroll();
+                    }
+                });
+            }, {passive: true});
+        }
+    }
+
+    return element;
+}
@@ -4,9 +4,11 @@ from __future__ import unicode_literals
 import re
 
 from django import template
+from django.http import Http404
 from django.utils.encoding import iri_to_uri
 
 from endless_pagination import (
+    instrumentation,
     models,
     settings,
     utils,
@@ -15,6 +17,10 @@ from endless_pagination.paginators import (
     DefaultPaginator,
     EmptyPage,
     LazyPaginator,
+    MergedPaginator,
+    PageTooDeep,
+    SearchPaginator,
+    SnapshotPaginator,
 )
 
 
@@ -24,6 +30,7 @@ PAGINATE_EXPRESSION = re.compile(r"""
     (?P<objects>[\.\w]+)  # Objects / queryset.
     (\s+starting\s+from\s+page\s+(?P<number>[\-]?\d+|\w+))?  # Page start.
     (\s+using\s+(?P<key>[\"\'\-\w]+))?  # Querystring key.
+    (\s+using_db\s+(?P<database>[\"\'\-\w]+))?  # Database alias.
     (\s+with\s+(?P<override_path>[\"\'\/\w]+))?  # Override path.
     (\s+as\s+(?P<var_name>\w+))?  # Context variable name.
     $   # End of line.
@@ -133,6 +140,16 @@ def paginate(parser, token, paginator_class=None):
         {% paginate 20 entries
             using page_key with pagination_url as paginated_entries %}
 
+    The total number of entries can be counted using a read replica, passing
+    its database alias (or a context variable containing it), e.g.:
+
+    .. code-block:: html+django
+
+        {% paginate entries using_db "replica" %}
+
+    The alias overrides *settings.REPLICA_DATABASE* for this pagination: see
+    *endless_pagination.routing* for the details.
+
     This way you can easily create views acting as API endpoints, and point
     your Ajax calls to that API. In this case *pagination_url* is considered a
     context variable, but it is also possible to hardcode the URL, e.g.:
@@ -149,6 +166,13 @@ def paginate(parser, token, paginator_class=None):
 
     {% paginate 3,10 entries %}
 
+    A range of pages can be requested using the querystring, e.g.
+    ``?page=2-5``: in this case the objects of all the pages in the range
+    are retrieved at once and added to the context, and the range is
+    considered as the current page, so that the page number displayed by
+    {% show_current_number %} is the last page in the range, and the link
+    generated by {% show_more %} points to the page after the range.
+
     You must use this tag before calling the {% show_more %} one.
     """
     # Validate arguments.
@@ -196,6 +220,61 @@ def lazy_paginate(parser, token):
     return paginate(parser, token, paginator_class=LazyPaginator)
 
 
+@register.tag
+def snapshot_paginate(parser, token):
+    """Paginate a snapshot of the objects.
+
+    The primary keys of the queryset are stored in the cache when the
+    objects are paginated for the first time, and subsequent pages only
+    retrieve the objects in the page by primary key, using a token included
+    in the page links.
+
+    Use this the same way as *paginate* tag with expensive querysets, when
+    results must not shift while the user navigates the pages.
+    """
+    return paginate(parser, token, paginator_class=SnapshotPaginator)
+
+
+@register.tag
+def merged_paginate(parser, token):
+    """Paginate several querysets merged in a single sequence.
+
+    The objects variable must be a sequence of querysets ordered by the same
+    field, e.g. the creation date. Only the objects of the current page are
+    retrieved from each queryset, and the next page can be reached only
+    using the link generated by *show_more*.
+
+    Use this the same way as *lazy_paginate* tag.
+    """
+    return paginate(parser, token, paginator_class=MergedPaginator)
+
+
+@register.tag
+def search_paginate(parser, token):
+    """Paginate the results of a SQLite FTS5 full-text search query.
+
+    The objects variable must be a raw queryset, or a ``(sql, params)``
+    tuple, selecting the FTS5 *rank* of the results. The next page link
+    generated by *show_more* retrieves the results after the last one
+    displayed, without skipping the previous ones using an offset.
+
+    Use this the same way as *paginate* tag.
+    """
+    return paginate(parser, token, paginator_class=SearchPaginator)
+
+
+def _describe_paginate(result, node, context):
+    """Return the instrumentation data for the ``{% paginate %}`` tag."""
+    data = context['endless']
+    page = data['page']
+    return {
+        'sender': page.paginator.__class__,
+        'number': page.number,
+        'querystring_key': data['querystring_key'],
+        'rows': instrumentation.count_rows(page.object_list),
+    }
+
+
 class PaginateNode(template.Node):
     """Add to context the objects of the current page.
 
@@ -204,7 +283,8 @@ class PaginateNode(template.Node):
 
     def __init__(
             self, paginator_class, objects, first_page=None, per_page=None,
-            var_name=None, number=None, key=None, override_path=None):
+            var_name=None, number=None, key=None, override_path=None,
+            database=None):
         self.paginator = paginator_class or DefaultPaginator
         self.objects = template.Variable(objects)
 
@@ -260,6 +340,16 @@ class PaginateNode(template.Node):
         else:
             self.override_path_variable = template.Variable(override_path)
 
+        # Handle the *database* alias used for pagination queries.
+        self.database_variable = None
+        if database is None:
+            self.database = None
+        elif database[0] in ('"', "'") and database[-1] == database[0]:
+            self.database = database[1:-1]
+        else:
+            self.database_variable = template.Variable(database)
+
+    @instrumentation.instrument('paginate', _describe_paginate)
     def render(self, context):
         # Handle page number when it is not specified in querystring.
         if self.page_number_variable is None:
@@ -292,10 +382,18 @@ class PaginateNode(template.Node):
         else:
             override_path = self.override_path_variable.resolve(context)
 
+        # Retrieve the database alias if used.
+        if self.database_variable is None:
+            database = self.database
+        else:
+            database = self.database_variable.resolve(context)
+
         # Retrieve the queryset and create the paginator object.
         objects = self.objects.resolve(context)
         paginator = self.paginator(
-            objects, per_page, first_page=first_page, orphans=settings.ORPHANS)
+            objects, per_page, first_page=first_page, orphans=settings.ORPHANS,
+            request=context['request'], querystring_key=querystring_key,
+            database=database)
 
         # Normalize the default page number if a negative one is provided.
         if default_number < 0:
@@ -303,12 +401,25 @@ class PaginateNode(template.Node):
                 default_number, paginator.page_range)
 
         # The current request is used to get the requested page number.
-        page_number = utils.get_page_number_from_request(
+        # A range of pages can also be requested, e.g. ``?page=2-5``.
+        first_number, page_number = utils.get_page_range_from_request(
             context['request'], querystring_key, default=default_number)
 
-        # Get the page.
+        # Get the page, retrieving all the pages in the range at once.
+        # Pages that are too deep are either capped or not found, depending
+        # on *settings.DEEP_PAGE_ACTION*.
         try:
-            page = paginator.page(page_number)
+            if first_number == page_number:
+                page = paginator.page(page_number)
+            else:
+                page = paginator.page_window(first_number, page_number)
+        except PageTooDeep as err:
+            if settings.DEEP_PAGE_ACTION == '404':
+                raise Http404('That page is too deep')
+            try:
+                page = paginator.page(err.max_number)
+            except EmptyPage:
+                page = paginator.page(1)
         except EmptyPage:
             page = paginator.page(1)
 
@@ -353,7 +464,8 @@ def show_more(context, label=None, loading=settings.LOADING):
         querystring_key = data['querystring_key']
         querystring = utils.get_querystring_for_page(
             request, page_number, querystring_key,
-            default_number=data['default_number'])
+            default_number=data['default_number'],
+            params=page.paginator.get_querystring_params())
         return {
             'label': label,
             'loading': loading,
@@ -686,3 +798,49 @@ class ShowCurrentNumberNode(template.Node):
             return utils.text(page_number)
         context[self.var_name] = page_number
         return ''
+
+
+@register.tag
+def endless_fragment(parser, token):
+    """Mark a fragment of the template that can be rendered on its own.
+
+    Usage:
+
+    .. code-block:: html+django
+
+        {% endless_fragment "entries" %}
+            {% paginate entries %}
+            {% for entry in entries %}
+                {# your code to show the entry #}
+            {% endfor %}
+            {% show_more %}
+        {% end_endless_fragment %}
+
+    The fragment contents are rendered in place as usual. However, the
+    fragment can also be used as a page template, e.g. in views decorated
+    with ``@page_template('myapp/entry_index.html#entries')``: in this case
+    Ajax requests only render the fragment, without evaluating the rest of
+    the template, and there is no need to keep a separate page template in
+    sync with the main one. See *endless_pagination.loaders.FragmentLoader*.
+    """
+    bits = token.split_contents()
+    if len(bits) != 2:
+        msg = '%r tag requires a single fragment name argument' % bits[0]
+        raise template.TemplateSyntaxError(msg)
+    name = bits[1]
+    if name[0] in ('"', "'") and name[-1] == name[0]:
+        name = name[1:-1]
+    nodelist = parser.parse(('end_endless_fragment',))
+    parser.delete_first_token()
+    return FragmentNode(name, nodelist)
+
+
+class FragmentNode(template.Node):
+    """Render a named fragment of the template."""
+
+    def __init__(self, name, nodelist):
+        self.name = name
+        self.nodelist = nodelist
+
+    def render(self, context):
+        return self.nodelist.render(context)
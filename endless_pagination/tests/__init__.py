@@ -22,4 +22,11 @@ class TestModel(models.Model, utils.UnicodeMixin):
         return 'TestModel: {0}'.format(self.id)
 
 
+class NullableTestModel(models.Model):
+    """A test model including a nullable field."""
+
+    value = models.IntegerField(null=True)
+    test_model = models.ForeignKey(TestModel, null=True)
+
+
 call_command('syncdb', verbosity=0)
@@ -47,3 +47,12 @@ class OnScrollPaginationTest(SeleniumTestCase):
         self.get(page=5)
         with self.assertNewElements('object', range(41, 51)):
             self.scroll_down()
+
+
+class OnScrollFallbackPaginationTest(OnScrollPaginationTest):
+    """Test on scroll pagination using scroll events.
+
+    Scroll events are used when IntersectionObserver is not available.
+    """
+
+    view_name = 'onscroll-fallback'
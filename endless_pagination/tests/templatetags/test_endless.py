@@ -1,6 +1,7 @@
 """Endless template tags tests."""
 
 from __future__ import unicode_literals
+import re
 import string
 import sys
 import xml.etree.ElementTree as etree
@@ -10,6 +11,8 @@ from django.template import (
     Template,
     TemplateSyntaxError,
 )
+from django.core.cache import cache
+from django.http import Http404
 from django.test import TestCase
 from django.test.client import RequestFactory
 from django.utils import unittest
@@ -21,6 +24,8 @@ from endless_pagination.settings import (
     PER_PAGE,
 )
 from endless_pagination.tests import make_model_instances
+from endless_pagination.tests.test_models import local_settings
+from endless_pagination.tests.test_paginators import SearchTestMixin
 
 
 skip_if_old_etree = unittest.skipIf(
@@ -233,6 +238,37 @@ class PaginateTestMixin(TemplateTagsTestMixin):
         _, context = self.render(self.request(page=0), template)
         self.assertRangeEqual(range(5), context['objects'])
 
+    def test_page_range(self):
+        # Ensure the objects of all the pages in the requested range are
+        # added to the context.
+        template = '{% $tagname 5 objects %}'
+        _, context = self.render(self.request(page='2-4'), template)
+        self.assertRangeEqual(range(5, 20), context['objects'])
+        self.assertEqual(4, context['endless']['page'].number)
+
+    def test_invalid_page_range(self):
+        # The first page is displayed if an invalid range is provided.
+        template = '{% $tagname 5 objects %}'
+        _, context = self.render(self.request(page='20-30'), template)
+        self.assertRangeEqual(range(5), context['objects'])
+
+    def test_deep_page_capped(self):
+        # The deepest allowed page is displayed if the requested one is too
+        # deep.
+        template = '{% $tagname 5 objects %}'
+        with local_settings(DEEP_PAGE_MAX_NUMBER=3):
+            _, context = self.render(self.request(page=5), template)
+        self.assertRangeEqual(range(10, 15), context['objects'])
+        self.assertEqual(3, context['endless']['page'].number)
+
+    def test_deep_page_not_found(self):
+        # A 404 error is raised if the page is too deep and the deep page
+        # action is '404'.
+        template = '{% $tagname 5 objects %}'
+        with local_settings(DEEP_PAGE_MAX_OFFSET=10, DEEP_PAGE_ACTION='404'):
+            with self.assertRaises(Http404):
+                self.render(self.request(page=4), template)
+
     def test_nested_context_variable(self):
         # Ensure nested context variables are correctly handled.
         manager = {'all': range(47)}
@@ -266,6 +302,22 @@ class PaginateTestMixin(TemplateTagsTestMixin):
         self.assertSequenceEqual(letters[10:15], context['myentries'])
         self.assertSequenceEqual(letters, context['entries']['all'])
 
+    def test_using_db_argument(self):
+        # Ensure the database alias is passed to the paginator.
+        template = '{% $tagname objects using "mypage" using_db "replica" %}'
+        _, context = self.render(self.request(), template)
+        paginator = context['endless']['page'].paginator
+        self.assertEqual('replica', paginator.database)
+        self.assertEqual('mypage', context['endless']['querystring_key'])
+
+    def test_using_db_argument_as_variable(self):
+        # Ensure the database alias can be provided as context variable.
+        template = '{% $tagname objects using_db alias %}'
+        _, context = self.render(
+            self.request(), template, objects=range(47), alias='replica')
+        paginator = context['endless']['page'].paginator
+        self.assertEqual('replica', paginator.database)
+
 
 class PaginateTest(PaginateTestMixin, TestCase):
 
@@ -347,6 +399,103 @@ class LazyPaginateTest(PaginateTestMixin, TestCase):
         self.assertPaginationNumQueries(1, template)
 
 
+class SnapshotPaginateTest(PaginateTestMixin, TestCase):
+
+    tagname = 'snapshot_paginate'
+
+    def setUp(self):
+        super(SnapshotPaginateTest, self).setUp()
+        self.addCleanup(cache.clear)
+
+    def test_num_queries(self):
+        # Ensure paginating objects hits the database for the correct number
+        # of times: primary keys are retrieved only once.
+        template = '{% $tagname 10 objects %}'
+        objects = self.assertPaginationNumQueries(2, template)
+        self.assertEqual(10, len(objects))
+
+    def test_num_queries_using_snapshot(self):
+        # Only the objects in the page are retrieved if the snapshot token
+        # is provided in the request.
+        queryset = make_model_instances(47)
+        template = '{% $tagname 10 objects %}{% show_more %}'
+        html, _ = self.render(self.request(), template, objects=queryset)
+        url = re.search(r'href="([^"]+)"', html).group(1)
+        request = self.factory.get(url.replace('&amp;', '&'))
+        with self.assertNumQueries(1):
+            _, context = self.render(request, template, objects=queryset)
+            objects = list(context['objects'])
+        self.assertSequenceEqual(queryset[10:20], objects)
+
+    def test_snapshot_token_in_links(self):
+        # The snapshot token is included in the page links.
+        template = '{% $tagname 10 objects %}{% show_more %}'
+        html, context = self.render(
+            self.request(), template, objects=make_model_instances(20))
+        token = context['endless']['page'].paginator.token
+        self.assertIn('page_snapshot={0}'.format(token), html)
+
+
+class MergedPaginateTest(TemplateTagsTestMixin, TestCase):
+
+    template = (
+        '{% merged_paginate 5 sources as objects %}'
+        '{% for obj in objects %}{{ obj.pk }} {% endfor %}{% show_more %}')
+
+    def setUp(self):
+        super(MergedPaginateTest, self).setUp()
+        queryset = make_model_instances(12).order_by('-id')
+        self.pks = sorted([obj.pk for obj in queryset], reverse=True)
+        self.sources = [
+            queryset.filter(pk__in=self.pks[::2]),
+            queryset.filter(pk__in=self.pks[1::2]),
+        ]
+
+    def test_follow_links(self):
+        # All the objects can be retrieved following the show more links.
+        request = self.request()
+        pks = []
+        for _ in range(3):
+            _, context = self.render(
+                request, self.template, sources=self.sources)
+            pks.extend(obj.pk for obj in context['objects'])
+            page = context['endless']['page']
+            if not page.has_next():
+                break
+            params = page.paginator.get_querystring_params()
+            request = self.request(page=page.number + 1, data=params)
+        self.assertEqual(self.pks, pks)
+
+    def test_invalid_cursor(self):
+        # The first page is displayed if the cursor is not valid.
+        request = self.request(page=2, data={'page_cursor': 'invalid'})
+        _, context = self.render(request, self.template, sources=self.sources)
+        self.assertEqual(1, context['endless']['page'].number)
+
+
+class SearchPaginateTest(SearchTestMixin, TemplateTagsTestMixin, TestCase):
+
+    template = (
+        '{% search_paginate 6 results as objects %}'
+        '{% for obj in objects %}{{ obj.pk }} {% endfor %}{% show_more %}')
+
+    def test_follow_links(self):
+        # All the results can be retrieved following the show more links.
+        request = self.request()
+        pks = []
+        for _ in range(5):
+            html, context = self.render(
+                request, self.template, results=self.search())
+            pks.extend(obj.pk for obj in context['objects'])
+            page = context['endless']['page']
+            if not page.has_next():
+                break
+            params = page.paginator.get_querystring_params()
+            self.assertIn('page_cursor=', html)
+            request = self.request(page=page.number + 1, data=params)
+        self.assertEqual(self.pks, pks)
+
+
 @skip_if_old_etree
 class ShowMoreTest(EtreeTemplateTagsTestMixin, TestCase):
 
@@ -367,6 +516,14 @@ class ShowMoreTest(EtreeTemplateTagsTestMixin, TestCase):
         expected = '/?{0}={1}'.format(PAGE_LABEL, 4)
         self.assertEqual(expected, link.attrib['href'])
 
+    def test_page_range_next_url(self):
+        # Ensure the link points to the page after the requested range.
+        template = '{% paginate objects %}{% show_more %}'
+        tree = self.render(self.request(page='1-3'), template)
+        link = tree.find('.//a[@class="endless_more"]')
+        expected = '/?{0}={1}'.format(PAGE_LABEL, 4)
+        self.assertEqual(expected, link.attrib['href'])
+
     def test_last_page(self):
         # Ensure the output for the last page is empty.
         template = '{% paginate 40 objects %}{% show_more %}'
@@ -552,3 +709,28 @@ class ShowCurrentNumberTest(TemplateTagsTestMixin, TestCase):
         for template in templates:
             with self.assertRaises(TemplateSyntaxError):
                 self.render(request, template)
+
+
+class EndlessFragmentTest(TemplateTagsTestMixin, TestCase):
+
+    def test_render(self):
+        # Ensure the fragment contents are rendered in place.
+        template = (
+            'before {% endless_fragment "entries" %}'
+            '{% paginate 3 objects %}{{ objects|length }}'
+            '{% end_endless_fragment %} after'
+        )
+        html, context = self.render(self.request(), template)
+        self.assertEqual('before 3 after', html)
+
+    def test_unquoted_name(self):
+        # Ensure the fragment name can be provided without quotes.
+        template = '{% endless_fragment entries %}a{% end_endless_fragment %}'
+        html, context = self.render(self.request(), template)
+        self.assertEqual('a', html)
+
+    def test_invalid_arguments(self):
+        # An error is raised if the fragment name is not provided.
+        template = '{% endless_fragment %}{% end_endless_fragment %}'
+        with self.assertRaises(TemplateSyntaxError):
+            self.render(self.request(), template)
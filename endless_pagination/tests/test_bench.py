@@ -0,0 +1,68 @@
+"""Benchmark command tests."""
+
+from __future__ import unicode_literals
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase
+from django.utils.six import StringIO
+
+from project.bench import paginators
+from project.models import BenchItem
+
+
+class BenchCommandTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.output = os.path.join(directory, 'results.json')
+        self.addCleanup(self.delete_datasets)
+
+    def delete_datasets(self):
+        """Remove the datasets from the benchmark database."""
+        connection = connections[paginators.DATABASE]
+        connection.cursor().execute('DELETE FROM {0}'.format(
+            connection.ops.quote_name(BenchItem._meta.db_table)))
+
+    def bench(self, **kwargs):
+        """Run the benchmark command on a tiny dataset, and return the log."""
+        stdout = StringIO()
+        options = {
+            'sizes': '25',
+            'paginators': 'endless_pagination.paginators.DefaultPaginator',
+            'repeat': 1,
+            'stdout': stdout,
+        }
+        options.update(kwargs)
+        call_command('bench', **options)
+        return stdout.getvalue()
+
+    def test_report(self):
+        # The results include the metrics of each case.
+        log = self.bench(output=self.output)
+        self.assertIn('Created dataset with 25 items.', log)
+        with open(self.output) as results_file:
+            results = json.load(results_file)
+        cases = ['DefaultPaginator/25/' + depth
+                 for depth in ('deep', 'mid', 'shallow')]
+        self.assertEqual(cases, sorted(results))
+        for case in cases:
+            self.assertIn(case, log)
+            metrics = results[case]
+            self.assertEqual(
+                ['peak_memory', 'queries', 'rows', 'time'], sorted(metrics))
+            self.assertEqual(2, metrics['queries'])
+        self.assertEqual(10, results['DefaultPaginator/25/shallow']['rows'])
+        self.assertEqual(5, results['DefaultPaginator/25/deep']['rows'])
+
+    def test_compare(self):
+        # Results can be compared to a baseline.
+        self.bench(output=self.output)
+        log = self.bench(compare=self.output, threshold=1000)
+        self.assertNotIn('Created dataset', log)
+        self.assertIn('DefaultPaginator/25/deep queries: 2 -> 2', log)
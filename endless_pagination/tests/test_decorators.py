@@ -1,7 +1,9 @@
 """Decorator tests."""
 
 from __future__ import unicode_literals
+import xml.etree.ElementTree as etree
 
+from django.template.loader import render_to_string
 from django.test import TestCase
 from django.test.client import RequestFactory
 
@@ -23,6 +25,8 @@ class DecoratorsTestMixin(object):
         self.page_url = '/?page=2&mypage=10&querystring_key=page'
         self.mypage = 'mypage.html'
         self.mypage_url = '/?page=2&mypage=10&querystring_key=mypage'
+        self.batch_url = (
+            '/?page=2&mypage=10&querystring_key=page&querystring_key=mypage')
 
     def get_decorator(self):
         """Return the decorator that must be exercised."""
@@ -71,6 +75,22 @@ class DecoratorsTestMixin(object):
         templates = view(self.factory.get(self.page_url, **self.ajax_headers))
         self.assertTemplatesEqual(self.page, self.page, templates)
 
+    def test_is_page_request(self):
+        # Ensure the request is marked as a page request if the request is
+        # Ajax and only the page template is rendered.
+        view = self.decorate(self.arg)
+        request = self.factory.get(self.page_url, **self.ajax_headers)
+        view(request)
+        self.assertTrue(request.endless_is_page_request)
+
+    def test_is_not_page_request(self):
+        # Ensure the request is not marked as a page request if the request
+        # is not Ajax.
+        view = self.decorate(self.arg)
+        request = self.factory.get(self.page_url)
+        view(request)
+        self.assertFalse(request.endless_is_page_request)
+
     def test_unexistent_page(self):
         # Ensure the default page and is returned if the querystring points
         # to a page that is not defined.
@@ -132,7 +152,87 @@ class PageTemplatesTest(DecoratorsTestMixin, TestCase):
             self.factory.get(self.mypage_url, **self.ajax_headers))
         self.assertTemplatesEqual(self.mypage, self.mypage, templates)
 
+    def test_ajax_batch_request(self):
+        # Ensure all the requested page templates are rendered at once
+        # if multiple querystring keys are provided.
+        view = self.decorate(self.arg)
+        templates = view(
+            self.factory.get(self.batch_url, **self.ajax_headers))
+        self.assertTemplatesEqual(
+            decorators.BATCH_TEMPLATE, self.page, templates)
+
+    def test_ajax_batch_request_context(self):
+        # Ensure the requested templates are included in the context.
+        def view(request, extra_context=None, template=self.default):
+            return template, extra_context['endless_batch']
+
+        decorated = self.get_decorator()(self.arg)(view)
+        template, batch = decorated(
+            self.factory.get(self.batch_url, **self.ajax_headers))
+        expected = [('page', self.page), ('mypage', self.mypage)]
+        self.assertSequenceEqual(expected, batch)
+
+    def test_batch_request(self):
+        # The view still uses the default template if the request is not Ajax.
+        view = self.decorate(self.arg)
+        templates = view(self.factory.get(self.batch_url))
+        self.assertTemplatesEqual(self.default, self.mypage, templates)
+
+    def test_batch_template(self):
+        # Ensure the batch template wraps each page template.
+        batch = [
+            ('page', 'endless/current_link.html'),
+            ('mypage', 'endless/current_link.html'),
+        ]
+        html = render_to_string(
+            decorators.BATCH_TEMPLATE,
+            {'endless_batch': batch, 'page': {'label': 'current'}})
+        tree = etree.fromstring('<html>{0}</html>'.format(html))
+        fragments = tree.findall('div')
+        self.assertEqual(2, len(fragments))
+        for (key, _), fragment in zip(batch, fragments):
+            self.assertEqual(key, fragment.attrib['data-querystring-key'])
+            self.assertEqual('current', fragment.find('.//strong').text)
+
 
 class PageTemplatesWithTupleTest(PageTemplatesTest):
 
     arg = (('page.html', None), ('mypage.html', 'mypage'))
+
+
+class LazyContextTest(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.calls = []
+
+        def get_sidebar(request):
+            self.calls.append(request)
+            return 'sidebar'
+
+        def view(request, extra_context=None, template='default.html'):
+            """Test view that will be decorated in tests."""
+            context = {}
+            if extra_context is not None:
+                context.update(extra_context)
+            return context
+
+        decorator = decorators.lazy_context({'sidebar': get_sidebar})
+        self.view = decorators.page_template('page.html')(decorator(view))
+
+    def test_lazy_value(self):
+        # Ensure lazy values are only computed once, when used.
+        request = self.factory.get('/')
+        context = self.view(request)
+        self.assertEqual([], self.calls)
+        self.assertEqual('sidebar', context['sidebar']())
+        self.assertEqual('sidebar', context['sidebar']())
+        self.assertEqual([request], self.calls)
+
+    def test_page_request(self):
+        # Lazy values are not added if only the page template is rendered.
+        request = self.factory.get(
+            '/', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        context = self.view(request)
+        self.assertNotIn('sidebar', context)
+        self.assertEqual('page.html', context['page_template'])
@@ -0,0 +1,177 @@
+"""Memory-mapped files tests."""
+
+from __future__ import unicode_literals
+import os
+import shutil
+import struct
+import tempfile
+
+from django.test import TestCase
+
+from endless_pagination import files
+
+
+class FileTestMixin(object):
+    """Create files in a temporary directory."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'data.log')
+
+    def write(self, data, mode='wb'):
+        """Write *data* bytes to the test file."""
+        with open(self.path, mode) as data_file:
+            data_file.write(data)
+
+    def get_offsets(self, index_path=None):
+        """Return the offsets stored in the index of the test file."""
+        with open(index_path or self.path + files.INDEX_SUFFIX, 'rb') as f:
+            data = f.read()
+        return list(struct.unpack(str('<{0}Q').format(len(data) // 8), data))
+
+    def get_lines(self, **kwargs):
+        """Return the mapped lines of the test file."""
+        lines = files.MappedLines(self.path, **kwargs)
+        self.addCleanup(lines.close)
+        return lines
+
+
+class MappedLinesTest(FileTestMixin, TestCase):
+
+    def test_lines(self):
+        # Lines are returned without the trailing newline.
+        self.write(b'first\nsecond\r\nthird\n')
+        lines = self.get_lines()
+        self.assertEqual(3, len(lines))
+        self.assertEqual(['first', 'second', 'third'], lines[:])
+        self.assertEqual('second', lines[1])
+        self.assertEqual('third', lines[-1])
+        with self.assertRaises(IndexError):
+            lines[3]
+
+    def test_slice(self):
+        # Lines can be sliced.
+        self.write(b''.join(
+            '{0}\n'.format(i).encode('ascii') for i in range(100)))
+        lines = self.get_lines()
+        self.assertEqual(['10', '11', '12'], lines[10:13])
+        self.assertEqual(['98', '99'], lines[98:120])
+
+    def test_unterminated_line(self):
+        # The last line is included even if it is not terminated.
+        self.write(b'first\nsecond')
+        lines = self.get_lines()
+        self.assertEqual(['first', 'second'], lines[:])
+        self.assertEqual([0, 6], self.get_offsets())
+
+    def test_empty_file(self):
+        # Empty files have no lines.
+        self.write(b'')
+        self.assertEqual(0, len(self.get_lines()))
+
+    def test_encoding(self):
+        # Lines are decoded using the given encoding.
+        self.write('caff\xe8\n'.encode('latin-1'))
+        self.assertEqual('caff\xe8', self.get_lines(encoding='latin-1')[0])
+        self.assertEqual(b'caff\xe8', self.get_lines(encoding=None)[0])
+
+
+class IndexTest(FileTestMixin, TestCase):
+
+    def test_sidecar(self):
+        # The index is stored next to the file.
+        self.write(b'a\nbb\nccc\n')
+        self.get_lines()
+        self.assertEqual([0, 2, 5, 9], self.get_offsets())
+
+    def test_reused(self):
+        # The file is not scanned again if the index is up to date.
+        self.write(b'a\nb\n')
+        self.get_lines()
+        # Alter the index so that it is still valid.
+        index_path = self.path + files.INDEX_SUFFIX
+        files.save_index(index_path, [0, 4])
+        self.assertEqual(['a\nb'], self.get_lines()[:])
+
+    def test_growth(self):
+        # Only the new lines are scanned when the file grows.
+        self.write(b'a\nb\nunterminated')
+        self.get_lines()
+        self.write(b' line\nc\n', mode='ab')
+        lines = self.get_lines()
+        self.assertEqual(['a', 'b', 'unterminated line', 'c'], lines[:])
+        self.assertEqual([0, 2, 4, 22, 24], self.get_offsets())
+
+    def test_truncated(self):
+        # The index is rebuilt if the file shrinks.
+        self.write(b'first\nsecond\n')
+        self.get_lines()
+        self.write(b'a\n')
+        self.assertEqual(['a'], self.get_lines()[:])
+
+    def test_rewritten(self):
+        # The index is rebuilt if it does not match the file.
+        self.write(b'first\nsecond\n')
+        self.get_lines()
+        self.write(b'one\ntwo\nthree\n')
+        self.assertEqual(['one', 'two', 'three'], self.get_lines()[:])
+
+    def test_read_only(self):
+        # Lines are still indexed if the index cannot be written.
+        self.write(b'a\nb\n')
+        index_path = os.path.join(self.directory, 'missing', 'data.idx')
+        lines = self.get_lines(index_path=index_path)
+        self.assertEqual(['a', 'b'], lines[:])
+        self.assertFalse(os.path.exists(index_path))
+
+    def test_format(self):
+        # Offsets are stored as little-endian 64-bit integers.
+        self.write(b'a\n')
+        self.get_lines()
+        with open(self.path + files.INDEX_SUFFIX, 'rb') as index_file:
+            self.assertEqual(b'\0' * 8 + b'\2' + b'\0' * 7, index_file.read())
+
+    def test_longer_index(self):
+        # Offsets past the end of the mapped file are ignored.
+        self.write(b'a\nb\n')
+        lines = self.get_lines()
+        index = files.pack_offsets([0, 2, 4, 6])
+        self.assertEqual(3, files.count_offsets(index, lines.size))
+        self.assertEqual(4, files.count_offsets(index, 6))
+        self.assertTrue(files.is_valid_index(lines._data, index, 3))
+        self.assertFalse(files.is_valid_index(lines._data, index))
+
+
+class GetOffsetTest(TestCase):
+
+    def test_get_offset(self):
+        # Offsets are unpacked from the given position.
+        index = files.pack_offsets([0, 3, 2 ** 40])
+        self.assertEqual(3, files.get_offset(index, 1))
+        self.assertEqual(2 ** 40, files.get_offset(index, 2))
+
+
+class SaveIndexTest(FileTestMixin, TestCase):
+
+    def test_replace(self):
+        # The index is replaced, keeping the given existing offsets.
+        index_path = self.path + files.INDEX_SUFFIX
+        self.assertTrue(files.save_index(index_path, [0, 2]))
+        index = files.load_index(index_path)
+        self.addCleanup(index.close)
+        self.assertTrue(files.save_index(index_path, [4, 6], index))
+        self.assertEqual([0, 2, 4, 6], self.get_offsets())
+        # The previously mapped index is not affected.
+        self.assertEqual(2, files.get_offset(index, 1))
+        self.assertEqual(16, len(index))
+        # No temporary files are left.
+        self.assertEqual(['data.log.lineidx'], os.listdir(self.directory))
+
+    def test_context_manager(self):
+        # Mapped lines can be used as a context manager.
+        self.write(b'a\n')
+        with files.MappedLines(self.path) as lines:
+            self.assertEqual(['a'], lines[:])
+        with self.assertRaises(ValueError):
+            lines[0]
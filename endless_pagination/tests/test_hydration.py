@@ -0,0 +1,164 @@
+"""Cache hydration tests."""
+
+from __future__ import unicode_literals
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.signals import post_delete
+from django.test import TestCase
+
+from endless_pagination import (
+    hydration,
+    paginators,
+)
+from endless_pagination.tests import (
+    make_model_instances,
+    TestModel,
+)
+
+
+class HydrationTestMixin(object):
+    """Register the test model for cache hydration."""
+
+    def setUp(self):
+        hydration.register(TestModel)
+        self.addCleanup(hydration.unregister, TestModel)
+        self.addCleanup(cache.clear)
+        self.queryset = make_model_instances(10)
+        self.pks = [obj.pk for obj in self.queryset]
+
+
+class RegistryTest(TestCase):
+
+    def test_register(self):
+        # Models can be registered and unregistered.
+        hydration.register(TestModel, timeout=60)
+        self.assertTrue(hydration.is_registered(TestModel))
+        hydration.unregister(TestModel)
+        self.assertFalse(hydration.is_registered(TestModel))
+
+    def test_cache_key(self):
+        # The cache key includes the model label and the primary key.
+        key = hydration.get_cache_key(TestModel, 42)
+        label = TestModel._meta.app_label + '.TestModel'
+        self.assertEqual('endless_pagination:object:' + label + ':42', key)
+
+
+class HydrateTest(HydrationTestMixin, TestCase):
+
+    def test_order(self):
+        # Objects are returned in the order of the given primary keys.
+        pks = self.pks[::-2]
+        objects = hydration.hydrate(self.queryset, pks)
+        self.assertEqual(pks, [obj.pk for obj in objects])
+
+    def test_cached(self):
+        # Objects are only retrieved from the database the first time.
+        pks = self.pks[:5]
+        with self.assertNumQueries(1):
+            hydration.hydrate(self.queryset, pks)
+        with self.assertNumQueries(0):
+            objects = hydration.hydrate(self.queryset, pks)
+        self.assertSequenceEqual(self.queryset[:5], objects)
+
+    def test_misses(self):
+        # Only the objects missing from the cache are retrieved.
+        hydration.hydrate(self.queryset, self.pks[:5])
+        with self.assertNumQueries(1):
+            objects = hydration.hydrate(self.queryset, self.pks)
+        self.assertSequenceEqual(self.queryset, objects)
+
+    def test_missing_objects(self):
+        # Objects that do not exist are skipped.
+        pks = [self.pks[0], 0, self.pks[1]]
+        objects = hydration.hydrate(self.queryset, pks)
+        self.assertEqual(self.pks[:2], [obj.pk for obj in objects])
+
+    def test_invalidate_on_save(self):
+        # Objects are removed from the cache when saved.
+        hydration.hydrate(self.queryset, self.pks[:1])
+        self.queryset[0].save()
+        with self.assertNumQueries(1):
+            hydration.hydrate(self.queryset, self.pks[:1])
+
+    def test_invalidate_on_delete(self):
+        # Objects are removed from the cache when deleted.
+        obj = hydration.hydrate(self.queryset, self.pks[:1])[0]
+        post_delete.send(sender=TestModel, instance=obj)
+        key = hydration.get_cache_key(TestModel, obj.pk)
+        self.assertIsNone(cache.get(key))
+
+    def test_not_registered(self):
+        # Objects of models not registered are always retrieved from the
+        # database.
+        hydration.unregister(TestModel)
+        hydration.hydrate(self.queryset, self.pks)
+        with self.assertNumQueries(1):
+            hydration.hydrate(self.queryset, self.pks)
+
+    def test_values(self):
+        # Values querysets are retrieved from the database, in the order of
+        # the queryset.
+        queryset = self.queryset.values('id')
+        pks = self.pks[1:3]
+        hydration.hydrate(self.queryset, pks)
+        with self.assertNumQueries(1):
+            objects = hydration.hydrate(queryset, pks[::-1])
+        self.assertEqual([{'id': pk} for pk in pks], objects)
+        queryset = self.queryset.values_list('id', flat=True)
+        self.assertEqual(pks, hydration.hydrate(queryset, pks))
+
+    def test_select_shape(self):
+        # Querysets with a different select shape do not use the cache.
+        querysets = [
+            self.queryset.annotate(Count('id')),
+            self.queryset.extra(select={'answer': '42'}),
+            self.queryset.only('id'),
+            self.queryset.select_related(),
+        ]
+        key = hydration.get_cache_key(TestModel, self.pks[0])
+        for queryset in querysets:
+            self.assertFalse(hydration.is_hydratable(queryset))
+            # Their instances are not stored in the cache.
+            hydration.hydrate(queryset, self.pks[:1])
+            self.assertIsNone(cache.get(key))
+            # Cached plain instances are not returned.
+            hydration.hydrate(self.queryset, self.pks[:1])
+            with self.assertNumQueries(1):
+                hydration.hydrate(queryset, self.pks[:1])
+            cache.clear()
+
+    def test_plain(self):
+        # Plain querysets are hydratable if the model is registered.
+        self.assertTrue(hydration.is_plain(self.queryset.filter(pk=0)))
+        self.assertTrue(hydration.is_hydratable(self.queryset))
+        hydration.unregister(TestModel)
+        self.assertFalse(hydration.is_hydratable(self.queryset))
+
+
+class PaginatorsHydrationTest(HydrationTestMixin, TestCase):
+
+    def test_default_paginator(self):
+        # Only the primary keys are retrieved using the page slice.
+        queryset = TestModel.objects.all()
+        paginators.DefaultPaginator(queryset, 3).page(2)
+        paginator = paginators.DefaultPaginator(queryset, 3)
+        # The count query and the primary keys query.
+        with self.assertNumQueries(2):
+            page = paginator.page(2)
+        self.assertSequenceEqual(self.queryset[3:6], page.object_list)
+
+    def test_lazy_paginator(self):
+        # Lazy pagination also hydrates objects from the cache.
+        paginators.LazyPaginator(self.queryset, 3).page(2)
+        paginator = paginators.LazyPaginator(self.queryset, 3)
+        with self.assertNumQueries(1):
+            page = paginator.page(2)
+        self.assertSequenceEqual(self.queryset[3:6], page.object_list)
+        self.assertTrue(page.has_next())
+
+    def test_values_paginator(self):
+        # Values querysets are paginated without hydration.
+        queryset = TestModel.objects.values_list('id', flat=True)
+        page = paginators.DefaultPaginator(queryset, 3).page(2)
+        self.assertEqual(self.pks[3:6], list(page.object_list))
@@ -0,0 +1,288 @@
+"""Instrumentation tests."""
+
+from __future__ import unicode_literals
+from collections import OrderedDict
+import logging
+import time
+
+from django.http import HttpResponse
+from django.template import (
+    Context,
+    Template,
+)
+from django.test import TestCase
+from django.test.client import RequestFactory
+
+from endless_pagination import (
+    instrumentation,
+    models,
+    paginators,
+)
+from endless_pagination.tests.test_models import local_settings
+
+
+class SignalRecorderMixin(object):
+    """Record the *pagination_phase* signals sent during tests."""
+
+    def setUp(self):
+        self.signals = []
+        instrumentation.pagination_phase.connect(self.receiver)
+        self.addCleanup(
+            instrumentation.pagination_phase.disconnect, self.receiver)
+
+    def receiver(self, **kwargs):
+        kwargs.pop('signal')
+        self.signals.append(kwargs)
+
+    def get_phases(self):
+        """Return the list of phases recorded so far."""
+        return [signal['phase'] for signal in self.signals]
+
+
+class RecordingHandler(logging.Handler):
+    """A logging handler storing the emitted records."""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class SlowSlices(object):
+    """A sequence of *length* numbers whose slices are retrieved lazily.
+
+    Iterating over a slice takes *delay* seconds, like evaluating a sliced
+    queryset.
+    """
+
+    def __init__(self, length, delay):
+        self.length = length
+        self.delay = delay
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, key):
+        return SlowSlice(list(range(self.length))[key], self.delay)
+
+
+class SlowSlice(object):
+    """A slice of *SlowSlices*."""
+
+    def __init__(self, objects, delay):
+        self.objects = objects
+        self.delay = delay
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __iter__(self):
+        time.sleep(self.delay)
+        return iter(self.objects)
+
+
+class InstrumentTest(SignalRecorderMixin, TestCase):
+
+    def setUp(self):
+        super(InstrumentTest, self).setUp()
+
+        def describe(result, value):
+            return {'sender': int, 'number': value, 'rows': result}
+
+        self.double = instrumentation.instrument('double', describe)(
+            lambda value: value * 2)
+
+    def test_disabled(self):
+        # The signal is not sent if instrumentation is disabled.
+        with local_settings(INSTRUMENTATION=False):
+            self.assertEqual(4, self.double(2))
+        self.assertEqual([], self.signals)
+
+    def test_enabled(self):
+        # The signal is sent, including the phase data, if instrumentation
+        # is enabled.
+        with local_settings(INSTRUMENTATION=True):
+            self.assertEqual(4, self.double(2))
+        self.assertEqual(1, len(self.signals))
+        signal = self.signals[0]
+        self.assertGreaterEqual(signal.pop('duration'), 0)
+        expected = {
+            'sender': int,
+            'phase': 'double',
+            'number': 2,
+            'querystring_key': None,
+            'rows': 4,
+        }
+        self.assertEqual(expected, signal)
+
+
+class PaginatorsInstrumentationTest(SignalRecorderMixin, TestCase):
+
+    def test_default_paginator(self):
+        # The count and page phases are instrumented.
+        paginator = paginators.DefaultPaginator(range(30), 10)
+        with local_settings(INSTRUMENTATION=True):
+            paginator.page(2)
+            paginator.page(3)
+        self.assertEqual(['count', 'page', 'page'], self.get_phases())
+        count, page = self.signals[:2]
+        self.assertEqual(paginators.DefaultPaginator, count['sender'])
+        self.assertEqual(30, count['rows'])
+        self.assertEqual(2, page['number'])
+        self.assertEqual(10, page['rows'])
+
+    def test_default_paginator_slice(self):
+        # The duration of the page phase includes retrieving the objects.
+        paginator = paginators.DefaultPaginator(SlowSlices(30, 0.05), 10)
+        with local_settings(INSTRUMENTATION=True):
+            page = paginator.page(2)
+        self.assertEqual(list(range(10, 20)), page.object_list)
+        page_signal = self.signals[-1]
+        self.assertEqual('page', page_signal['phase'])
+        self.assertGreaterEqual(page_signal['duration'], 0.05)
+
+    def test_default_paginator_count(self):
+        # The total number of objects is still cached.
+        paginator = paginators.DefaultPaginator(range(30), 10)
+        with local_settings(INSTRUMENTATION=True):
+            self.assertEqual(30, paginator.count)
+            self.assertEqual(30, paginator.count)
+        self.assertEqual(['count'], self.get_phases())
+
+    def test_lazy_paginator(self):
+        # The page phase is instrumented.
+        paginator = paginators.LazyPaginator(range(30), 10)
+        with local_settings(INSTRUMENTATION=True):
+            paginator.page(3)
+        self.assertEqual(['page'], self.get_phases())
+        page = self.signals[0]
+        self.assertEqual(paginators.LazyPaginator, page['sender'])
+        self.assertEqual(3, page['number'])
+        self.assertEqual(10, page['rows'])
+
+
+class TemplateTagsInstrumentationTest(SignalRecorderMixin, TestCase):
+
+    def setUp(self):
+        super(TemplateTagsInstrumentationTest, self).setUp()
+        self.request = RequestFactory().get('/', {'mypage': 2})
+
+    def render(self, contents):
+        template = Template('{% load endless %}' + contents)
+        context = Context({'objects': range(30), 'request': self.request})
+        with local_settings(INSTRUMENTATION=True):
+            return template.render(context)
+
+    def test_paginate(self):
+        # The paginate phase includes the querystring key.
+        self.render('{% paginate objects using "mypage" %}')
+        self.assertEqual(['count', 'page', 'paginate'], self.get_phases())
+        paginate = self.signals[-1]
+        self.assertEqual(paginators.DefaultPaginator, paginate['sender'])
+        self.assertEqual(2, paginate['number'])
+        self.assertEqual('mypage', paginate['querystring_key'])
+        self.assertEqual(10, paginate['rows'])
+
+    def test_lazy_paginate(self):
+        # The sender of the paginate phase is the paginator class.
+        self.render('{% lazy_paginate objects using "mypage" %}')
+        self.assertEqual(['page', 'paginate'], self.get_phases())
+        paginate = self.signals[-1]
+        self.assertEqual(paginators.LazyPaginator, paginate['sender'])
+
+    def test_page_list(self):
+        # The rendering of the page links is instrumented.
+        self.render('{% paginate objects using "mypage" %}{% show_pages %}')
+        self.assertEqual('page_list', self.get_phases()[-1])
+        page_list = self.signals[-1]
+        self.assertEqual(2, page_list['number'])
+        self.assertEqual('mypage', page_list['querystring_key'])
+        self.assertIsNone(page_list['rows'])
+
+    def test_disabled(self):
+        # No signals are sent if instrumentation is disabled.
+        page = paginators.DefaultPaginator(range(30), 10).page(1)
+        page_list = models.PageList(self.request, page, 'mypage')
+        page_list.__unicode__()
+        self.assertEqual([], self.signals)
+
+
+class LogPhaseTest(TestCase):
+
+    def setUp(self):
+        self.handler = RecordingHandler()
+        logger = instrumentation.logger
+        original_level = logger.level
+        logger.addHandler(self.handler)
+        logger.setLevel(logging.DEBUG)
+        self.addCleanup(logger.removeHandler, self.handler)
+        self.addCleanup(logger.setLevel, original_level)
+
+    def test_record(self):
+        # Log records include the phase data.
+        instrumentation.log_phase(
+            paginators.DefaultPaginator, phase='page', duration=0.5,
+            number=2, querystring_key='page', rows=10)
+        record = self.handler.records[0]
+        self.assertEqual(logging.DEBUG, record.levelno)
+        self.assertEqual(
+            'pagination phase=page duration=0.500000 '
+            'paginator=DefaultPaginator number=2 querystring_key=page '
+            'rows=10', record.getMessage())
+        expected = {
+            'paginator': 'DefaultPaginator',
+            'phase': 'page',
+            'duration': 0.5,
+            'number': 2,
+            'querystring_key': 'page',
+            'rows': 10,
+        }
+        self.assertEqual(expected, record.endless_pagination)
+
+
+class ServerTimingMiddlewareTest(TestCase):
+
+    def setUp(self):
+        self.middleware = instrumentation.ServerTimingMiddleware()
+        self.request = RequestFactory().get('/')
+        self.paginator = paginators.DefaultPaginator(range(30), 10)
+
+    def process(self, response=None):
+        """Process the request, retrieving the first page of objects."""
+        if response is None:
+            response = HttpResponse()
+        self.middleware.process_request(self.request)
+        self.paginator.page(1)
+        return self.middleware.process_response(self.request, response)
+
+    def test_header(self):
+        # The phases durations are exposed in the response header.
+        with local_settings(INSTRUMENTATION=True):
+            response = self.process()
+        metrics = [
+            metric.split(';')[0]
+            for metric in response['Server-Timing'].split(', ')]
+        self.assertEqual(['endless-count', 'endless-page'], metrics)
+
+    def test_existing_header(self):
+        # Durations are appended to existing metrics.
+        response = HttpResponse()
+        response['Server-Timing'] = 'db;dur=1.000'
+        with local_settings(INSTRUMENTATION=True):
+            response = self.process(response)
+        self.assertTrue(
+            response['Server-Timing'].startswith('db;dur=1.000, endless-'))
+
+    def test_disabled(self):
+        # The header is not added if instrumentation is disabled.
+        response = self.process()
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_get_server_timing(self):
+        # Durations are expressed in milliseconds.
+        timings = OrderedDict([('count', 0.001), ('page', 1)])
+        self.assertEqual(
+            'endless-count;dur=1.000, endless-page;dur=1000.000',
+            instrumentation.get_server_timing(timings))
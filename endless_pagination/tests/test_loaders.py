@@ -4,7 +4,15 @@ from __future__ import unicode_literals
 from contextlib import contextmanager
 
 from django.core.exceptions import ImproperlyConfigured
+from django.template import (
+    Context,
+    Template,
+    TemplateDoesNotExist,
+)
+from django.template.loader import render_to_string
 from django.test import TestCase
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
 
 from endless_pagination import loaders
 
@@ -89,3 +97,99 @@ class LoadObjectTest(ImproperlyConfiguredTestMixin, TestCase):
         path = '.'.join((self.module, '__does_not_exist__'))
         with self.assertImproperlyConfigured('object'):
             loaders.load_object(path)
+
+
+class GetFragmentTest(TestCase):
+
+    def setUp(self):
+        self.template = Template(
+            '{% load endless %}'
+            '{% if show %}header{% endif %}'
+            '{% block content %}'
+            '<ul>{% endless_fragment "entries" %}'
+            '{% for entry in entries %}<li>{{ entry }}</li>{% endfor %}'
+            '{% end_endless_fragment %}</ul>'
+            '{% endblock %}',
+            name='index.html')
+
+    def render(self, template, **kwargs):
+        return template.render(Context(kwargs))
+
+    def test_fragment(self):
+        # Ensure only the fragment contents are rendered.
+        fragment = loaders.get_fragment(self.template, 'entries')
+        html = self.render(fragment, entries=[1, 2], show=True)
+        self.assertEqual('<li>1</li><li>2</li>', html)
+
+    def test_block(self):
+        # Ensure blocks can be used as fragments.
+        fragment = loaders.get_fragment(self.template, 'content')
+        html = self.render(fragment, entries=[1], show=True)
+        self.assertEqual('<ul><li>1</li></ul>', html)
+
+    def test_name(self):
+        # Ensure the fragment template name includes the fragment name.
+        fragment = loaders.get_fragment(self.template, 'entries')
+        self.assertEqual('index.html#entries', fragment.name)
+
+    def test_template_attributes(self):
+        # Ensure the fragment template shares the origin and the engine of
+        # the source template.
+        fragment = loaders.get_fragment(self.template, 'entries')
+        self.assertIs(
+            getattr(self.template, 'origin', None),
+            getattr(fragment, 'origin', None))
+        self.assertIs(
+            getattr(self.template, 'engine', None),
+            getattr(fragment, 'engine', None))
+
+    def test_missing_fragment(self):
+        # An error is raised if the fragment does not exist.
+        with self.assertRaises(TemplateDoesNotExist):
+            loaders.get_fragment(self.template, 'does_not_exist')
+
+    def test_cached_lookup(self):
+        # Ensure the fragment lookup is only built once for each template.
+        loaders.get_fragment(self.template, 'entries')
+        self.assertIn(self.template, loaders._fragments_cache)
+        fragments = loaders._fragments_cache[self.template]
+        fragments['cached'] = fragments['entries']
+        fragment = loaders.get_fragment(self.template, 'cached')
+        self.assertEqual('<li>1</li>', self.render(fragment, entries=[1]))
+
+
+@override_settings(TEMPLATE_LOADERS=(
+    'endless_pagination.loaders.FragmentLoader',
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+))
+class FragmentLoaderTest(TestCase):
+
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+
+    def test_fragment(self):
+        # Ensure a fragment of a template can be loaded and rendered.
+        html = render_to_string('twitter/index.html#content', {
+            'objects': range(10),
+            'page_template': 'twitter/page.html',
+            'request': self.request,
+        })
+        self.assertIn('<div class="span12">', html)
+        self.assertEqual(5, html.count('<h4>'))
+        self.assertNotIn('<html', html)
+
+    def test_missing_fragment(self):
+        # An error is raised if the fragment does not exist.
+        with self.assertRaises(TemplateDoesNotExist):
+            render_to_string('twitter/index.html#does_not_exist')
+
+    def test_missing_template(self):
+        # An error is raised if the template does not exist.
+        with self.assertRaises(TemplateDoesNotExist):
+            render_to_string('does_not_exist.html#content')
+
+    def test_not_a_fragment(self):
+        # Ensure regular templates are left to the other loaders.
+        with self.assertRaises(TemplateDoesNotExist):
+            loaders.FragmentLoader().load_template('twitter/index.html')
@@ -1,10 +1,41 @@
 """Paginator tests."""
 
 from __future__ import unicode_literals
+from array import array
+import datetime
+import os
+import shutil
+import tempfile
+import threading
+import zlib
 
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import (
+    connection,
+    DatabaseError,
+)
 from django.test import TestCase
+from django.test.client import RequestFactory
+from django.utils import unittest
 
-from endless_pagination import paginators
+from endless_pagination import (
+    files,
+    instrumentation,
+    paginators,
+    utils,
+)
+from endless_pagination.tests import (
+    make_model_instances,
+    NullableTestModel,
+    TestModel,
+)
+from endless_pagination.tests.test_models import local_settings
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class PaginatorTestMixin(object):
@@ -49,6 +80,105 @@ class PaginatorTestMixin(object):
         with self.assertRaises(paginators.EmptyPage):
             self.paginator.page(0)
 
+    def test_page_window(self):
+        # Ensure a page including objects of multiple pages can be retrieved.
+        first_page = self.paginator.first_page
+        expected = self.items[first_page:first_page + self.per_page * 2]
+        page = self.paginator.page_window(2, 3)
+        self.assertSequenceEqual(expected, page.object_list)
+        self.assertEqual(2, page.first_number)
+        self.assertEqual(3, page.number)
+
+    def test_page_window_orphans(self):
+        # Ensure orphans are included when the window ends on the last page.
+        first_page = self.paginator.first_page
+        object_list = self.paginator.page_window(2, 4).object_list
+        self.assertSequenceEqual(self.items[first_page:], object_list)
+
+    def test_page_window_next_page(self):
+        # Ensure the page after the window is the next page.
+        page = self.paginator.page_window(1, 2)
+        self.assertTrue(page.has_next())
+        self.assertEqual(3, page.next_page_number())
+
+    def test_invalid_page_window(self):
+        # An error is raised if the requested window is not valid.
+        with self.assertRaises(paginators.EmptyPage):
+            self.paginator.page_window(3, 2)
+        with self.assertRaises(paginators.EmptyPage):
+            self.paginator.page_window(2, 5)
+
+    def test_max_number(self):
+        # An error is raised if the page is deeper than the maximum number.
+        with local_settings(DEEP_PAGE_MAX_NUMBER=2):
+            self.paginator.page(2)
+            with self.assertRaises(paginators.PageTooDeep) as cm:
+                self.paginator.page(3)
+        self.assertEqual(2, cm.exception.max_number)
+        self.assertEqual('number', cm.exception.reason)
+
+    def test_max_offset(self):
+        # An error is raised if the page offset exceeds the maximum offset.
+        first_page = self.paginator.first_page
+        max_offset = first_page + self.per_page - 1
+        with local_settings(DEEP_PAGE_MAX_OFFSET=max_offset):
+            self.paginator.page(2)
+            with self.assertRaises(paginators.PageTooDeep) as cm:
+                self.paginator.page(3)
+        self.assertEqual(2, cm.exception.max_number)
+        self.assertEqual('offset', cm.exception.reason)
+
+    def test_max_number_page_window(self):
+        # The limits are applied to the last page of the window.
+        with local_settings(DEEP_PAGE_MAX_NUMBER=2):
+            with self.assertRaises(paginators.PageTooDeep):
+                self.paginator.page_window(1, 3)
+
+    def test_deep_page_signal(self):
+        # The deep page signal is sent when a page is refused.
+        signals = []
+
+        def receiver(**kwargs):
+            signals.append(kwargs)
+
+        instrumentation.deep_page.connect(receiver)
+        self.addCleanup(instrumentation.deep_page.disconnect, receiver)
+        with local_settings(DEEP_PAGE_MAX_NUMBER=1):
+            with self.assertRaises(paginators.PageTooDeep):
+                self.paginator.page(3)
+        self.assertEqual(1, len(signals))
+        self.assertEqual(self.paginator_class, signals[0]['sender'])
+        self.assertEqual(3, signals[0]['number'])
+        self.assertEqual(1, signals[0]['max_number'])
+        self.assertEqual('number', signals[0]['reason'])
+
+    def test_time_budget(self):
+        # Once a page exceeds the time budget, deeper pages of the same
+        # queryset are refused.
+        self.addCleanup(cache.clear)
+        make_model_instances(30)
+        queryset = TestModel.objects.all()
+        paginator = self.paginator_class(queryset, 5)
+        with local_settings(DEEP_PAGE_TIME_BUDGET=0):
+            paginator.page(3)
+            paginator.page(2)
+            paginator = self.paginator_class(queryset, 5)
+            paginator.page(1)
+            with self.assertRaises(paginators.PageTooDeep) as cm:
+                paginator.page(2)
+        self.assertEqual(1, cm.exception.max_number)
+        self.assertEqual('time_budget', cm.exception.reason)
+
+    def test_time_budget_other_queryset(self):
+        # Slow offsets are stored per queryset.
+        self.addCleanup(cache.clear)
+        make_model_instances(30)
+        with local_settings(DEEP_PAGE_TIME_BUDGET=0):
+            self.paginator_class(TestModel.objects.all(), 5).page(2)
+            queryset = TestModel.objects.order_by('-pk')
+            page = self.paginator_class(queryset, 5).page(3)
+        self.assertEqual(5, len(page.object_list))
+
 
 class DifferentFirstPagePaginatorTestMixin(PaginatorTestMixin):
     """Base test mixin for paginators.
@@ -81,6 +211,12 @@ class DefaultPaginatorTest(PaginatorTestMixin, TestCase):
         self.assertEqual(self.per_page + 1, page.start_index())
         self.assertEqual(self.per_page * 2, page.end_index())
 
+    def test_page_window_indexes(self):
+        # Ensure start and end indexes are correct for a window of pages.
+        page = self.paginator.page_window(2, 3)
+        self.assertEqual(self.per_page + 1, page.start_index())
+        self.assertEqual(self.per_page * 3, page.end_index())
+
     def test_items_count(self):
         # Ensure the paginator reflects the number of items.
         self.assertEqual(len(self.items), self.paginator.count)
@@ -108,6 +244,101 @@ class DefaultPaginatorTest(PaginatorTestMixin, TestCase):
         self.assertEqual(6, page.end_index())
 
 
+class CountCacheTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(cache.clear)
+        self.queryset = make_model_instances(10)
+        self.key = paginators.COUNT_CACHE_PREFIX + utils.get_fingerprint(
+            self.queryset)
+
+    def get_count(self, **kwargs):
+        """Return the count of a new paginator using the given settings."""
+        settings = {'COUNT_CACHE_SOFT_TTL': 60}
+        settings.update(kwargs)
+        with local_settings(**settings):
+            return paginators.DefaultPaginator(self.queryset, 5).count
+
+    def test_cached(self):
+        # The count is only retrieved once.
+        with self.assertNumQueries(1):
+            self.assertEqual(10, self.get_count())
+            self.assertEqual(10, self.get_count())
+
+    def test_fresh(self):
+        # Fresh counts are used even if the number of objects changed.
+        self.get_count()
+        make_model_instances(1)
+        self.assertEqual(10, self.get_count())
+
+    def test_stale(self):
+        # Stale counts are refreshed.
+        cache.set(self.key, (5, 0))
+        self.assertEqual(10, self.get_count())
+        count, fresh_until = cache.get(self.key)
+        self.assertEqual(10, count)
+        self.assertGreater(fresh_until, 0)
+
+    def test_stale_while_refreshing(self):
+        # The stale count is used while another process refreshes it.
+        cache.set(self.key, (5, 0))
+        cache.add(self.key + ':lock', True)
+        with self.assertNumQueries(0):
+            self.assertEqual(5, self.get_count())
+
+    def test_missing_while_counting(self):
+        # Missing counts are waited for while another process computes them.
+        cache.add(self.key + ':lock', True)
+        timer = threading.Timer(0.1, cache.set, [self.key, (5, 0)])
+        timer.start()
+        self.addCleanup(timer.join)
+        with self.assertNumQueries(0):
+            self.assertEqual(5, self.get_count())
+
+    def test_missing_lock_timeout(self):
+        # The objects are counted without caching the result if the process
+        # holding the lock does not store the count in time.
+        self.addCleanup(
+            setattr, paginators, 'COUNT_LOCK_WAIT', paginators.COUNT_LOCK_WAIT)
+        paginators.COUNT_LOCK_WAIT = 0.1
+        cache.add(self.key + ':lock', True)
+        with self.assertNumQueries(1):
+            self.assertEqual(10, self.get_count())
+        self.assertIsNone(cache.get(self.key))
+
+    def test_missing_lock(self):
+        # The lock is also acquired, and then released, when the count is
+        # missing.
+        self.get_count()
+        self.assertIsNone(cache.get(self.key + ':lock'))
+        self.assertEqual(10, cache.get(self.key)[0])
+
+    def test_lock_released(self):
+        # The lock is released after the count is refreshed.
+        cache.set(self.key, (5, 0))
+        self.get_count()
+        self.assertIsNone(cache.get(self.key + ':lock'))
+
+    def test_num_pages(self):
+        # The number of pages is calculated using the cached count.
+        cache.set(self.key, (20, 0))
+        cache.add(self.key + ':lock', True)
+        with local_settings(COUNT_CACHE_SOFT_TTL=60):
+            paginator = paginators.DefaultPaginator(self.queryset, 5)
+            self.assertEqual(4, paginator.num_pages)
+
+    def test_disabled(self):
+        # Counts are not cached by default.
+        with self.assertNumQueries(2):
+            self.get_count(COUNT_CACHE_SOFT_TTL=None)
+            self.get_count(COUNT_CACHE_SOFT_TTL=None)
+
+    def test_not_a_queryset(self):
+        # Only the counts of querysets are cached.
+        with local_settings(COUNT_CACHE_SOFT_TTL=60):
+            self.assertEqual(3, paginators.DefaultPaginator(range(3), 5).count)
+
+
 class LazyPaginatorTest(PaginatorTestMixin, TestCase):
 
     paginator_class = paginators.LazyPaginator
@@ -128,6 +359,827 @@ class LazyPaginatorTest(PaginatorTestMixin, TestCase):
             self.paginator.page_range
 
 
+class SnapshotPaginatorTest(PaginatorTestMixin, TestCase):
+
+    paginator_class = paginators.SnapshotPaginator
+
+    def setUp(self):
+        super(SnapshotPaginatorTest, self).setUp()
+        self.addCleanup(cache.clear)
+        self.factory = RequestFactory()
+        self.queryset = make_model_instances(30)
+
+    def make_paginator(self, token=None, queryset=None):
+        """Return a paginator for a request including the given *token*."""
+        data = {} if token is None else {'page_snapshot': token}
+        if queryset is None:
+            queryset = self.queryset
+        return self.paginator_class(
+            queryset, 10, request=self.factory.get('/', data))
+
+    def test_snapshot(self):
+        # A new snapshot is created if no token is provided.
+        paginator = self.make_paginator()
+        page = paginator.page(1)
+        self.assertSequenceEqual(self.queryset[:10], page.object_list)
+        self.assertIsNotNone(paginator.token)
+        self.assertEqual(
+            {'page_snapshot': paginator.token},
+            paginator.get_querystring_params())
+
+    def test_stable_results(self):
+        # Results do not change when objects are added or removed.
+        paginator = self.make_paginator()
+        paginator.page(1)
+        expected = list(self.queryset[10:20])
+        cursor = connection.cursor()
+        cursor.execute(
+            'DELETE FROM {0} WHERE id = %s'.format(TestModel._meta.db_table),
+            [expected[0].pk])
+        make_model_instances(5)
+        paginator = self.make_paginator(paginator.token)
+        page = paginator.page(2)
+        self.assertSequenceEqual(expected[1:], page.object_list)
+        self.assertEqual(30, paginator.count)
+
+    def test_num_queries(self):
+        # Pages are retrieved using a single query.
+        paginator = self.make_paginator()
+        paginator.page(1)
+        paginator = self.make_paginator(paginator.token)
+        with self.assertNumQueries(1):
+            list(paginator.page(3).object_list)
+
+    def test_invalid_token(self):
+        # A new snapshot is created if the token is not valid.
+        paginator = self.make_paginator('invalid')
+        paginator.page(1)
+        self.assertNotEqual('invalid', paginator.token)
+
+    def test_other_queryset(self):
+        # Snapshots of other querysets are ignored.
+        paginator = self.make_paginator()
+        paginator.page(1)
+        queryset = self.queryset.order_by('-pk')
+        other = self.make_paginator(paginator.token, queryset=queryset)
+        page = other.page(1)
+        self.assertNotEqual(paginator.token, other.token)
+        self.assertSequenceEqual(queryset[:10], page.object_list)
+
+    def test_max_size(self):
+        # Only the first primary keys are stored, and the snapshot is marked
+        # as truncated.
+        with local_settings(SNAPSHOT_MAX_SIZE=15):
+            paginator = self.make_paginator()
+            self.assertEqual(15, len(paginator.get_pks()))
+            self.assertTrue(paginator.truncated)
+            self.assertEqual(30, paginator.count)
+            self.assertEqual(3, paginator.num_pages)
+            token = paginator.token
+            paginator = self.make_paginator(token)
+            paginator.get_pks()
+            self.assertTrue(paginator.truncated)
+            self.assertEqual(token, paginator.token)
+
+    def test_truncated_pages(self):
+        # Objects past the snapshot are retrieved using offsets.
+        with local_settings(SNAPSHOT_MAX_SIZE=15):
+            paginator = self.make_paginator()
+            paginator.page(1)
+            paginator = self.make_paginator(paginator.token)
+            self.assertSequenceEqual(
+                self.queryset[10:20], paginator.page(2).object_list)
+            self.assertSequenceEqual(
+                self.queryset[20:30], list(paginator.page(3).object_list))
+
+    def test_not_truncated(self):
+        # Snapshots including all the objects are not truncated.
+        with local_settings(SNAPSHOT_MAX_SIZE=30):
+            paginator = self.make_paginator()
+            self.assertEqual(30, paginator.count)
+        self.assertFalse(paginator.truncated)
+
+    def test_post_token(self):
+        # The token is read from the same data as the page number.
+        paginator = self.make_paginator()
+        paginator.page(1)
+        request = self.factory.post('/', {'page_snapshot': paginator.token})
+        other = self.paginator_class(self.queryset, 10, request=request)
+        other.page(2)
+        self.assertEqual(paginator.token, other.token)
+
+    def test_time_budget(self):
+        # Snapshot pages are not timed, since retrieving them does not depend
+        # on their depth.
+        with local_settings(DEEP_PAGE_TIME_BUDGET=0):
+            paginator = self.make_paginator()
+            paginator.page(3)
+            page = self.make_paginator(paginator.token).page(3)
+        self.assertEqual(10, len(page.object_list))
+
+    def test_not_a_queryset(self):
+        # Snapshots are not used for lists.
+        paginator = self.paginator_class(range(30), 10)
+        self.assertEqual(30, paginator.count)
+        self.assertEqual({}, paginator.get_querystring_params())
+
+
+class MergedPaginatorTest(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.pks = [obj.pk for obj in make_model_instances(25)]
+        queryset = TestModel.objects.order_by('-id')
+        # Split the objects in three sources.
+        self.sources = [
+            queryset.filter(pk__in=self.pks[i::3]) for i in range(3)]
+        self.expected = sorted(self.pks, reverse=True)
+
+    def make_paginator(self, params=None, **kwargs):
+        """Return a paginator for a request including the given *params*."""
+        request = self.factory.get('/', params or {})
+        return paginators.MergedPaginator(
+            self.sources, 10, request=request, **kwargs)
+
+    def get_pages(self):
+        """Return all the pages following the cursors."""
+        pages = []
+        params = {}
+        number = 1
+        while True:
+            paginator = self.make_paginator(params)
+            page = paginator.page(number)
+            pages.append([obj.pk for obj in page.object_list])
+            if not page.has_next():
+                return pages
+            params = paginator.get_querystring_params()
+            number += 1
+
+    def test_first_page(self):
+        # The first page includes the first objects of all the sources.
+        paginator = self.make_paginator()
+        page = paginator.page(1)
+        self.assertEqual(
+            self.expected[:10], [obj.pk for obj in page.object_list])
+        self.assertTrue(page.has_next())
+        self.assertEqual(2, paginator.num_pages)
+
+    def test_pages(self):
+        # Subsequent pages are retrieved using the cursors.
+        expected = [
+            self.expected[:10], self.expected[10:20], self.expected[20:]]
+        self.assertEqual(expected, self.get_pages())
+
+    def test_ascending(self):
+        # Sources can also be sorted in ascending order.
+        self.sources = [source.order_by('id') for source in self.sources]
+        pages = self.get_pages()
+        self.assertEqual(sorted(self.pks), sum(pages, []))
+
+    def test_ordering(self):
+        # The sort field can be explicitly provided.
+        paginator = self.make_paginator(ordering='id')
+        page = paginator.page(1)
+        self.assertEqual(
+            sorted(self.pks)[:10], [obj.pk for obj in page.object_list])
+
+    def test_num_queries(self):
+        # A single query is executed for each source.
+        paginator = self.make_paginator()
+        with self.assertNumQueries(3):
+            paginator.page(1)
+
+    def test_missing_cursor(self):
+        # Pages after the first one require a cursor.
+        with self.assertRaises(paginators.EmptyPage):
+            self.make_paginator().page(2)
+
+    def test_invalid_cursor(self):
+        # An error is raised if the cursor is not valid.
+        paginator = self.make_paginator({'page_cursor': 'invalid'})
+        with self.assertRaises(paginators.EmptyPage):
+            paginator.page(2)
+
+    def test_wrong_page_cursor(self):
+        # An error is raised if the cursor refers to another page.
+        paginator = self.make_paginator()
+        paginator.page(1)
+        params = paginator.get_querystring_params()
+        with self.assertRaises(paginators.EmptyPage):
+            self.make_paginator(params).page(3)
+
+    def test_page_window(self):
+        # Page ranges are not supported.
+        with self.assertRaises(paginators.EmptyPage):
+            self.make_paginator().page_window(1, 2)
+
+    def test_last_page_params(self):
+        # The next page cursor is not included in the last page.
+        paginator = paginators.MergedPaginator(self.sources, 30)
+        paginator.page(1)
+        self.assertEqual({}, paginator.get_querystring_params())
+
+    def test_nullable_field(self):
+        # Nullable sort fields are rejected.
+        sources = [
+            TestModel.objects.order_by('-id'),
+            NullableTestModel.objects.order_by('-value'),
+        ]
+        with self.assertRaises(ImproperlyConfigured):
+            paginators.MergedPaginator(sources, 10, ordering='-value')
+        with self.assertRaises(ImproperlyConfigured):
+            paginators.MergedPaginator(sources[1:], 10)
+
+    def test_nullable_relationship(self):
+        # Fields spanning nullable relationships are rejected.
+        sources = [NullableTestModel.objects.all()]
+        with self.assertRaises(ImproperlyConfigured):
+            paginators.MergedPaginator(
+                sources, 10, ordering='test_model__id')
+        paginator = paginators.MergedPaginator(sources, 10, ordering='-pk')
+        self.assertEqual('pk', paginator.field)
+
+    def test_cursor_serializer(self):
+        # Microseconds are preserved.
+        serializer = paginators.CursorSerializer()
+        value = datetime.datetime(2013, 1, 2, 3, 4, 5, 123456)
+        data = serializer.loads(serializer.dumps([value]))
+        self.assertEqual(['2013-01-02T03:04:05.123456'], data)
+
+
+class ShardedPaginatorTest(TestCase):
+
+    def setUp(self):
+        # Shards are emulated using querysets on the same database. Shards
+        # are queried serially, since pool threads would not see the test
+        # database: the thread pool is tested using *parallel_map*.
+        self.addCleanup(cache.clear)
+        self.pks = [obj.pk for obj in make_model_instances(25)]
+        queryset = TestModel.objects.order_by('id')
+        self.shards = [
+            queryset.filter(pk__in=self.pks[i::4]) for i in range(4)]
+
+    def make_paginator(self, **kwargs):
+        return paginators.ShardedPaginator(self.shards, 10, **kwargs)
+
+    def get_page(self, number, **kwargs):
+        """Return the primary keys of the objects in page *number*."""
+        with local_settings(SHARD_POOL_SIZE=0):
+            page = self.make_paginator(**kwargs).page(number)
+            return [obj.pk for obj in page.object_list]
+
+    def test_count(self):
+        # The total number of objects is the sum of the shard counts.
+        with local_settings(SHARD_POOL_SIZE=0):
+            paginator = self.make_paginator()
+            self.assertEqual(25, paginator.count)
+            self.assertEqual(3, paginator.num_pages)
+
+    def test_pages(self):
+        # Objects of all the shards are merged.
+        self.assertEqual(self.pks[:10], self.get_page(1))
+        self.assertEqual(self.pks[10:20], self.get_page(2))
+        self.assertEqual(self.pks[20:], self.get_page(3))
+
+    def test_ordering(self):
+        # The sort field can be explicitly provided.
+        expected = sorted(self.pks, reverse=True)[10:20]
+        self.assertEqual(expected, self.get_page(2, ordering='-id'))
+
+    def test_page_interface(self):
+        # Pages expose the usual interface.
+        with local_settings(SHARD_POOL_SIZE=0):
+            page = self.make_paginator().page(2)
+            self.assertTrue(page.has_next())
+            self.assertEqual(11, page.start_index())
+            self.assertEqual(20, page.end_index())
+
+    def test_cached_count(self):
+        # The total number of objects can be cached.
+        with local_settings(SHARD_POOL_SIZE=0, COUNT_CACHE_SOFT_TTL=60):
+            self.make_paginator().count
+            with self.assertNumQueries(0):
+                self.assertEqual(25, self.make_paginator().count)
+
+    def test_fingerprint(self):
+        # The fingerprint depends on all the shards.
+        fingerprint = self.make_paginator().get_fingerprint()
+        self.shards[-1] = self.shards[-1].filter(pk__gt=1)
+        self.assertNotEqual(
+            fingerprint, self.make_paginator().get_fingerprint())
+
+    def test_parallel_map(self):
+        # Functions are called concurrently using the thread pool.
+        with local_settings(SHARD_POOL_SIZE=2):
+            results = paginators.parallel_map(
+                lambda item: (item, threading.current_thread()), [1, 2, 3])
+        self.assertEqual([1, 2, 3], [item for item, _ in results])
+        threads = [thread for _, thread in results]
+        self.assertNotIn(threading.current_thread(), threads)
+
+    def test_parallel_map_connections(self):
+        # Connections opened by pool threads are closed after each call.
+        closed = []
+
+        class Connection(object):
+            def close(self):
+                closed.append(threading.current_thread())
+
+        class Connections(object):
+            def all(self):
+                return [Connection()]
+
+        self.addCleanup(
+            setattr, paginators, 'connections', paginators.connections)
+        paginators.connections = Connections()
+        with local_settings(SHARD_POOL_SIZE=2):
+            threads = paginators.parallel_map(
+                lambda item: threading.current_thread(), [1, 2, 3])
+        self.assertEqual(set(threads), set(closed))
+        self.assertEqual(3, len(closed))
+        # Connections are not closed when querying shards serially.
+        del closed[:]
+        with local_settings(SHARD_POOL_SIZE=0):
+            paginators.parallel_map(lambda item: item, [1, 2])
+        self.assertEqual([], closed)
+
+    def test_pool_size(self):
+        # The pool size is read each time shards are queried.
+        with local_settings(SHARD_POOL_SIZE=3):
+            results = paginators.parallel_map(
+                lambda item: threading.current_thread(), range(30))
+        self.assertLessEqual(len(set(results)), 3)
+        self.assertEqual(3, len(paginators.get_pool(3)._pool))
+
+    def test_serial_map(self):
+        # Functions are called in the current thread if the pool is disabled.
+        with local_settings(SHARD_POOL_SIZE=0):
+            results = paginators.parallel_map(
+                lambda item: threading.current_thread(), [1, 2])
+        self.assertEqual([threading.current_thread()] * 2, results)
+
+
+class InMemorySortedPaginatorTest(TestCase):
+
+    def setUp(self):
+        # A permutation of the numbers from 0 to 999.
+        self.items = [(i * 7919) % 1000 for i in range(1000)]
+        self.paginator = paginators.InMemorySortedPaginator(
+            self.items, 10, orphans=2)
+
+    def test_first_page(self):
+        # Shallow pages only sort a prefix of the objects.
+        page = self.paginator.page(1)
+        self.assertSequenceEqual(list(range(10)), page.object_list)
+        self.assertFalse(self.paginator._sorted_all)
+        self.assertEqual(10, len(self.paginator._sorted))
+
+    def test_sorted_prefix(self):
+        # The sorted prefix grows geometrically while paging forward.
+        for number in range(1, 5):
+            self.paginator.page(number)
+        self.assertEqual(40, len(self.paginator._sorted))
+        page = self.paginator.page(3)
+        self.assertSequenceEqual(list(range(20, 30)), page.object_list)
+
+    def test_partial_sort_boundary(self):
+        # Up to 5% of the objects are sorted using a partial sort.
+        self.assertSequenceEqual(
+            list(range(40, 50)), self.paginator.page(5).object_list)
+        self.assertFalse(self.paginator._sorted_all)
+        self.assertEqual(50, len(self.paginator._sorted))
+        # Beyond that, all the objects are sorted.
+        self.paginator.get_sorted(51)
+        self.assertTrue(self.paginator._sorted_all)
+
+    def test_prefix_growth_limit(self):
+        # The doubled prefix does not exceed the partial sort limit.
+        for number in range(1, 4):
+            self.paginator.page(number)
+        self.assertEqual(40, len(self.paginator._sorted))
+        self.paginator.get_sorted(41)
+        self.assertFalse(self.paginator._sorted_all)
+        self.assertEqual(50, len(self.paginator._sorted))
+
+    def test_deep_page(self):
+        # Deep pages sort all the objects.
+        page = self.paginator.page(50)
+        self.assertSequenceEqual(list(range(490, 500)), page.object_list)
+        self.assertTrue(self.paginator._sorted_all)
+
+    def test_key_and_reverse(self):
+        # Objects can be sorted using a key function, in reverse order.
+        items = [{'score': value} for value in self.items]
+        paginator = paginators.InMemorySortedPaginator(
+            items, 10, key=lambda item: item['score'], reverse=True)
+        for number in (1, 100):
+            top = 1000 - (number - 1) * 10
+            objects = paginator.page(number).object_list
+            self.assertEqual(
+                list(range(top - 1, top - 11, -1)),
+                [item['score'] for item in objects])
+
+    def test_stable(self):
+        # Objects with the same key keep their relative order.
+        items = [(i % 2, i) for i in range(100)]
+        paginator = paginators.InMemorySortedPaginator(
+            items, 5, key=lambda item: item[0])
+        expected = [(0, i) for i in range(0, 10, 2)]
+        self.assertEqual(expected, list(paginator.page(1).object_list))
+
+    def test_page_interface(self):
+        # The usual page interface is exposed.
+        page = self.paginator.page(2)
+        self.assertEqual(1000, self.paginator.count)
+        self.assertEqual(100, self.paginator.num_pages)
+        self.assertEqual(11, page.start_index())
+        self.assertEqual(20, page.end_index())
+
+    def test_presorted(self):
+        # Presorted lists are not sorted again.
+        items = list(range(0, 200, 2))
+        paginator = paginators.InMemorySortedPaginator(
+            items, 10, presorted=True)
+        self.assertIs(items, paginator.get_sorted(100))
+        self.assertSequenceEqual(items[10:20], paginator.page(2).object_list)
+
+    def test_page_after(self):
+        # The page of the objects following a key can be retrieved.
+        items = list(range(0, 200, 2))
+        paginator = paginators.InMemorySortedPaginator(
+            items, 10, presorted=True)
+        self.assertEqual(26, paginator.get_offset_for_key(51))
+        self.assertEqual(26, paginator.get_offset_for_key(50))
+        page = paginator.page_after(51)
+        self.assertIsInstance(page, paginators.KeysetPage)
+        self.assertEqual(items[26:36], page.object_list)
+        self.assertEqual(70, page.next_key)
+        self.assertEqual(3, page.number)
+        self.assertEqual(27, page.start_index())
+        self.assertEqual(36, page.end_index())
+        self.assertTrue(page.has_next())
+        with self.assertRaises(paginators.EmptyPage):
+            paginator.page_after(198)
+
+    def test_page_after_next_key(self):
+        # The next key retrieves the following objects, up to the last ones.
+        items = list(range(0, 200, 2))
+        paginator = paginators.InMemorySortedPaginator(
+            items, 10, presorted=True)
+        page = paginator.page_after(170)
+        self.assertEqual(items[86:96], page.object_list)
+        page = paginator.page_after(page.next_key)
+        self.assertEqual(items[96:], page.object_list)
+        self.assertIsNone(page.next_key)
+        self.assertFalse(page.has_next())
+        self.assertEqual(100, page.end_index())
+
+    def test_page_after_reverse(self):
+        # Keys are searched in reverse sorted objects too.
+        items = list(range(198, -1, -2))
+        paginator = paginators.InMemorySortedPaginator(
+            items, 10, presorted=True, reverse=True)
+        self.assertEqual(75, paginator.get_offset_for_key(50))
+        page = paginator.page_after(50)
+        self.assertEqual(items[75:85], page.object_list)
+        self.assertEqual(30, page.next_key)
+
+    def test_page_after_unsorted(self):
+        # Unsorted objects are selected without being sorted.
+        self.assertEqual(501, self.paginator.get_offset_for_key(500))
+        page = self.paginator.page_after(500)
+        self.assertEqual(list(range(501, 511)), page.object_list)
+        self.assertEqual(510, page.next_key)
+        self.assertEqual([], self.paginator._sorted)
+        self.assertFalse(self.paginator._sorted_all)
+
+    def test_page_after_unsorted_reverse(self):
+        # Unsorted objects are selected in reverse order too.
+        paginator = paginators.InMemorySortedPaginator(
+            self.items, 10, reverse=True)
+        page = paginator.page_after(5)
+        self.assertEqual([4, 3, 2, 1, 0], page.object_list)
+        self.assertIsNone(page.next_key)
+        self.assertEqual(996, page.start_index())
+
+
+class ArrayPaginatorTest(TestCase):
+
+    def setUp(self):
+        self.items = array(str('d'), range(100))
+        self.paginator = paginators.ArrayPaginator(self.items, 10)
+
+    def test_page(self):
+        # Pages include the array items.
+        page = self.paginator.page(3)
+        self.assertEqual([float(i) for i in range(20, 30)], page.tolist())
+        self.assertEqual(25.0, page[5])
+        self.assertEqual(list(page.object_list), list(page))
+        self.assertEqual(10, len(page))
+
+    def test_page_interface(self):
+        # The usual page interface is exposed.
+        page = self.paginator.page(2)
+        self.assertIsInstance(page, paginators.ArrayPage)
+        self.assertEqual(100, self.paginator.count)
+        self.assertEqual(10, self.paginator.num_pages)
+        self.assertEqual(11, page.start_index())
+        self.assertTrue(page.has_next())
+
+    def test_page_window(self):
+        # Ranges of pages are views of the array too.
+        page = self.paginator.page_window(2, 3)
+        self.assertIsInstance(page, paginators.ArrayPage)
+        self.assertEqual(20, len(page))
+
+    @unittest.skipUnless(utils.PYTHON3, 'Memoryviews are not typed.')
+    def test_zero_copy(self):
+        # Under Python 3, pages are memoryviews sharing the array memory.
+        object_list = self.paginator.page(2).object_list
+        self.assertIsInstance(object_list, memoryview)
+        self.items[10] = -1
+        self.assertEqual(-1, object_list[0])
+
+    def test_resize(self):
+        # The paginator does not prevent resizing the array.
+        self.assertEqual(100, self.paginator.count)
+        self.paginator.page(2).tolist()
+        self.items.append(100)
+        self.items.extend([101, 102])
+        self.assertEqual(103, len(self.items))
+
+    @unittest.skipUnless(utils.PYTHON3, 'Memoryviews are not typed.')
+    def test_page_pins_buffer(self):
+        # Page object lists prevent resizing the array while they exist.
+        page = self.paginator.page(2)
+        with self.assertRaises(BufferError):
+            self.items.append(100)
+        del page
+        self.items.append(100)
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def test_numpy(self):
+        # Pages of NumPy arrays are views of the array.
+        items = numpy.arange(100)
+        object_list = paginators.ArrayPaginator(items, 10).page(2).object_list
+        self.assertTrue(numpy.shares_memory(items, object_list))
+        self.assertEqual(list(range(10, 20)), object_list.tolist())
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def test_numpy_fields(self):
+        # Pages of structured arrays can be projected on fields.
+        items = numpy.zeros(
+            30, dtype=[(str('id'), 'i8'), (str('score'), 'f8')])
+        items['id'] = numpy.arange(30)
+        paginator = paginators.ArrayPaginator(items, 10, fields='id')
+        self.assertEqual(
+            list(range(10, 20)), paginator.page(2).object_list.tolist())
+        paginator = paginators.ArrayPaginator(
+            items, 10, fields=('id', 'score'))
+        page = paginator.page(3)
+        self.assertEqual((20, 0.0), tuple(page[0]))
+
+
+class FilePaginatorTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'export.csv')
+        with open(self.path, 'wb') as data_file:
+            for i in range(95):
+                data_file.write('line {0}\n'.format(i).encode('ascii'))
+        self.paginator = paginators.FilePaginator(self.path, 10)
+
+    def test_page(self):
+        # Pages include the lines of the file.
+        page = self.paginator.page(3)
+        expected = ['line {0}'.format(i) for i in range(20, 30)]
+        self.assertEqual(expected, page.object_list)
+
+    def test_last_page(self):
+        # The number of lines is known from the index.
+        self.assertEqual(95, self.paginator.count)
+        self.assertEqual(10, self.paginator.num_pages)
+        self.assertEqual(5, len(self.paginator.page(10).object_list))
+
+    def test_mapped_lines(self):
+        # Already mapped files can be paginated too, and are left open.
+        with files.MappedLines(self.path) as lines:
+            paginator = paginators.FilePaginator(lines, 20)
+            self.assertEqual('line 20', paginator.page(2).object_list[0])
+            self.assertEqual('line 0', lines[0])
+
+    def test_close(self):
+        # Files passed as paths are unmapped after each operation.
+        mapped, closed = [], []
+
+        class MappedLines(files.MappedLines):
+            def __init__(self, *args, **kwargs):
+                super(MappedLines, self).__init__(*args, **kwargs)
+                mapped.append(self)
+
+            def close(self):
+                closed.append(self)
+                super(MappedLines, self).close()
+
+        self.addCleanup(setattr, files, 'MappedLines', files.MappedLines)
+        files.MappedLines = MappedLines
+        page = self.paginator.page(2)
+        self.assertEqual('line 10', page.object_list[0])
+        # The file is mapped to count the lines and to retrieve the page.
+        self.assertEqual(2, len(mapped))
+        self.assertEqual(mapped, closed)
+
+    def test_encoding(self):
+        # Lines can be retrieved as bytes.
+        paginator = paginators.FilePaginator(self.path, 10, encoding=None)
+        self.assertEqual(b'line 0', paginator.page(1).object_list[0])
+
+
+class SearchTestMixin(object):
+    """Index the test model instances in a SQLite FTS5 table.
+
+    The table is created once for the test case, since creating tables
+    commits the transaction of the current test.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super(SearchTestMixin, cls).setUpClass()
+        cls.fts_available = True
+        try:
+            connection.cursor().execute(
+                'CREATE VIRTUAL TABLE test_fts USING fts5(body)')
+        except DatabaseError:
+            cls.fts_available = False
+
+    @classmethod
+    def tearDownClass(cls):
+        connection.cursor().execute('DROP TABLE IF EXISTS test_fts')
+        super(SearchTestMixin, cls).tearDownClass()
+
+    def setUp(self):
+        super(SearchTestMixin, self).setUp()
+        if not self.fts_available:
+            self.skipTest('SQLite FTS5 is not available.')
+        cursor = connection.cursor()
+        for obj in make_model_instances(20):
+            # Ranks are shared by several objects.
+            body = 'apple ' * (obj.pk % 4 + 1) + 'pear'
+            cursor.execute(
+                'INSERT INTO test_fts (rowid, body) VALUES (%s, %s)',
+                [obj.pk, body])
+        self.sql = (
+            'SELECT t.*, test_fts.rank AS rank FROM test_fts '
+            'JOIN {0} t ON t.id = test_fts.rowid '
+            'WHERE test_fts MATCH %s').format(TestModel._meta.db_table)
+        cursor.execute(self.sql + ' ORDER BY rank, t.id', ['apple'])
+        self.pks = [row[0] for row in cursor.fetchall()]
+
+    def search(self, terms='apple'):
+        """Return a raw queryset of the objects matching *terms*."""
+        return TestModel.objects.raw(self.sql, [terms])
+
+
+class SearchPaginatorTest(SearchTestMixin, TestCase):
+
+    def get_paginator(self, object_list=None, data=None, **kwargs):
+        """Return a paginator of 6 results per page for the given request
+        querystring *data*."""
+        if object_list is None:
+            object_list = self.search()
+        request = RequestFactory().get('/', data or {})
+        return paginators.SearchPaginator(
+            object_list, 6, request=request, **kwargs)
+
+    def test_follow_cursors(self):
+        # Subsequent pages are retrieved seeking the cursor position.
+        pks, data = [], {}
+        for number in range(1, 5):
+            paginator = self.get_paginator(data=data)
+            page = paginator.page(number)
+            if number > 1:
+                self.assertIsNotNone(paginator.get_cursor((number - 1) * 6))
+            pks.extend(obj.pk for obj in page.object_list)
+            data = paginator.get_querystring_params()
+        self.assertEqual(self.pks, pks)
+        self.assertEqual({}, data)
+
+    def test_offset(self):
+        # Pages can be retrieved without cursors.
+        page = self.get_paginator().page(3)
+        self.assertEqual(self.pks[12:18], [obj.pk for obj in page])
+        self.assertEqual(4, page.paginator.num_pages)
+
+    def test_invalid_cursor(self):
+        # Invalid cursors are ignored.
+        paginator = self.get_paginator(data={'page_cursor': 'invalid'})
+        page = paginator.page(2)
+        self.assertIsNone(paginator.get_cursor(6))
+        self.assertEqual(self.pks[6:12], [obj.pk for obj in page])
+
+    def test_other_query(self):
+        # Cursors of other queries are ignored.
+        paginator = self.get_paginator()
+        paginator.page(1)
+        data = paginator.get_querystring_params()
+        paginator = self.get_paginator(self.search('pear'), data=data)
+        self.assertIsNone(paginator.get_cursor(6))
+        paginator = self.get_paginator(data=data)
+        self.assertIsNone(paginator.get_cursor(12))
+        self.assertIsNotNone(paginator.get_cursor(6))
+
+    def test_max_hits(self):
+        # Only the first hits are counted and paginated.
+        paginator = self.get_paginator()
+        with local_settings(SEARCH_MAX_HITS=10):
+            self.assertEqual(10, paginator.count)
+            self.assertEqual(2, paginator.num_pages)
+            self.assertEqual(4, len(paginator.page(2).object_list))
+
+    def test_max_hits_cursor(self):
+        # Hits past the limit are not retrieved following cursors either.
+        with local_settings(SEARCH_MAX_HITS=10):
+            paginator = self.get_paginator()
+            paginator.page(1)
+            data = paginator.get_querystring_params()
+            page = self.get_paginator(data=data).page(2)
+        self.assertEqual(self.pks[6:10], [obj.pk for obj in page])
+
+    def test_seek_query(self):
+        # Pages following a cursor are retrieved without offsets, seeking
+        # within the best ranked hits.
+        queries = []
+
+        class SearchPaginator(paginators.SearchPaginator):
+            def _query(self, sql, params, alias):
+                queries.append(sql)
+                return super(SearchPaginator, self)._query(sql, params, alias)
+
+        paginator = SearchPaginator(self.search(), 6)
+        paginator.page(1)
+        self.assertIn('OFFSET', queries[-1])
+        request = RequestFactory().get(
+            '/', paginator.get_querystring_params())
+        paginator = SearchPaginator(self.search(), 6, request=request)
+        paginator.page(2)
+        self.assertNotIn('OFFSET', queries[-1])
+        self.assertIn('ORDER BY "rank", "id" LIMIT %s)', queries[-1])
+
+    def test_post_cursor(self):
+        # The cursor is read from the same data as the page number.
+        paginator = self.get_paginator()
+        paginator.page(1)
+        data = paginator.get_querystring_params()
+        request = RequestFactory().post('/', data)
+        paginator = paginators.SearchPaginator(
+            self.search(), 6, request=request)
+        self.assertIsNotNone(paginator.get_cursor(6))
+
+    def test_sql(self):
+        # SQL queries and params can be paginated, retrieving dicts.
+        sql = (
+            'SELECT rowid, rank, body FROM test_fts '
+            'WHERE test_fts MATCH %s')
+        paginator = self.get_paginator((sql, ['apple']))
+        objects = paginator.page(2).object_list
+        self.assertEqual(self.pks[6:12], [obj['rowid'] for obj in objects])
+        self.assertEqual(20, paginator.count)
+        params = paginator.get_querystring_params()
+        paginator = self.get_paginator((sql, ['apple']), data=params)
+        paginator.page(3)
+        self.assertIsNotNone(paginator.get_cursor(12))
+
+
+class PackPksTest(TestCase):
+
+    def test_integers(self):
+        # Integer primary keys are packed as 64-bit little-endian integers.
+        pks = [1000, 2 ** 40, -3]
+        packed = paginators.pack_pks(pks)
+        data = zlib.decompress(packed)
+        self.assertEqual(b'q', data[:1])
+        self.assertEqual(b'\xe8\x03' + b'\x00' * 6, data[1:9])
+        self.assertEqual(pks, paginators.unpack_pks(packed))
+
+    def test_overflow(self):
+        # Integers not fitting 64 bits are pickled.
+        pks = [1, 2 ** 70]
+        packed = paginators.pack_pks(pks)
+        self.assertEqual(b'p', zlib.decompress(packed)[:1])
+        self.assertEqual(pks, paginators.unpack_pks(packed))
+
+    def test_empty(self):
+        # Empty snapshots can be packed.
+        self.assertEqual([], paginators.unpack_pks(paginators.pack_pks([])))
+
+    def test_strings(self):
+        # Other primary keys can be packed too.
+        pks = ['b', 'a', 'c']
+        self.assertEqual(pks, paginators.unpack_pks(paginators.pack_pks(pks)))
+
+
 class DifferentFirstPageDefaultPaginatorTest(
         DifferentFirstPagePaginatorTestMixin, TestCase):
 
@@ -0,0 +1,175 @@
+"""Replica routing tests."""
+
+from __future__ import unicode_literals
+
+from django.http import HttpResponse
+from django.test import TestCase
+from django.test.client import RequestFactory
+
+from endless_pagination import (
+    paginators,
+    routing,
+)
+from endless_pagination.tests.test_models import local_settings
+
+
+def replica_router(request):
+    """A replica router used in tests."""
+    return request.GET.get('db')
+
+
+class FakeQuerySet(object):
+    """A queryset-like list recording the database it is used on."""
+
+    def __init__(self, items, db='default', databases=None):
+        self.items = items
+        self.db = db
+        # The aliases passed to *using*, shared by derived querysets.
+        self.databases = [] if databases is None else databases
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return FakeQuerySet(
+                self.items[index], db=self.db, databases=self.databases)
+        return self.items[index]
+
+    def __len__(self):
+        return len(self.items)
+
+    def count(self):
+        return len(self.items)
+
+    def using(self, alias):
+        self.databases.append(alias)
+        return FakeQuerySet(self.items, db=alias, databases=self.databases)
+
+
+class GetDatabaseTest(TestCase):
+
+    def setUp(self):
+        self.request = RequestFactory().get('/', {'db': 'other'})
+
+    def test_no_replica(self):
+        # None is returned if no replica is configured.
+        self.assertIsNone(routing.get_database(self.request))
+
+    def test_setting(self):
+        # The replica alias can be configured in the settings.
+        with local_settings(REPLICA_DATABASE='replica'):
+            self.assertEqual('replica', routing.get_database(self.request))
+
+    def test_explicit(self):
+        # The explicitly passed alias takes precedence.
+        with local_settings(
+                REPLICA_DATABASE='replica', REPLICA_ROUTER=replica_router):
+            database = routing.get_database(self.request, 'explicit')
+        self.assertEqual('explicit', database)
+
+    def test_router(self):
+        # The router is called passing the request.
+        with local_settings(
+                REPLICA_DATABASE='replica', REPLICA_ROUTER=replica_router):
+            self.assertEqual('other', routing.get_database(self.request))
+
+    def test_router_path(self):
+        # The router can be a dotted path.
+        path = 'endless_pagination.tests.test_routing.replica_router'
+        with local_settings(REPLICA_ROUTER=path):
+            self.assertEqual('other', routing.get_database(self.request))
+
+    def test_router_fallback(self):
+        # The setting is used if the router returns None.
+        request = RequestFactory().get('/')
+        with local_settings(
+                REPLICA_DATABASE='replica', REPLICA_ROUTER=replica_router):
+            self.assertEqual('replica', routing.get_database(request))
+
+    def test_use_primary(self):
+        # Replicas are not used if the request requires the primary.
+        routing.use_primary(self.request)
+        with local_settings(REPLICA_DATABASE='replica'):
+            self.assertIsNone(routing.get_database(self.request, 'explicit'))
+
+    def test_route(self):
+        # Only querysets are routed.
+        queryset = FakeQuerySet(range(3))
+        self.assertEqual('replica', routing.route(queryset, 'replica').db)
+        self.assertIs(queryset, routing.route(queryset, None))
+        objects = list(range(3))
+        self.assertIs(objects, routing.route(objects, 'replica'))
+
+
+class PaginatorsRoutingTest(TestCase):
+
+    def setUp(self):
+        self.queryset = FakeQuerySet(list(range(30)))
+
+    def test_count(self):
+        # Objects are counted using the replica.
+        paginator = paginators.DefaultPaginator(
+            self.queryset, 10, database='replica')
+        with local_settings(REPLICA_DATABASE='replica'):
+            self.assertEqual(30, paginator.count)
+            self.assertEqual('default', paginator.page(2).object_list.db)
+        self.assertEqual(['replica'], self.queryset.databases)
+
+    def test_pages(self):
+        # Page objects can also be retrieved from the replica.
+        paginator = paginators.DefaultPaginator(
+            self.queryset, 10, database='replica')
+        with local_settings(REPLICA_PAGES=True):
+            self.assertEqual('replica', paginator.page(2).object_list.db)
+
+    def test_lazy_paginator(self):
+        # The lazy paginator also routes page queries.
+        paginator = paginators.LazyPaginator(self.queryset, 10)
+        with local_settings(REPLICA_DATABASE='replica', REPLICA_PAGES=True):
+            self.assertEqual(10, len(paginator.page(2).object_list))
+        self.assertEqual(['replica'], self.queryset.databases)
+
+    def test_use_primary(self):
+        # The queryset database is used if the request requires the primary.
+        request = RequestFactory().get('/')
+        routing.use_primary(request)
+        paginator = paginators.DefaultPaginator(
+            self.queryset, 10, request=request, database='replica')
+        with local_settings(REPLICA_PAGES=True):
+            self.assertIsNone(paginator.get_database())
+            self.assertEqual('default', paginator.page(2).object_list.db)
+        self.assertEqual([], self.queryset.databases)
+
+
+class ReadYourWritesMiddlewareTest(TestCase):
+
+    def setUp(self):
+        self.middleware = routing.ReadYourWritesMiddleware()
+        self.factory = RequestFactory()
+
+    def test_write(self):
+        # The cookie is set after a write.
+        request = self.factory.post('/')
+        response = self.middleware.process_response(request, HttpResponse())
+        cookie = response.cookies[routing.PRIMARY_COOKIE]
+        self.assertEqual(10, cookie['max-age'])
+
+    def test_read(self):
+        # The cookie is not set when reading.
+        request = self.factory.get('/')
+        response = self.middleware.process_response(request, HttpResponse())
+        self.assertNotIn(routing.PRIMARY_COOKIE, response.cookies)
+
+    def test_disabled(self):
+        # The cookie is not set if the setting is 0.
+        request = self.factory.post('/')
+        with local_settings(PRIMARY_AFTER_WRITE=0):
+            response = self.middleware.process_response(
+                request, HttpResponse())
+        self.assertNotIn(routing.PRIMARY_COOKIE, response.cookies)
+
+    def test_primary(self):
+        # Requests including the cookie do not use replicas.
+        request = self.factory.get('/')
+        request.COOKIES[routing.PRIMARY_COOKIE] = '1'
+        self.middleware.process_request(request)
+        with local_settings(REPLICA_DATABASE='replica'):
+            self.assertIsNone(routing.get_database(request))
@@ -0,0 +1,50 @@
+"""Static files tests."""
+
+from __future__ import unicode_literals
+import gzip
+import io
+import os
+
+from django.test import TestCase
+
+import endless_pagination
+
+
+JS_PATH = os.path.join(
+    os.path.dirname(endless_pagination.__file__),
+    'static', 'endless_pagination', 'js')
+
+
+class ModuleBudgetTest(TestCase):
+    """Keep the standalone ES module small.
+
+    The module is meant to be loaded by pages where blocking scripts are
+    expensive: its parse and compile time grows with its size, so the size
+    budget also works as parse time budget.
+    """
+
+    # Budgets are expressed in bytes.
+    max_size = 8 * 1024
+    max_gzipped_size = 3 * 1024
+
+    def setUp(self):
+        path = os.path.join(JS_PATH, 'endless-pagination.module.js')
+        with open(path, 'rb') as module_file:
+            self.contents = module_file.read()
+
+    def test_size(self):
+        # Ensure the module source is within the size budget.
+        self.assertLessEqual(len(self.contents), self.max_size)
+
+    def test_gzipped_size(self):
+        # Ensure the compressed module is within the size budget.
+        output = io.BytesIO()
+        with gzip.GzipFile(fileobj=output, mode='wb') as gzip_file:
+            gzip_file.write(self.contents)
+        self.assertLessEqual(len(output.getvalue()), self.max_gzipped_size)
+
+    def test_no_dependencies(self):
+        # Ensure the module does not depend on jQuery.
+        self.assertNotIn(b'jQuery(', self.contents)
+        self.assertNotIn(b'$(', self.contents)
+        self.assertNotIn(b'$.', self.contents)
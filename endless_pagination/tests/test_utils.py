@@ -6,7 +6,11 @@ from django.test import TestCase
 from django.test.client import RequestFactory
 
 from endless_pagination import utils
-from endless_pagination.settings import PAGE_LABEL
+from endless_pagination.tests import TestModel
+from endless_pagination.settings import (
+    MAX_PAGE_RANGE,
+    PAGE_LABEL,
+)
 from endless_pagination.exceptions import PaginationError
 
 
@@ -59,6 +63,78 @@ class GetPageNumberFromRequestTest(TestCase):
         request = self.factory.post('/', {PAGE_LABEL: 5})
         self.assertEqual(5, utils.get_page_number_from_request(request))
 
+    def test_page_range(self):
+        # The last page is returned if a range of pages is requested.
+        request = self.factory.get('?{0}=2-5'.format(PAGE_LABEL))
+        self.assertEqual(5, utils.get_page_number_from_request(request))
+
+
+class GetPageRangeFromRequestTest(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_no_querystring_key(self):
+        # Ensure the first page is returned if page info cannot be
+        # retrieved from the querystring.
+        request = self.factory.get('/')
+        self.assertEqual((1, 1), utils.get_page_range_from_request(request))
+
+    def test_default(self):
+        # Ensure the default page number is returned if page info cannot be
+        # retrieved from the querystring.
+        request = self.factory.get('/')
+        page_range = utils.get_page_range_from_request(request, default=3)
+        self.assertEqual((3, 3), page_range)
+
+    def test_single_page(self):
+        # A single page number is returned as a one page range.
+        request = self.factory.get('?{0}=4'.format(PAGE_LABEL))
+        self.assertEqual((4, 4), utils.get_page_range_from_request(request))
+
+    def test_page_range(self):
+        # Ensure the requested range of pages is returned.
+        request = self.factory.get('?mypage=2-8')
+        page_range = utils.get_page_range_from_request(
+            request, querystring_key='mypage')
+        self.assertEqual((2, 8), page_range)
+
+    def test_invalid_page_range(self):
+        # The default page is returned if the requested range is not valid.
+        for value in ('8-2', '1-', '1-2-3', 'a-b', '__not_valid__'):
+            request = self.factory.get('/', {PAGE_LABEL: value})
+            page_range = utils.get_page_range_from_request(request, default=3)
+            self.assertEqual((3, 3), page_range, value)
+
+    def test_max_page_range(self):
+        # Ranges longer than ``settings.MAX_PAGE_RANGE`` are shortened.
+        request = self.factory.get('?{0}=3-1000'.format(PAGE_LABEL))
+        page_range = utils.get_page_range_from_request(request)
+        self.assertEqual((3, MAX_PAGE_RANGE + 2), page_range)
+
+
+class GetQuerystringValueTest(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_get(self):
+        # Ensure the value is retrieved from GET data.
+        request = self.factory.get('?token=abc')
+        self.assertEqual('abc', utils.get_querystring_value(request, 'token'))
+
+    def test_post(self):
+        # Ensure the value is retrieved from POST data.
+        request = self.factory.post('/', {'token': 'abc'})
+        self.assertEqual('abc', utils.get_querystring_value(request, 'token'))
+
+    def test_missing(self):
+        # Ensure the default value is returned if the key is missing.
+        request = self.factory.get('/')
+        self.assertIsNone(utils.get_querystring_value(request, 'token'))
+        value = utils.get_querystring_value(request, 'token', default='x')
+        self.assertEqual('x', value)
+
 
 class GetPageNumbersTest(TestCase):
 
@@ -408,6 +484,14 @@ class GetQuerystringForPageTest(TestCase):
         querystring = utils.get_querystring_for_page(request, 5, 'mypage')
         self.assertEqual('?mypage=5', querystring)
 
+    def test_params(self):
+        # Additional parameters replace the existing ones.
+        request = self.factory.get('/?token=old')
+        querystring = utils.get_querystring_for_page(
+            request, 2, 'mypage', params={'token': 'new'})
+        self.assertIn('token=new', querystring)
+        self.assertNotIn('token=old', querystring)
+
 
 class NormalizePageNumberTest(TestCase):
 
@@ -427,3 +511,57 @@ class NormalizePageNumberTest(TestCase):
         # is out of range.
         result = utils.normalize_page_number(-5, self.page_range)
         self.assertEqual(self.page_range[0], result)
+
+
+class GetFingerprintTest(TestCase):
+
+    def test_queryset(self):
+        # The fingerprint includes the model label.
+        fingerprint = utils.get_fingerprint(TestModel.objects.all())
+        label = TestModel._meta.app_label + '.TestModel:'
+        self.assertTrue(fingerprint.startswith(label))
+
+    def test_same_query(self):
+        # Querysets executing the same query share the same fingerprint.
+        self.assertEqual(
+            utils.get_fingerprint(TestModel.objects.filter(pk__gt=1)),
+            utils.get_fingerprint(TestModel.objects.filter(pk__gt=1)))
+
+    def test_different_query(self):
+        # Querysets executing different queries have different fingerprints.
+        self.assertNotEqual(
+            utils.get_fingerprint(TestModel.objects.filter(pk__gt=1)),
+            utils.get_fingerprint(TestModel.objects.filter(pk__gt=2)))
+
+    def test_database(self):
+        # Querysets using different databases have different fingerprints.
+        queryset = TestModel.objects.all()
+        self.assertNotEqual(
+            utils.get_fingerprint(queryset),
+            utils.get_fingerprint(queryset.using('bench')))
+
+    def test_not_a_queryset(self):
+        # None is returned if the object list is not a queryset.
+        self.assertIsNone(utils.get_fingerprint(range(10)))
+
+
+class LazyValueTest(TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+    def func(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+        return 'value'
+
+    def test_lazy(self):
+        # Ensure the function is not called until the value is requested.
+        utils.lazy_value(self.func, 1, key=2)
+        self.assertEqual([], self.calls)
+
+    def test_value(self):
+        # Ensure the function is only called once with the given arguments.
+        value = utils.lazy_value(self.func, 1, key=2)
+        self.assertEqual('value', value())
+        self.assertEqual('value', value())
+        self.assertEqual([((1,), {'key': 2})], self.calls)
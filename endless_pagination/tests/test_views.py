@@ -139,3 +139,71 @@ class AjaxListViewTest(TestCase):
         view = CustomizedListView.as_view(queryset=queryset)
         response = view(self.request)
         self.check_response(response, self.model_template_name, queryset)
+
+    def test_lazy_context(self):
+        # Ensure lazy values are added to the context and only computed
+        # when used.
+        calls = []
+
+        def get_sidebar(request):
+            calls.append(request)
+            return 'sidebar'
+
+        view = self.make_view(
+            queryset=range(30),
+            template_name=self.template_name,
+            page_template=self.page_template,
+            lazy_context={'sidebar': get_sidebar},
+        )
+        response = view(self.request)
+        self.assertFalse(self.request.endless_is_page_request)
+        sidebar = response.context_data['sidebar']
+        self.assertEqual([], calls)
+        self.assertEqual('sidebar', sidebar())
+        self.assertEqual('sidebar', sidebar())
+        self.assertEqual([self.request], calls)
+
+    def test_lazy_context_ajax(self):
+        # Lazy values are not added if only the page template is rendered.
+        view = self.make_view(
+            queryset=range(30),
+            template_name=self.template_name,
+            page_template=self.page_template,
+            lazy_context={'sidebar': lambda request: 'sidebar'},
+        )
+        response = view(self.ajax_request)
+        self.assertTrue(self.ajax_request.endless_is_page_request)
+        self.assertNotIn('sidebar', response.context_data)
+
+    def test_page_fragment(self):
+        # Ensure the page template is a fragment of the main template if
+        # *page_fragment* is provided.
+        view = self.make_view(
+            queryset=range(30),
+            template_name=self.template_name,
+            page_fragment='entries',
+        )
+        response = view(self.ajax_request)
+        page_template = 'template.html#entries'
+        self.check_response(response, page_template, range(30))
+        self.assertEqual(page_template, response.context_data['page_template'])
+
+    def test_page_fragment_model(self):
+        # Ensure the page fragment also works when the template name is
+        # generated using the model.
+        make_model_instances(3)
+        view = self.make_view(model=TestModel, page_fragment='entries')
+        response = view(self.request)
+        self.assertEqual(
+            self.model_template_name + '#entries',
+            response.context_data['page_template'])
+
+
+class MultipleObjectMixinTest(TestCase):
+
+    def test_missing_page_template(self):
+        # Ensure the mixin can be used without the template response mixin.
+        view = views.MultipleObjectMixin()
+        view.request = RequestFactory().get('/')
+        with self.assertRaises(ImproperlyConfigured):
+            view.get_context_data(object_list=range(3))
@@ -1,13 +1,18 @@
 """Django Endless Pagination utility functions."""
 
 from __future__ import unicode_literals
+import hashlib
+import re
 import sys
 
+from django.utils.encoding import force_bytes
+
 from endless_pagination import exceptions
 from endless_pagination.settings import (
     DEFAULT_CALLABLE_AROUNDS,
     DEFAULT_CALLABLE_ARROWS,
     DEFAULT_CALLABLE_EXTREMES,
+    MAX_PAGE_RANGE,
     PAGE_LABEL,
 )
 
@@ -22,6 +27,9 @@ else:
     text = unicode  # NOQA
 
 
+PAGE_RANGE_EXPRESSION = re.compile(r'^(?P<first>\d+)-(?P<last>\d+)$')
+
+
 def get_data_from_context(context):
     """Get the django paginator data object from the given *context*.
 
@@ -35,17 +43,59 @@ def get_data_from_context(context):
             'Cannot find endless data in context.')
 
 
+def get_querystring_value(request, querystring_key, default=None):
+    """Retrieve the value of *querystring_key* from *GET* or *POST* data.
+
+    This is where page numbers are read from: values paired with the page
+    number, e.g. snapshot tokens and cursors, must be read from the same
+    place. Return *default* if the key does not exist in *request*.
+    """
+    try:
+        return request.REQUEST[querystring_key]
+    except (KeyError, TypeError):
+        return default
+
+
 def get_page_number_from_request(
         request, querystring_key=PAGE_LABEL, default=1):
     """Retrieve the current page number from *GET* or *POST* data.
 
     If the page does not exists in *request*, or is not a number,
     then *default* number is returned.
+    If a range of pages is requested (e.g. ``?page=1-8``), the last page
+    of the range is returned.
     """
-    try:
-        return int(request.REQUEST[querystring_key])
-    except (KeyError, TypeError, ValueError):
-        return default
+    return get_page_range_from_request(
+        request, querystring_key=querystring_key, default=default)[1]
+
+
+def get_page_range_from_request(
+        request, querystring_key=PAGE_LABEL, default=1):
+    """Retrieve the requested range of pages from *GET* or *POST* data.
+
+    Return a ``(first, last)`` tuple of page numbers. A range is expressed
+    in the querystring as ``first-last``, e.g. ``?page=1-8``, while a single
+    page number is returned as a range including only that page.
+    Ranges longer than *settings.MAX_PAGE_RANGE* pages are shortened
+    keeping the first page.
+
+    If the page does not exists in *request*, or is not valid,
+    then the *default* number is returned as a single page range.
+    """
+    value = get_querystring_value(request, querystring_key)
+    if value is None:
+        return default, default
+    match = PAGE_RANGE_EXPRESSION.match(value)
+    if match is None:
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            return default, default
+        return number, number
+    first, last = int(match.group('first')), int(match.group('last'))
+    if first > last:
+        return default, default
+    return first, min(last, first + MAX_PAGE_RANGE - 1)
 
 
 def get_page_numbers(
@@ -160,9 +210,16 @@ def get_elastic_page_numbers(current_page, num_pages):
 
 
 def get_querystring_for_page(
-        request, page_number, querystring_key, default_number=1):
-    """Return a querystring pointing to *page_number*."""
+        request, page_number, querystring_key, default_number=1,
+        params=None):
+    """Return a querystring pointing to *page_number*.
+
+    The optional *params* dict includes additional parameters to be added
+    to the querystring.
+    """
     querydict = request.GET.copy()
+    for key, value in (params or {}).items():
+        querydict[key] = value
     querydict[querystring_key] = page_number
     # For the default page number (usually 1) the querystring is not required.
     if page_number == default_number:
@@ -174,6 +231,43 @@ def get_querystring_for_page(
     return ''
 
 
+def get_fingerprint(object_list):
+    """Return a string identifying the query of the given *object_list*.
+
+    The fingerprint includes the model label and the database alias.
+    Return None if *object_list* is not a Django queryset, or if its query
+    cannot be represented as SQL (e.g. when the queryset is empty).
+    """
+    query = getattr(object_list, 'query', None)
+    if query is None:
+        return None
+    try:
+        sql = force_bytes(query)
+    except Exception:
+        return None
+    model = object_list.model._meta
+    label = '{0}.{1}'.format(model.app_label, model.object_name)
+    return '{0}:{1}:{2}'.format(
+        label, object_list.db, hashlib.md5(sql).hexdigest())
+
+
+def lazy_value(func, *args, **kwargs):
+    """Return a callable lazily computing ``func(*args, **kwargs)``.
+
+    The value is computed the first time the callable is called, and the
+    result is returned by all the subsequent calls. Since Django templates
+    call callables found in the context, this can be used to add to the
+    context values that are only computed if actually used in templates.
+    """
+    cache = []
+
+    def value():
+        if not cache:
+            cache.append(func(*args, **kwargs))
+        return cache[0]
+    return value
+
+
 def normalize_page_number(page_number, page_range):
     """Handle a negative *page_number*.
 
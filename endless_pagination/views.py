@@ -9,6 +9,8 @@ from django.utils.translation import ugettext as _
 from django.views.generic.base import View
 from django.views.generic.list import MultipleObjectTemplateResponseMixin
 
+from endless_pagination import utils
+from endless_pagination.loaders import FRAGMENT_SEPARATOR
 from endless_pagination.settings import PAGE_LABEL
 
 
@@ -16,7 +18,9 @@ class MultipleObjectMixin(object):
 
     allow_empty = True
     context_object_name = None
+    lazy_context = None
     model = None
+    page_fragment = None
     queryset = None
 
     def get_queryset(self):
@@ -72,6 +76,13 @@ class MultipleObjectMixin(object):
 
         For instance, if the list is a queryset of *blog.Entry*,
         the template will be ``blog/entry_list_page.html``.
+
+        If *self.page_fragment* is set, the page template is instead the
+        named fragment of the main template, e.g.
+        ``blog/entry_list.html#entries``.
+
+        Values in *self.lazy_context* are added to the context as lazily
+        computed values, and only if the whole page is going to be rendered.
         """
         queryset = kwargs.pop('object_list')
         page_template = kwargs.pop('page_template', None)
@@ -83,13 +94,19 @@ class MultipleObjectMixin(object):
             context[context_object_name] = queryset
 
         if page_template is None:
-            if hasattr(queryset, 'model'):
+            if hasattr(queryset, 'model') or self.page_fragment is not None:
                 page_template = self.get_page_template(**kwargs)
             else:
                 raise ImproperlyConfigured(
                     'AjaxListView requires a page_template')
         context['page_template'] = self.page_template = page_template
 
+        # Skip lazy context when only the page template is rendered.
+        if self.lazy_context and not getattr(
+                self.request, 'endless_is_page_request', False):
+            for name, func in self.lazy_context.items():
+                context[name] = utils.lazy_value(func, self.request)
+
         return context
 
 
@@ -110,6 +127,7 @@ class AjaxMultipleObjectTemplateResponseMixin(
         MultipleObjectTemplateResponseMixin):
 
     key = PAGE_LABEL
+    page_fragment = None
     page_template = None
     page_template_suffix = '_page'
     template_name_suffix = '_list'
@@ -120,6 +138,16 @@ class AjaxMultipleObjectTemplateResponseMixin(
         Only called if *page_template* is not given as a kwarg of
         *self.as_view*.
         """
+        if self.page_fragment is not None:
+            template_names = super(
+                AjaxMultipleObjectTemplateResponseMixin,
+                self).get_template_names()
+            if not template_names:
+                raise ImproperlyConfigured(
+                    'AjaxListView requires a template_name to use '
+                    'page_fragment')
+            return '{0}{1}{2}'.format(
+                template_names[0], FRAGMENT_SEPARATOR, self.page_fragment)
         opts = self.object_list.model._meta
         return '{0}/{1}{2}{3}.html'.format(
             opts.app_label,
@@ -128,11 +156,16 @@ class AjaxMultipleObjectTemplateResponseMixin(
             self.page_template_suffix,
         )
 
-    def get_template_names(self):
-        """Switch the templates for Ajax requests."""
+    def is_page_request(self):
+        """Return True if only the page template is rendered for this request.
+        """
         request = self.request
         querystring_key = request.REQUEST.get('querystring_key', PAGE_LABEL)
-        if request.is_ajax() and querystring_key == self.key:
+        return request.is_ajax() and querystring_key == self.key
+
+    def get_template_names(self):
+        """Switch the templates for Ajax requests."""
+        if self.is_page_request():
             return [self.page_template]
         return super(
             AjaxMultipleObjectTemplateResponseMixin, self).get_template_names()
@@ -171,5 +204,30 @@ class AjaxListView(AjaxMultipleObjectTemplateResponseMixin, BaseListView):
             (r'^publishers/$', AjaxListView.as_view(model=Publisher)),
         )
 
+    Expensive context values, not used by the page template, can be
+    provided using the *lazy_context* dict, mapping context variable names
+    to callables taking the request as the only argument, e.g.::
+
+        AjaxListView.as_view(
+            model=Publisher, lazy_context={'sidebar': get_sidebar})
+
+    Lazy values are only computed when used in templates, and are not added
+    to the context when only the page template is rendered.
+    The *request.endless_is_page_request* attribute is also set to True in
+    the latter case.
+
+    Instead of keeping a separate page template, the paginated part of the
+    main template can be marked using the {% endless_fragment %} template
+    tag (or a {% block %}), and its name given as *page_fragment*, e.g.::
+
+        AjaxListView.as_view(model=Publisher, page_fragment='publishers')
+
+    In this case Ajax requests only render the fragment: see
+    *endless_pagination.loaders.FragmentLoader*.
+
     NOTE: Django >= 1.3 is required to use this view.
     """
+
+    def get(self, request, *args, **kwargs):
+        request.endless_is_page_request = self.is_page_request()
+        return super(AjaxListView, self).get(request, *args, **kwargs)
@@ -0,0 +1,106 @@
+"""Benchmark utilities.
+
+Benchmark results are dicts mapping case names to metrics, e.g.::
+
+    {
+        'DefaultPaginator/10000/deep': {
+            'time': 0.0012,
+            'queries': 2,
+            'rows': 10,
+            'peak_memory': 18432,
+        },
+    }
+
+Results can be saved as JSON baselines, and compared to subsequent runs.
+"""
+
+from __future__ import unicode_literals
+import gc
+import json
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:
+    # Memory is not measured under Python 2.
+    tracemalloc = None
+
+
+# Metrics whose increase is reported only if greater than the threshold.
+VARIABLE_METRICS = ('time', 'peak_memory')
+
+
+def measure(func, repeat=3):
+    """Call *func* *repeat* times and return the collected metrics.
+
+    The *func* callable must return a dict of counters (e.g. the number of
+    queries), which are included in the metrics. The wall time is the best
+    of all runs, in seconds. The peak memory, in bytes, is measured during
+    an additional run, and is None if *tracemalloc* is not available.
+    """
+    timer = timeit.default_timer
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = timer()
+        metrics = func()
+        times.append(timer() - start)
+    metrics['time'] = min(times)
+    metrics['peak_memory'] = None
+    if tracemalloc is not None:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            metrics['peak_memory'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return metrics
+
+
+def save(results, path):
+    """Save benchmark *results* as JSON in the given *path*."""
+    with open(path, 'w') as output:
+        json.dump(results, output, indent=2, sort_keys=True)
+
+
+def load(path):
+    """Load benchmark results from the given *path*."""
+    with open(path) as baseline:
+        return json.load(baseline)
+
+
+def compare(baseline, results, threshold=0.2):
+    """Compare *results* to the *baseline* ones.
+
+    Return a list of ``(case, metric, old, new, regression)`` tuples, one
+    for each metric of the cases present in both results. Time and memory
+    regressions are reported if the metric increased by more than
+    *threshold* (a ratio); any increase in other metrics (e.g. the number of
+    queries or the rows transferred) is a regression.
+    """
+    comparison = []
+    for case in sorted(results):
+        if case not in baseline:
+            continue
+        for metric, new in sorted(results[case].items()):
+            old = baseline[case].get(metric)
+            if old is None or new is None:
+                continue
+            if metric in VARIABLE_METRICS:
+                regression = new > old * (1 + threshold)
+            else:
+                regression = new > old
+            comparison.append((case, metric, old, new, regression))
+    return comparison
+
+
+def format_comparison(comparison):
+    """Return the lines describing the given *comparison*."""
+    lines = []
+    for case, metric, old, new, regression in comparison:
+        change = (new - old) / float(old) * 100 if old else 0
+        lines.append('{0} {1} {2}: {3:.6g} -> {4:.6g} ({5:+.1f}%)'.format(
+            'REGRESSION' if regression else '          ',
+            case, metric, old, new, change))
+    return lines
@@ -0,0 +1,159 @@
+"""Paginator benchmarks using large synthetic datasets."""
+
+from __future__ import unicode_literals
+from math import ceil
+
+from django.core.management import call_command
+from django.db import (
+    connections,
+    transaction,
+)
+from django.db.models.signals import post_init
+try:
+    from django.test.utils import CaptureQueriesContext
+except ImportError:
+    # Django < 1.6.
+    CaptureQueriesContext = None
+
+from endless_pagination.loaders import load_object
+from project.bench import measure
+from project.models import BenchItem
+
+
+# Django < 1.6 does not provide atomic blocks.
+atomic = getattr(transaction, 'atomic', None) or transaction.commit_on_success
+
+
+class QueryCounter(object):
+    """Count the queries executed using *connection*, regardless of DEBUG.
+
+    This is only used when *CaptureQueriesContext* is not available.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.use_debug_cursor = True
+        self.initial_queries = len(self.connection.queries)
+        return self
+
+    def __exit__(self, *args):
+        self.connection.use_debug_cursor = None
+        self.final_queries = len(self.connection.queries)
+
+    def __len__(self):
+        return self.final_queries - self.initial_queries
+
+
+if CaptureQueriesContext is None:
+    CaptureQueriesContext = QueryCounter
+
+DATABASE = 'bench'
+DATASET_SIZES = (10000, 100000, 1000000)
+PAGINATORS = (
+    'endless_pagination.paginators.DefaultPaginator',
+    'endless_pagination.paginators.LazyPaginator',
+    'endless_pagination.paginators.SnapshotPaginator',
+)
+PER_PAGE = 10
+# Rows are inserted in chunks of this size when building datasets.
+CHUNK_SIZE = 50000
+
+
+def build_dataset(size, using=DATABASE):
+    """Create the dataset including *size* items, if it does not exist.
+
+    Return True if the dataset has been created.
+    """
+    call_command('syncdb', database=using, interactive=False, verbosity=0)
+    items = BenchItem.objects.using(using).filter(dataset=size)
+    if items.count() == size:
+        return False
+    items.delete()
+    connection = connections[using]
+    cursor = connection.cursor()
+    sql = 'INSERT INTO {0} (dataset, title) VALUES (%s, %s)'.format(
+        connection.ops.quote_name(BenchItem._meta.db_table))
+    with atomic(using=using):
+        for start in range(0, size, CHUNK_SIZE):
+            stop = min(start + CHUNK_SIZE, size)
+            cursor.executemany(sql, [
+                (size, 'Item {0}'.format(i + 1)) for i in range(start, stop)
+            ])
+    return True
+
+
+def get_page_numbers(size, per_page=PER_PAGE):
+    """Return a dict mapping depths to page numbers for the given *size*."""
+    num_pages = max(1, int(ceil(size / float(per_page))))
+    return {
+        'shallow': 1,
+        'mid': max(1, num_pages // 2),
+        'deep': num_pages,
+    }
+
+
+class RowCounter(object):
+    """Count the model instances created while the counter is active."""
+
+    def __init__(self, model):
+        self.model = model
+        self.rows = 0
+
+    def __enter__(self):
+        post_init.connect(self.increment, sender=self.model)
+        return self
+
+    def __exit__(self, *args):
+        post_init.disconnect(self.increment, sender=self.model)
+
+    def increment(self, **kwargs):
+        self.rows += 1
+
+
+def paginate(paginator_class, queryset, number, per_page=PER_PAGE):
+    """Emulate a request for page *number* of *queryset*.
+
+    Return the number of queries executed and the rows transferred.
+    """
+    connection = connections[queryset.db]
+    with CaptureQueriesContext(connection) as queries:
+        with RowCounter(queryset.model) as counter:
+            paginator = paginator_class(queryset, per_page)
+            page = paginator.page(number)
+            list(page.object_list)
+            # Usually required to display pagination links.
+            page.has_next()
+    return {
+        'queries': len(queries),
+        'rows': counter.rows,
+    }
+
+
+def run(sizes=DATASET_SIZES, paginators=PAGINATORS, repeat=3,
+        using=DATABASE, log=None):
+    """Run the paginator benchmarks and return the results.
+
+    Each paginator, identified by its dotted path, is measured retrieving
+    shallow, mid and deep pages of the datasets of the given *sizes*.
+    If given, the *log* callable is called passing progress messages.
+    """
+    log = log or (lambda message: None)
+    results = {}
+    for size in sizes:
+        if build_dataset(size, using=using):
+            log('Created dataset with {0} items.'.format(size))
+        queryset = BenchItem.objects.using(using).filter(dataset=size)
+        numbers = get_page_numbers(size)
+        for path in paginators:
+            paginator_class = load_object(path)
+            for depth in ('shallow', 'mid', 'deep'):
+                case = '{0}/{1}/{2}'.format(
+                    paginator_class.__name__, size, depth)
+                number = numbers[depth]
+                results[case] = measure(
+                    lambda: paginate(paginator_class, queryset, number),
+                    repeat=repeat)
+                log('{0}: {1:.6f}s'.format(case, results[case]['time']))
+    return results
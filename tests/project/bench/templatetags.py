@@ -0,0 +1,146 @@
+"""Template tags rendering benchmarks using in-memory lists."""
+
+from __future__ import unicode_literals
+from contextlib import contextmanager
+
+from django.template import (
+    RequestContext,
+    Template,
+)
+from django.template.loader import get_template
+from django.test.client import RequestFactory
+
+from endless_pagination import settings
+from project.bench import measure
+
+
+PER_PAGE = 10
+# Templates measuring each tag: all of them require {% paginate %}.
+TAGS = (
+    ('paginate', '{% paginate objects %}'),
+    ('show_more', '{% paginate objects %}{% show_more %}'),
+    ('get_pages', (
+        '{% paginate objects %}{% get_pages %}'
+        '{% for page in pages %}{{ page }}{% endfor %}')),
+    ('show_pages', '{% paginate objects %}{% show_pages %}'),
+)
+# Page templates of the test project.
+PROJECT_TEMPLATES = (
+    'digg/page.html',
+    'twitter/page.html',
+    'complete/objects_page.html',
+)
+PAGE_LIST_CALLABLES = (
+    ('default', None),
+    ('elastic', 'endless_pagination.utils.get_elastic_page_numbers'),
+)
+# The configuration used as a starting point: each parameter is then swept
+# keeping the others unchanged.
+DEFAULTS = {
+    'pages': 10,
+    'querystring': 0,
+    'processors': 0,
+    'callable': 'default',
+}
+SWEEPS = {
+    'pages': (1, 10, 100, 1000),
+    'querystring': (0, 100, 1000),
+    'processors': (0, 5, 20),
+    'callable': tuple(name for name, _ in PAGE_LIST_CALLABLES),
+}
+
+
+def get_configurations():
+    """Return the list of configurations to be measured."""
+    configurations = [DEFAULTS]
+    for name, values in sorted(SWEEPS.items()):
+        for value in values:
+            if value != DEFAULTS[name]:
+                configuration = dict(DEFAULTS)
+                configuration[name] = value
+                configurations.append(configuration)
+    return configurations
+
+
+def get_case_name(name, configuration):
+    """Return the case name for the given template *name*."""
+    return '{0}/pages={pages}/querystring={querystring}/' \
+        'processors={processors}/callable={callable}'.format(
+            name, **configuration)
+
+
+def make_request(page, querystring_length):
+    """Return a request for the given *page*.
+
+    The request querystring also includes an additional parameter so that
+    the whole querystring is roughly *querystring_length* characters long.
+    """
+    data = {settings.PAGE_LABEL: page}
+    if querystring_length:
+        data['q'] = 'x' * querystring_length
+    return RequestFactory().get('/', data)
+
+
+def make_processor(index):
+    """Return a context processor adding a single value to the context."""
+    def processor(request):
+        return {'processor_{0}'.format(index): index}
+    return processor
+
+
+@contextmanager
+def page_list_callable(path):
+    """Use the *path* callable to generate the list of pages."""
+    original = settings.PAGE_LIST_CALLABLE
+    settings.PAGE_LIST_CALLABLE = path
+    try:
+        yield
+    finally:
+        settings.PAGE_LIST_CALLABLE = original
+
+
+def render(template, configuration, number):
+    """Render the *template* *number* times using *configuration*.
+
+    The current page is in the middle of the pagination.
+    """
+    pages = configuration['pages']
+    request = make_request(
+        max(1, pages // 2), configuration['querystring'])
+    processors = [
+        make_processor(i) for i in range(configuration['processors'])]
+    objects = list(range(pages * PER_PAGE))
+    for _ in range(number):
+        context = RequestContext(
+            request, {'objects': objects}, processors=processors)
+        template.render(context)
+    return {}
+
+
+def run(number=100, repeat=3, log=None):
+    """Run the template tags benchmarks and return the results.
+
+    Each template is rendered *number* times for each measurement.
+    If given, the *log* callable is called passing progress messages.
+    """
+    log = log or (lambda message: None)
+    callables = dict(PAGE_LIST_CALLABLES)
+    templates = [
+        (name, Template('{% load endless %}' + contents))
+        for name, contents in TAGS
+    ]
+    project_templates = [
+        (name, get_template(name)) for name in PROJECT_TEMPLATES]
+    results = {}
+    for configuration in get_configurations():
+        cases = list(templates)
+        if configuration == DEFAULTS:
+            cases.extend(project_templates)
+        with page_list_callable(callables[configuration['callable']]):
+            for name, template in cases:
+                case = get_case_name(name, configuration)
+                results[case] = measure(
+                    lambda: render(template, configuration, number),
+                    repeat=repeat)
+                log('{0}: {1:.6f}s'.format(case, results[case]['time']))
+    return results
@@ -0,0 +1,84 @@
+"""Run the paginator benchmarks."""
+
+from __future__ import unicode_literals
+from optparse import make_option
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+
+from project import bench
+from project.bench import paginators
+
+
+def _split(value, convert=None):
+    """Split the comma separated *value*, converting each item if required."""
+    items = [item.strip() for item in value.split(',') if item.strip()]
+    return [convert(item) for item in items] if convert else items
+
+
+# Options shared by all the benchmark commands.
+COMMON_OPTIONS = (
+    make_option(
+        '--repeat', type='int', default=3,
+        help='Number of runs for each measurement.'),
+    make_option(
+        '--output', help='Save the results as JSON in the given path.'),
+    make_option(
+        '--compare',
+        help='Compare the results to the JSON baseline in this path.'),
+    make_option(
+        '--threshold', type='float', default=0.2,
+        help='Time and memory increase ratio reported as regression.'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure paginators retrieving shallow, mid and deep pages of large '
+        'synthetic datasets, recording queries, rows transferred, wall time '
+        'and peak memory. Datasets are built on the first run.')
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--sizes', default=','.join(map(str, paginators.DATASET_SIZES)),
+            help='Comma separated list of dataset sizes.'),
+        make_option(
+            '--paginators', default=','.join(paginators.PAGINATORS),
+            help='Comma separated list of paginator dotted paths.'),
+    ) + COMMON_OPTIONS
+
+    def handle(self, *args, **options):
+        try:
+            sizes = _split(options['sizes'], int)
+        except ValueError:
+            raise CommandError('Invalid dataset sizes.')
+        results = paginators.run(
+            sizes=sizes,
+            paginators=_split(options['paginators']),
+            repeat=options['repeat'],
+            log=self.log)
+        handle_results(self, results, options)
+
+    def log(self, message):
+        self.stdout.write(message)
+
+
+def handle_results(command, results, options):
+    """Save and compare the benchmark *results* as requested in *options*.
+
+    Raise CommandError if regressions are found.
+    """
+    if options['output']:
+        bench.save(results, options['output'])
+        command.log('Results saved in {0}.'.format(options['output']))
+    if options['compare']:
+        comparison = bench.compare(
+            bench.load(options['compare']), results,
+            threshold=options['threshold'])
+        for line in bench.format_comparison(comparison):
+            command.log(line)
+        regressions = [item for item in comparison if item[-1]]
+        if regressions:
+            raise CommandError(
+                '{0} regressions found.'.format(len(regressions)))
@@ -0,0 +1,35 @@
+"""Run the template tags rendering benchmarks."""
+
+from __future__ import unicode_literals
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from project.bench import templatetags
+from project.management.commands.bench import (
+    COMMON_OPTIONS,
+    handle_results,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the rendering of the pagination template tags and of the '
+        'test project page templates using in-memory lists, sweeping the '
+        'number of pages, the querystring length, the number of context '
+        'processors and the page list callable.')
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--number', type='int', default=100,
+            help='Number of renders for each measurement.'),
+    ) + COMMON_OPTIONS
+
+    def handle(self, *args, **options):
+        results = templatetags.run(
+            number=options['number'],
+            repeat=options['repeat'],
+            log=self.log)
+        handle_results(self, results, options)
+
+    def log(self, message):
+        self.stdout.write(message)
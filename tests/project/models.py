@@ -0,0 +1,19 @@
+"""Test project models."""
+
+from __future__ import unicode_literals
+
+from django.db import models
+
+
+class BenchItem(models.Model):
+    """An item of the synthetic datasets used by benchmarks.
+
+    Each dataset is identified by its number of items.
+    """
+
+    dataset = models.PositiveIntegerField()
+    title = models.CharField(max_length=64)
+
+    class Meta:
+        index_together = [('dataset', 'id')]
+        ordering = ['id']
@@ -39,6 +39,10 @@ urlpatterns = patterns('',
         page_template('onscroll/page.html')(generic),
         {'template': 'onscroll/index.html'},
         name='onscroll'),
+    url(r'^onscroll/fallback/$',
+        page_template('onscroll/page.html')(generic),
+        {'template': 'onscroll/fallback.html'},
+        name='onscroll-fallback'),
     url(r'^chunks/$',
         page_templates({
             'chunks/objects_page.html': None,
@@ -1,6 +1,7 @@
 """Settings file for the Django project used for tests."""
 
 import os
+import tempfile
 
 from django.conf.global_settings import TEMPLATE_CONTEXT_PROCESSORS
 
@@ -12,7 +13,16 @@ ROOT = os.path.abspath(os.path.dirname(__file__))
 PROJECT = os.path.join(ROOT, PROJECT_NAME)
 
 # Django configuration.
-DATABASES = {'default': {'ENGINE': 'django.db.backends.sqlite3'}}
+DATABASES = {
+    'default': {'ENGINE': 'django.db.backends.sqlite3'},
+    # The database storing the datasets used by benchmarks.
+    'bench': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv(
+            'ENDLESS_PAGINATION_BENCH_DATABASE',
+            os.path.join(tempfile.gettempdir(), 'endless-pagination.db')),
+    },
+}
 DEBUG = TEMPLATE_DEBUG = True
 INSTALLED_APPS = (
     'django.contrib.staticfiles',